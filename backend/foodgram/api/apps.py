@@ -3,3 +3,11 @@ from django.apps import AppConfig
 
 class ApiConfig(AppConfig):
     name = 'api'
+
+    def ready(self):
+        from django.core.signals import request_started
+
+        from foodgram.db import close_unusable_connections
+        from . import signals  # noqa: F401
+
+        request_started.connect(close_unusable_connections)
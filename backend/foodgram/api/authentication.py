@@ -0,0 +1,127 @@
+import copy
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from foodgram.counters import get_counters
+
+token_cache_counters = get_counters('token_auth_cache')
+
+
+class TokenCache:
+    # Двухуровневый кэш token -> (user, token): локальный LRU процесса с
+    # коротким TTL поверх общего Django-кэша. Включается только с общим
+    # кэшем (CACHE_SHARED): инвалидацию в памяти одного воркера не увидели
+    # бы остальные, и отозванный токен продолжал бы действовать. Запись
+    # помечена поколением токена, прочитанным до запроса к базе;
+    # инвалидация меняет поколение, поэтому значение, прочитанное из базы
+    # до неё и записанное после, уже не принимается. LRU остальных
+    # воркеров доживает TOKEN_CACHE_LOCAL_TIMEOUT.
+    key_prefix = 'auth-token'
+
+    def __init__(self):
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return settings.CACHE_SHARED
+
+    def _cache_key(self, key):
+        return f'{self.key_prefix}:{key}'
+
+    def _generation_key(self, key):
+        return f'{self.key_prefix}:generation:{key}'
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires > now:
+                    self._local.move_to_end(key)
+                    token_cache_counters.incr('local_hits')
+                    token_cache_counters.hit()
+                    return value
+                del self._local[key]
+        cache_key = self._cache_key(key)
+        generation_key = self._generation_key(key)
+        values = cache.get_many([cache_key, generation_key])
+        entry = values.get(cache_key)
+        if entry is None or entry[0] != values.get(generation_key):
+            token_cache_counters.miss()
+            return None
+        token_cache_counters.hit()
+        self._remember(key, entry[1])
+        return entry[1]
+
+    def generation(self, key):
+        return cache.get(self._generation_key(key))
+
+    def set(self, key, value, generation):
+        cache.set(self._cache_key(key), (generation, value),
+                  settings.TOKEN_CACHE_TIMEOUT)
+        if self.generation(key) == generation:
+            self._remember(key, value)
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._local[key] = (
+                time.monotonic() + settings.TOKEN_CACHE_LOCAL_TIMEOUT, value
+            )
+            self._local.move_to_end(key)
+            while len(self._local) > settings.TOKEN_CACHE_LOCAL_SIZE:
+                self._local.popitem(last=False)
+
+    def invalidate(self, key):
+        if not self.enabled:
+            return
+        # Поколение живёт дольше любой записи, сделанной до его смены.
+        cache.set(self._generation_key(key), uuid.uuid4().hex,
+                  settings.TOKEN_CACHE_TIMEOUT * 2)
+        cache.delete(self._cache_key(key))
+        with self._lock:
+            self._local.pop(key, None)
+
+    def invalidate_user(self, user_id):
+        if not self.enabled:
+            return
+        for key in Token.objects.filter(user_id=user_id).values_list(
+            'key', flat=True
+        ):
+            self.invalidate(key)
+        with self._lock:
+            for local_key, (_, (user, _)) in list(self._local.items()):
+                if user.pk == user_id:
+                    del self._local[local_key]
+
+    def clear(self):
+        with self._lock:
+            self._local.clear()
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+
+    def authenticate_credentials(self, key):
+        if not token_cache.enabled:
+            return super().authenticate_credentials(key)
+        cached = token_cache.get(key)
+        if cached is None:
+            generation = token_cache.generation(key)
+            cached = super().authenticate_credentials(key)
+            token_cache.set(key, cached, generation)
+        # Копии, чтобы изменения user в одном запросе не утекали в кэш.
+        user = copy.copy(cached[0])
+        token = copy.copy(cached[1])
+        token.user = user
+        return user, token
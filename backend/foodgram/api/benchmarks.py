@@ -0,0 +1,185 @@
+import base64
+import io
+
+from django.core.files.storage import default_storage
+from django.db.models import Count
+from django.test import Client
+from PIL import Image
+from rest_framework.authtoken.models import Token
+
+from recipes.models import Ingredient, Recipe, Tag
+from users.models import CustomUser
+
+# Сценарии команды run_benchmarks. Каждый выполняет одну итерацию через
+# тестовый клиент Django против данных generate_dataset и проверяет код
+# ответа. Новый эндпоинт — новый сценарий здесь.
+SCENARIOS = {}
+
+RECIPES_LIMIT = 3
+INGREDIENT_QUERY = 'сах'
+CREATE_INGREDIENTS = 8
+
+
+def scenario(name):
+    def decorator(func):
+        SCENARIOS[name] = func
+        return func
+    return decorator
+
+
+class BenchmarkError(Exception):
+    pass
+
+
+def check(response, status=200):
+    if response.status_code != status:
+        raise BenchmarkError(
+            f'{response.request["REQUEST_METHOD"]} '
+            f'{response.request["PATH_INFO"]}: код {response.status_code}, '
+            f'ожидался {status}'
+        )
+    return response
+
+
+def busiest_user(related_name):
+    return CustomUser.objects.annotate(
+        total=Count(related_name)
+    ).order_by('-total', 'pk').first()
+
+
+def placeholder_image():
+    content = io.BytesIO()
+    Image.new('RGB', (64, 64), (255, 165, 0)).save(content, 'PNG')
+    encoded = base64.b64encode(content.getvalue()).decode()
+    return f'data:image/png;base64,{encoded}'
+
+
+class BenchmarkContext:
+    # Самые «тяжёлые» пользователи и рецепты набора: у кого больше всего
+    # подписок, избранного и покупок, чей рецепт популярнее всех.
+
+    def __init__(self):
+        if not Recipe.objects.exists():
+            raise BenchmarkError(
+                'В базе нет рецептов, сначала выполните generate_dataset'
+            )
+        self.anonymous = Client()
+        self.follower = self.client_for(busiest_user('follower'))
+        self.favoriter = self.client_for(busiest_user('favorites'))
+        self.shopper = self.client_for(busiest_user('shopping_cart'))
+        self.author_id = busiest_user('recipes').pk
+        self.recipe_id = Recipe.objects.annotate(
+            total=Count('users_favorites')
+        ).order_by('-total', 'pk').values_list('pk', flat=True).first()
+        self.tags = list(Tag.objects.values_list('slug', flat=True)[:2])
+        user = self.follower.user
+        self.favorite_recipe_id = Recipe.objects.exclude(
+            users_favorites__user=user
+        ).values_list('pk', flat=True).first()
+        self.cart_recipe_id = Recipe.objects.exclude(
+            shopping_cart__user=user
+        ).values_list('pk', flat=True).first()
+        self.new_recipe = {
+            'tags': list(Tag.objects.values_list('pk', flat=True)[:2]),
+            'ingredients': [
+                {'id': pk, 'amount': 10} for pk in Ingredient.objects.
+                values_list('pk', flat=True)[:CREATE_INGREDIENTS]
+            ],
+            'image': placeholder_image(),
+            'name': 'Рецепт для замера',
+            'text': 'Создан командой run_benchmarks',
+            'cooking_time': 30,
+        }
+        self.created = []
+
+    def client_for(self, user):
+        token, _ = Token.objects.get_or_create(user=user)
+        client = Client(HTTP_AUTHORIZATION=f'Token {token.key}')
+        client.user = user
+        return client
+
+    def cleanup(self):
+        recipes = Recipe.objects.filter(pk__in=self.created)
+        images = list(recipes.values_list('image', flat=True))
+        recipes.delete()
+        for image in images:
+            default_storage.delete(image)
+        self.created.clear()
+
+
+@scenario('recipe_list')
+def recipe_list(context):
+    check(context.anonymous.get('/api/recipes/'))
+
+
+@scenario('recipe_list_authenticated')
+def recipe_list_authenticated(context):
+    check(context.follower.get('/api/recipes/'))
+
+
+@scenario('recipe_list_by_tags')
+def recipe_list_by_tags(context):
+    check(context.follower.get('/api/recipes/', {'tags': context.tags}))
+
+
+@scenario('recipe_list_by_author')
+def recipe_list_by_author(context):
+    check(context.follower.get(
+        '/api/recipes/', {'author': context.author_id}
+    ))
+
+
+@scenario('recipe_list_favorited')
+def recipe_list_favorited(context):
+    check(context.favoriter.get('/api/recipes/', {'is_favorited': 1}))
+
+
+@scenario('recipe_list_in_shopping_cart')
+def recipe_list_in_shopping_cart(context):
+    check(context.shopper.get('/api/recipes/', {'is_in_shopping_cart': 1}))
+
+
+@scenario('recipe_detail')
+def recipe_detail(context):
+    check(context.follower.get(f'/api/recipes/{context.recipe_id}/'))
+
+
+@scenario('subscriptions')
+def subscriptions(context):
+    check(context.follower.get(
+        '/api/users/subscriptions/', {'recipes_limit': RECIPES_LIMIT}
+    ))
+
+
+@scenario('ingredient_search')
+def ingredient_search(context):
+    check(context.anonymous.get(
+        '/api/ingredients/', {'name': INGREDIENT_QUERY}
+    ))
+
+
+@scenario('download_shopping_cart')
+def download_shopping_cart(context):
+    check(context.shopper.get('/api/recipes/download_shopping_cart/'))
+
+
+@scenario('favorite_toggle')
+def favorite_toggle(context):
+    path = f'/api/recipes/{context.favorite_recipe_id}/favorite/'
+    check(context.follower.post(path), 201)
+    check(context.follower.delete(path), 204)
+
+
+@scenario('shopping_cart_toggle')
+def shopping_cart_toggle(context):
+    path = f'/api/recipes/{context.cart_recipe_id}/shopping_cart/'
+    check(context.follower.post(path), 201)
+    check(context.follower.delete(path), 204)
+
+
+@scenario('recipe_create')
+def recipe_create(context):
+    response = check(context.follower.post(
+        '/api/recipes/', context.new_recipe, content_type='application/json'
+    ), 201)
+    context.created.append(response.json()['id'])
@@ -0,0 +1,132 @@
+import json
+from collections import defaultdict
+
+from django.core.files.storage import default_storage
+from django.db.models import Count
+
+from recipes.models import Recipe
+from recipes.snapshots import rebuild_snapshot
+from .serializers import (RECIPE_SNAPSHOT_FIELDS, limit_recipes_per_author,
+                          represent_recipe)
+
+# Функции ниже повторяют вывод TagSerializer, RecipeShortSerializer,
+# FollowSerializer и RecipeSnapshotSerializer байт в байт, но строят словари
+# напрямую из строк .values(), минуя поля DRF. Включаются настройкой
+# API_FAST_SERIALIZERS; эквивалентность проверяет api/tests.
+
+TAG_FIELDS = ('id', 'name', 'color', 'slug')
+RECIPE_SHORT_FIELDS = ('id', 'name', 'image', 'cooking_time')
+RECIPE_FLAG_FIELDS = ('is_favorited', 'is_in_shopping_cart', 'is_subscribed')
+FOLLOW_FIELDS = (
+    'author__email', 'author__id', 'author__username',
+    'author__first_name', 'author__last_name',
+)
+
+
+def image_url(name, request=None):
+    if not name:
+        return None
+    url = default_storage.url(name)
+    if request is not None:
+        return request.build_absolute_uri(url)
+    return url
+
+
+def serialize_tags(rows):
+    return [
+        {
+            'id': row['id'],
+            'name': row['name'],
+            'color': row['color'],
+            'slug': row['slug'],
+        }
+        for row in rows
+    ]
+
+
+def serialize_short_recipes(rows, request=None):
+    return [
+        {
+            'id': row['id'],
+            'name': row['name'],
+            'image': image_url(row['image'], request),
+            'cooking_time': row['cooking_time'],
+        }
+        for row in rows
+    ]
+
+
+def recipe_values(queryset, fields=None):
+    names = [
+        name for name in RECIPE_FLAG_FIELDS
+        if name in queryset.query.annotations
+    ]
+    if fields is None or fields & RECIPE_SNAPSHOT_FIELDS:
+        names.append('snapshot__document')
+    return queryset.values('id', *names)
+
+
+def serialize_recipes(rows, request=None, fields=None):
+    data = []
+    for row in rows:
+        if 'snapshot__document' not in row:
+            document = {'id': row['id']}
+        elif row['snapshot__document'] is None:
+            document = rebuild_snapshot(row['id'])
+        else:
+            document = json.loads(row['snapshot__document'])
+        data.append(represent_recipe(
+            document,
+            request,
+            fields,
+            is_favorited=row.get('is_favorited', False),
+            is_in_shopping_cart=row.get('is_in_shopping_cart', False),
+            is_subscribed=row.get('is_subscribed', False),
+        ))
+    return data
+
+
+def follow_values(queryset):
+    names = [
+        name for name in ('is_subscribed', 'recipes_count')
+        if name in queryset.query.annotations
+    ]
+    return queryset.values(*FOLLOW_FIELDS, *names)
+
+
+def serialize_follows(rows, recipes_limit=None, fields=None):
+    rows = list(rows)
+    author_ids = [row['author__id'] for row in rows]
+    recipes = defaultdict(list)
+    if fields is None or 'recipes' in fields:
+        for recipe in limit_recipes_per_author(
+            Recipe.objects.filter(author_id__in=author_ids), recipes_limit
+        ).values('author_id', *RECIPE_SHORT_FIELDS).iterator():
+            recipes[recipe['author_id']].append(recipe)
+    counts = {}
+    if rows and 'recipes_count' in rows[0]:
+        counts = {row['author__id']: row['recipes_count'] for row in rows}
+    elif fields is None or 'recipes_count' in fields:
+        counts = dict(
+            Recipe.objects.filter(author_id__in=author_ids).order_by().values(
+                'author_id'
+            ).annotate(count=Count('id')).values_list('author_id', 'count')
+        )
+    data = []
+    for row in rows:
+        item = {
+            'email': row['author__email'],
+            'id': row['author__id'],
+            'username': row['author__username'],
+            'first_name': row['author__first_name'],
+            'last_name': row['author__last_name'],
+            'is_subscribed': row.get('is_subscribed', False),
+            'recipes': serialize_short_recipes(recipes[row['author__id']]),
+            'recipes_count': counts.get(row['author__id'], 0),
+        }
+        if fields is not None:
+            item = {
+                name: value for name, value in item.items() if name in fields
+            }
+        data.append(item)
+    return data
@@ -36,4 +36,4 @@ class TagFilter(FilterSet):
     def get_is_in_shopping_cart(self, queryset, name, value):
         if self.request.user.is_authenticated and value is True:
             return queryset.filter(shopping_cart__user=self.request.user)
-        return
+        return queryset
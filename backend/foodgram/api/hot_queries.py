@@ -0,0 +1,129 @@
+from django.db.models import Sum
+from django.utils import timezone
+
+from recipes.models import (AuthorDailyStats, FavoriteRecipe,
+                            IngredientWithAmount, Recipe, RecipeDailyStats,
+                            ShoppingCart)
+from users.models import Follow
+from .changes import stream_queryset
+
+# Запросы в той форме, в которой их строят api/views.py, api/filters.py
+# и api/serializers.py. Команда explain_hot_queries прогоняет каждый через
+# EXPLAIN: добавляя новый фильтр или сортировку, регистрируйте запрос здесь.
+HOT_QUERIES = {}
+
+SAMPLE_ID = 1
+PAGE_SIZE = 6
+
+
+def hot_query(name):
+    def decorator(func):
+        HOT_QUERIES[name] = func
+        return func
+    return decorator
+
+
+@hot_query('recipe_list')
+def recipe_list():
+    return Recipe.objects.all()[:PAGE_SIZE]
+
+
+@hot_query('recipe_list_by_author')
+def recipe_list_by_author():
+    return Recipe.objects.filter(author_id=SAMPLE_ID)[:PAGE_SIZE]
+
+
+@hot_query('recipe_list_by_tags')
+def recipe_list_by_tags():
+    return Recipe.objects.filter(
+        tags__slug__in=['breakfast']
+    ).distinct()[:PAGE_SIZE]
+
+
+@hot_query('recipe_list_favorited')
+def recipe_list_favorited():
+    return Recipe.objects.filter(
+        users_favorites__user_id=SAMPLE_ID
+    )[:PAGE_SIZE]
+
+
+@hot_query('recipe_list_in_shopping_cart')
+def recipe_list_in_shopping_cart():
+    return Recipe.objects.filter(
+        shopping_cart__user_id=SAMPLE_ID
+    )[:PAGE_SIZE]
+
+
+@hot_query('recipe_is_favorited')
+def recipe_is_favorited():
+    return FavoriteRecipe.objects.filter(
+        user_id=SAMPLE_ID, recipe_id=SAMPLE_ID
+    )
+
+
+@hot_query('recipe_is_in_shopping_cart')
+def recipe_is_in_shopping_cart():
+    return ShoppingCart.objects.filter(
+        user_id=SAMPLE_ID, recipe_id=SAMPLE_ID
+    )
+
+
+@hot_query('recipe_ingredients')
+def recipe_ingredients():
+    return IngredientWithAmount.objects.filter(
+        recipe_id=SAMPLE_ID
+    ).select_related('ingredient')
+
+
+@hot_query('user_is_subscribed')
+def user_is_subscribed():
+    return Follow.objects.filter(user_id=SAMPLE_ID, author_id=SAMPLE_ID)
+
+
+@hot_query('subscriptions')
+def subscriptions():
+    return Follow.objects.filter(user_id=SAMPLE_ID)[:PAGE_SIZE]
+
+
+@hot_query('download_shopping_cart')
+def download_shopping_cart():
+    return IngredientWithAmount.objects.filter(
+        recipe__shopping_cart__user_id=SAMPLE_ID
+    ).values(
+        'ingredient__name', 'ingredient__measurement_unit'
+    ).order_by(
+        'ingredient__name'
+    ).annotate(ingredient_total=Sum('amount'))
+
+
+@hot_query('recipe_changes')
+def recipe_changes():
+    now = timezone.now()
+    return stream_queryset('changed', (now, SAMPLE_ID), now)[:PAGE_SIZE]
+
+
+@hot_query('recipe_tombstones')
+def recipe_tombstones():
+    now = timezone.now()
+    return stream_queryset('deleted', (now, SAMPLE_ID), now)[:PAGE_SIZE]
+
+
+@hot_query('author_daily_stats')
+def author_daily_stats():
+    today = timezone.localdate()
+    return AuthorDailyStats.objects.filter(
+        author_id=SAMPLE_ID, day__range=(today, today)
+    ).values('day', 'favorites', 'shopping_carts', 'followers')
+
+
+@hot_query('author_top_recipes')
+def author_top_recipes():
+    today = timezone.localdate()
+    return RecipeDailyStats.objects.filter(
+        author_id=SAMPLE_ID, day__range=(today, today)
+    ).values('recipe', 'recipe__name').annotate(
+        period_favorites=Sum('favorites'),
+        period_shopping_carts=Sum('shopping_carts'),
+    ).order_by('-period_favorites', '-period_shopping_carts', 'recipe')[
+        :PAGE_SIZE
+    ]
@@ -0,0 +1,161 @@
+import json
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Max, Min
+
+from foodgram.db import table_row_count
+from foodgram.partitioning import partition_count
+from recipes.models import FavoriteRecipe, IngredientWithAmount, ShoppingCart
+from users.models import Follow
+from .run_benchmarks import percentile
+
+# Выборки по ключу секционирования в той форме, в которой их делает API.
+LOOKUPS = {
+    FavoriteRecipe: ('user_id', lambda key: FavoriteRecipe.objects.filter(
+        user_id=key
+    ).values_list('recipe_id', flat=True)),
+    ShoppingCart: ('user_id', lambda key: ShoppingCart.objects.filter(
+        user_id=key
+    ).values_list('recipe_id', flat=True)),
+    Follow: ('user_id', lambda key: Follow.objects.filter(
+        user_id=key
+    ).values_list('author_id', flat=True)[:6]),
+    IngredientWithAmount: (
+        'recipe_id', lambda key: IngredientWithAmount.objects.filter(
+            recipe_id=key
+        ).values_list('ingredient_id', 'amount')
+    ),
+}
+COMPARED_METRICS = ('table_kb', 'index_kb', 'p50_ms', 'p95_ms')
+
+
+def postgres_sizes(table):
+    # Секционированная таблица сама данных не хранит: размеры суммируются
+    # по секциям.
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT coalesce(sum(pg_table_size(relid)), 0), '
+            'coalesce(sum(pg_indexes_size(relid)), 0) FROM ('
+            'SELECT to_regclass(%s) AS relid UNION ALL '
+            'SELECT inhrelid FROM pg_inherits '
+            'WHERE inhparent = to_regclass(%s)) AS relations',
+            [table, table]
+        )
+        return cursor.fetchone()
+
+
+def sqlite_sizes(table):
+    # Размеры страниц из виртуальной таблицы dbstat, если SQLite собран с
+    # ней.
+    with connection.cursor() as cursor:
+        try:
+            cursor.execute(
+                'SELECT coalesce(sum(pgsize), 0) FROM dbstat WHERE name = %s',
+                [table]
+            )
+        except Exception:
+            return None, None
+        table_size = cursor.fetchone()[0]
+        cursor.execute(
+            'SELECT coalesce(sum(pgsize), 0) FROM dbstat WHERE name IN ('
+            "SELECT name FROM sqlite_master WHERE type = 'index' "
+            'AND tbl_name = %s)',
+            [table]
+        )
+        return table_size, cursor.fetchone()[0]
+
+
+def table_sizes(table):
+    if connection.vendor == 'postgresql':
+        return postgres_sizes(table)
+    if connection.vendor == 'sqlite':
+        return sqlite_sizes(table)
+    return None, None
+
+
+def kilobytes(size):
+    return None if size is None else round(size / 1024, 1)
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет размер таблиц связей и их индексов и задержку выборок '
+        'по ключу секционирования. Запустите до и после секционирования '
+        '(DB_PARTITIONS) и сравните результаты через --baseline'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--samples', type=int, default=200,
+                            help='Число выборок на таблицу')
+        parser.add_argument('--seed', type=int, default=1,
+                            help='Зерно для выбора ключей')
+        parser.add_argument('--output', default='partitions-report.json',
+                            help='Файл для результатов')
+        parser.add_argument('--baseline',
+                            help='Файл прошлого замера для сравнения')
+
+    def handle(self, *args, **options):
+        results = {}
+        for model, (key, lookup) in LOOKUPS.items():
+            table = model._meta.db_table
+            results[table] = self.measure(model, key, lookup, options)
+            self.stdout.write(self.format_result(table, results[table]))
+        report = {'vendor': connection.vendor, 'results': results}
+        with open(options['output'], 'w') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        self.stdout.write(f'Результаты записаны в {options["output"]}')
+        if options['baseline']:
+            self.compare(report, options['baseline'])
+
+    def measure(self, model, key, lookup, options):
+        table = model._meta.db_table
+        model_keys = model.objects.aggregate(low=Min(key), high=Max(key))
+        rows, _ = table_row_count(table)
+        table_size, index_size = table_sizes(table)
+        result = {
+            'partitions': partition_count(connection, table),
+            'rows': rows,
+            'table_kb': kilobytes(table_size),
+            'index_kb': kilobytes(index_size),
+        }
+        if model_keys['low'] is None:
+            return result
+        generator = random.Random(options['seed'])
+        keys = [
+            generator.randint(model_keys['low'], model_keys['high'])
+            for _ in range(options['samples'])
+        ]
+        timings = []
+        for value in keys:
+            started = time.perf_counter()
+            list(lookup(value))
+            timings.append((time.perf_counter() - started) * 1000)
+        result.update(
+            p50_ms=round(percentile(timings, 50), 3),
+            p95_ms=round(percentile(timings, 95), 3),
+        )
+        return result
+
+    def format_result(self, table, result):
+        return (
+            f'{table}: секций {result["partitions"]}, '
+            f'строк {result["rows"]}, таблица {result["table_kb"]} КБ, '
+            f'индексы {result["index_kb"]} КБ, '
+            f'p50 {result.get("p50_ms")} мс, p95 {result.get("p95_ms")} мс'
+        )
+
+    def compare(self, report, baseline_path):
+        with open(baseline_path) as file:
+            baseline = json.load(file)
+        for table, result in report['results'].items():
+            before = baseline['results'].get(table)
+            if before is None:
+                continue
+            changes = ', '.join(
+                f'{metric} {before.get(metric)} -> {result.get(metric)}'
+                for metric in COMPARED_METRICS
+            )
+            self.stdout.write(f'{table}: {changes}')
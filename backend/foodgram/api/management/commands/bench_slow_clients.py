@@ -0,0 +1,111 @@
+import asyncio
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from foodgram.asgi_handler import ASGIHandler, WSGIInstance
+
+DEFAULT_PATHS = ('/api/tags/', '/api/ingredients/', '/api/recipes/')
+
+
+def make_scope(path):
+    return {
+        'type': 'http',
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'root_path': '',
+        'query_string': b'',
+        'headers': [(b'host', b'testserver')],
+        'server': ('testserver', 80),
+        'client': ('127.0.0.1', 0),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает синхронный пул воркеров и ASGI-режим на медленных '
+        'клиентах: каждый клиент медленно отправляет запрос и медленно '
+        'читает ответ'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--clients', type=int, default=200,
+            help='Число одновременных клиентов'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=8,
+            help='Число синхронных воркеров и потоков ASGI-пула'
+        )
+        parser.add_argument(
+            '--delay', type=float, default=0.2,
+            help='Задержка клиента на чтение запроса и на приём ответа, с'
+        )
+        parser.add_argument(
+            '--path', action='append', dest='paths',
+            help='Эндпоинт для проверки, можно указать несколько раз'
+        )
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or DEFAULT_PATHS
+        with override_settings(
+            ALLOWED_HOSTS=['testserver'],
+            ASGI_THREADS=options['workers'],
+            ASGI_READ_THREADS=options['workers'],
+        ):
+            handler = ASGIHandler()
+            for path in paths:
+                self.report(path, 'wsgi', self.bench_wsgi(
+                    handler, path, options
+                ), options['clients'])
+                self.report(path, 'asgi', asyncio.run(self.bench_asgi(
+                    handler, path, options
+                )), options['clients'])
+
+    def report(self, path, mode, elapsed, clients):
+        self.stdout.write(
+            f'{path} {mode}: {elapsed:.2f} с, {clients / elapsed:.1f} rps'
+        )
+
+    def bench_wsgi(self, handler, path, options):
+        # Синхронный воркер занят клиентом целиком: пока тот досылает
+        # запрос и дочитывает ответ, другие запросы ждут в очереди.
+        delay = options['delay']
+
+        def serve():
+            time.sleep(delay)
+            instance = WSGIInstance(handler.wsgi_handler, None)
+            instance.scope = make_scope(path)
+            instance.run(io.BytesIO())
+            time.sleep(delay)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            for future in [
+                pool.submit(serve) for _ in range(options['clients'])
+            ]:
+                future.result()
+        return time.perf_counter() - started
+
+    async def bench_asgi(self, handler, path, options):
+        delay = options['delay']
+
+        async def client():
+            async def receive():
+                await asyncio.sleep(delay)
+                return {'type': 'http.request', 'body': b''}
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    await asyncio.sleep(delay)
+
+            await handler(make_scope(path), receive, send)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(options['clients'])))
+        return time.perf_counter() - started
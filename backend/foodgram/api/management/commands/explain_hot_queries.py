@@ -0,0 +1,67 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from api.hot_queries import HOT_QUERIES
+from foodgram.db import estimated_row_count
+
+SEQ_SCAN_PATTERNS = {
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+    'sqlite': re.compile(r'\bSCAN (?:TABLE )?(\w+)(?!.*\bUSING\b)'),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет EXPLAIN для зарегистрированных горячих запросов и '
+        'завершается ошибкой при последовательном сканировании '
+        'большой таблицы'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-rows', type=int, default=1000,
+            help='Таблица считается большой начиная с этого числа строк'
+        )
+        parser.add_argument(
+            '--query', action='append', dest='queries',
+            help='Проверить только указанные запросы'
+        )
+        parser.add_argument(
+            '--show-plans', action='store_true',
+            help='Печатать планы запросов целиком'
+        )
+
+    def handle(self, *args, **options):
+        pattern = SEQ_SCAN_PATTERNS.get(connection.vendor)
+        if pattern is None:
+            raise CommandError(
+                f'СУБД {connection.vendor} не поддерживается'
+            )
+        names = options['queries'] or sorted(HOT_QUERIES)
+        unknown = set(names) - set(HOT_QUERIES)
+        if unknown:
+            raise CommandError(
+                'Неизвестные запросы: ' + ', '.join(sorted(unknown))
+            )
+        row_counts = {}
+        failures = []
+        for name in names:
+            plan = HOT_QUERIES[name]().explain()
+            if options['show_plans']:
+                self.stdout.write(f'-- {name}\n{plan}\n')
+            for table in sorted(set(pattern.findall(plan))):
+                if table not in row_counts:
+                    row_counts[table] = estimated_row_count(table)
+                if row_counts[table] >= options['min_rows']:
+                    failures.append(
+                        f'{name}: seq scan по {table} '
+                        f'(~{row_counts[table]} строк)'
+                    )
+        if failures:
+            raise CommandError('\n'.join(failures))
+        self.stdout.write(self.style.SUCCESS(
+            f'Проверено запросов: {len(names)}, '
+            'последовательных сканирований больших таблиц нет'
+        ))
@@ -0,0 +1,171 @@
+import json
+import math
+import platform
+import time
+import tracemalloc
+
+import django
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from api.benchmarks import SCENARIOS, BenchmarkContext, BenchmarkError
+from foodgram.db import require_disposable_database
+from recipes.models import Recipe
+from users.models import CustomUser
+
+PERCENTILES = (50, 90, 95, 99)
+# Метрики, по которым результат сравнивается с эталоном. Число запросов
+# детерминировано и сравнивается без допуска.
+COMPARED_METRICS = ('p50_ms', 'p95_ms', 'queries', 'alloc_peak_kb')
+# Разница меньше миллисекунды — шум таймера, а не регрессия.
+LATENCY_SLACK_MS = 1
+
+
+def percentile(values, percent):
+    ordered = sorted(values)
+    return ordered[max(math.ceil(percent / 100 * len(ordered)) - 1, 0)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогоняет сценарии api/benchmarks.py через тестовый клиент, '
+        'сохраняет задержки, число запросов и аллокации в JSON и '
+        'сравнивает их с эталоном'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scenario', action='append', dest='scenarios',
+            help='Запустить только указанные сценарии'
+        )
+        parser.add_argument('--iterations', type=int, default=30,
+                            help='Число замеряемых итераций сценария')
+        parser.add_argument('--warmup', type=int, default=3,
+                            help='Число итераций прогрева')
+        parser.add_argument('--output', default='bench-results.json',
+                            help='Файл для результатов')
+        parser.add_argument('--baseline',
+                            help='Файл эталонных результатов для сравнения')
+        parser.add_argument(
+            '--margin', type=float, default=0.25,
+            help='Допустимое превышение эталона, доля (0.25 — 25%%)'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            require_disposable_database()
+        except ImproperlyConfigured as error:
+            raise CommandError(error)
+        names = options['scenarios'] or list(SCENARIOS)
+        unknown = set(names) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(
+                'Неизвестные сценарии: ' + ', '.join(sorted(unknown))
+            )
+        try:
+            context = BenchmarkContext()
+        except BenchmarkError as error:
+            raise CommandError(error)
+        results = {}
+        # Сценарии бьют в один маршрут подряд и упёрлись бы в троттлинг.
+        try:
+            with override_settings(THROTTLE_ENABLED=False):
+                self.run_scenarios(names, context, options, results)
+        except BenchmarkError as error:
+            raise CommandError(error)
+        finally:
+            context.cleanup()
+        report = {'meta': self.meta(options), 'results': results}
+        with open(options['output'], 'w') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        self.stdout.write(f'Результаты записаны в {options["output"]}')
+        if options['baseline']:
+            self.compare(report, options['baseline'], options['margin'])
+
+    def run_scenarios(self, names, context, options, results):
+        for name in names:
+            results[name] = self.measure(SCENARIOS[name], context, options)
+            self.stdout.write(self.format_result(name, results[name]))
+
+    def measure(self, func, context, options):
+        for _ in range(options['warmup']):
+            func(context)
+        timings = []
+        for _ in range(options['iterations']):
+            started = time.perf_counter()
+            func(context)
+            timings.append((time.perf_counter() - started) * 1000)
+        # Запросы и память меряются отдельной итерацией, чтобы их учёт не
+        # искажал задержки.
+        tracemalloc.start()
+        try:
+            with CaptureQueriesContext(connection) as queries:
+                func(context)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        result = {
+            f'p{percent}_ms': round(percentile(timings, percent), 3)
+            for percent in PERCENTILES
+        }
+        result.update(
+            mean_ms=round(sum(timings) / len(timings), 3),
+            max_ms=round(max(timings), 3),
+            queries=len(queries),
+            alloc_peak_kb=round(peak / 1024, 1),
+        )
+        return result
+
+    def format_result(self, name, result):
+        return (
+            f'{name}: p50 {result["p50_ms"]} мс, p95 {result["p95_ms"]} мс, '
+            f'запросов {result["queries"]}, '
+            f'пик памяти {result["alloc_peak_kb"]} КБ'
+        )
+
+    def meta(self, options):
+        return {
+            'vendor': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'users': CustomUser.objects.count(),
+            'recipes': Recipe.objects.count(),
+            'iterations': options['iterations'],
+        }
+
+    def compare(self, report, baseline_path, margin):
+        with open(baseline_path) as file:
+            baseline = json.load(file)
+        if baseline['meta']['vendor'] != report['meta']['vendor']:
+            raise CommandError(
+                f'Эталон снят на {baseline["meta"]["vendor"]}, а не на '
+                f'{report["meta"]["vendor"]}'
+            )
+        regressions = []
+        for name, result in report['results'].items():
+            expected = baseline['results'].get(name)
+            if expected is None:
+                continue
+            for metric in COMPARED_METRICS:
+                limit = self.limit(metric, expected[metric], margin)
+                if result[metric] > limit:
+                    regressions.append(
+                        f'{name}.{metric}: {result[metric]} при эталоне '
+                        f'{expected[metric]} (предел {limit:g})'
+                    )
+        if regressions:
+            raise CommandError(
+                'Превышен эталон:\n' + '\n'.join(regressions)
+            )
+        self.stdout.write(self.style.SUCCESS('Эталон не превышен'))
+
+    def limit(self, metric, expected, margin):
+        if metric == 'queries':
+            return expected
+        limit = expected * (1 + margin)
+        if metric.endswith('_ms'):
+            limit = max(limit, expected + LATENCY_SLACK_MS)
+        return limit
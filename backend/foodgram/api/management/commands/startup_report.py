@@ -0,0 +1,82 @@
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Запускается отдельный интерпретатор с -X importtime: он импортирует
+# приложение так же, как gunicorn (foodgram.wsgi), и выполняет прогрев.
+STARTUP_SCRIPT = '''
+import json, time
+started = time.perf_counter()
+import foodgram.wsgi
+loaded = time.perf_counter() - started
+from foodgram.warmup import warm_up
+print(json.dumps({'load': loaded, 'warmup': warm_up()}))
+'''
+
+
+def parse_importtime(output):
+    # Строки вида "import time: self [us] | cumulative | name"; время
+    # модуля без вложенных импортов складывается по пакету верхнего уровня.
+    packages = defaultdict(int)
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        columns = line[len('import time:'):].split('|')
+        if len(columns) != 3 or not columns[0].strip().isdigit():
+            continue
+        package = columns[2].strip().split('.')[0]
+        packages[package] += int(columns[0])
+    return packages
+
+
+class Command(BaseCommand):
+    help = (
+        'Показывает время импорта по приложениям и пакетам и время шагов '
+        'прогрева при запуске'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top', type=int, default=20,
+            help='Сколько самых медленных пакетов показать'
+        )
+
+    def handle(self, *args, **options):
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', STARTUP_SCRIPT],
+            capture_output=True, text=True, env=dict(
+                os.environ, DJANGO_SETTINGS_MODULE='foodgram.settings'
+            )
+        )
+        if result.returncode:
+            raise CommandError(result.stderr[-2000:])
+        report = json.loads(result.stdout.strip().splitlines()[-1])
+        packages = parse_importtime(result.stderr)
+        self.stdout.write(
+            f'Загрузка foodgram.wsgi: {report["load"] * 1000:.1f} мс, '
+            f'импорт всех модулей: {sum(packages.values()) / 1000:.1f} мс'
+        )
+        self.stdout.write('Импорт по пакетам:')
+        ranked = sorted(packages.items(), key=lambda item: -item[1])
+        for package, microseconds in ranked[:options['top']]:
+            self.stdout.write(
+                f'  {package:<24} {microseconds / 1000:8.1f} мс  '
+                f'{self.package_kind(package)}'
+            )
+        self.stdout.write('Прогрев:')
+        for name, seconds in report['warmup'].items():
+            self.stdout.write(f'  {name:<24} {seconds * 1000:8.1f} мс')
+
+    def package_kind(self, package):
+        if os.path.isdir(os.path.join(settings.BASE_DIR, package)):
+            return 'проект'
+        if any(config.name.split('.')[0] == package
+               for config in apps.get_app_configs()):
+            return 'приложение'
+        return 'библиотека'
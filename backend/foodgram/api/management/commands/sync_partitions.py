@@ -0,0 +1,37 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from foodgram.partitioning import (PARTITION_KEYS, partitioning_supported,
+                                   sync_partitions)
+
+
+class Command(BaseCommand):
+    help = (
+        'Приводит таблицы связей к числу секций из DB_PARTITIONS после '
+        'миграций: секционирует, меняет число секций или возвращает '
+        'обычные таблицы. Таблицы заблокированы, пока переносятся данные'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--partitions', type=int,
+            help='Число секций вместо DB_PARTITIONS; 0 — обычные таблицы'
+        )
+
+    def handle(self, *args, **options):
+        if not partitioning_supported(connection):
+            raise CommandError('Секционирование доступно в PostgreSQL 11+')
+        partitions = options['partitions']
+        if partitions is not None and partitions < 0:
+            raise CommandError('Число секций не может быть отрицательным')
+        rebuilt = []
+        with connection.schema_editor() as schema_editor:
+            for app_label in PARTITION_KEYS:
+                rebuilt += sync_partitions(
+                    apps, schema_editor, app_label, partitions
+                )
+        self.stdout.write(self.style.SUCCESS(
+            'Пересозданы: ' + ', '.join(rebuilt) if rebuilt
+            else 'Таблицы уже соответствуют настройке'
+        ))
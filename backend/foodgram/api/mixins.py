@@ -0,0 +1,203 @@
+import gzip
+import hashlib
+import re
+from collections import OrderedDict
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+from rest_framework.serializers import ListSerializer
+
+from foodgram.counters import get_counters
+from foodgram.db import (disable_replica_reads, enable_replica_reads,
+                         is_pinned_to_primary, replica_configured)
+from .throttling import (EXPENSIVE_SCOPE, ServiceOverloaded,
+                         get_concurrency_limiter, get_throttle_scope)
+
+FIELDS_PARAM = 'fields'
+OMIT_PARAM = 'omit'
+ACCEPTS_GZIP = re.compile(r'\bgzip\b')
+
+
+def parse_field_names(value):
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+class SparseFieldsViewMixin:
+    # Разбирает ?fields= и ?omit= для чтения. Вьюсет объявляет
+    # sparse_fields и по get_requested_fields() решает, какие
+    # select_related, prefetch и аннотации нужны запросу.
+    sparse_fields = ()
+
+    def get_requested_fields(self):
+        if not hasattr(self, '_requested_fields'):
+            params = self.request.query_params
+            fields = None
+            if self.request.method in SAFE_METHODS and (
+                FIELDS_PARAM in params or OMIT_PARAM in params
+            ):
+                fields = set(self.sparse_fields)
+                requested = parse_field_names(params.get(FIELDS_PARAM, ''))
+                omitted = parse_field_names(params.get(OMIT_PARAM, ''))
+                self.check_field_names(fields, FIELDS_PARAM, requested)
+                self.check_field_names(fields, OMIT_PARAM, omitted)
+                if requested:
+                    fields &= requested
+                fields -= omitted
+            self._requested_fields = fields
+        return self._requested_fields
+
+    def check_field_names(self, fields, param, names):
+        unknown = names - fields
+        if unknown:
+            raise ValidationError({param: [
+                'Неизвестные поля: ' + ', '.join(sorted(unknown))
+            ]})
+
+    def is_field_requested(self, name):
+        fields = self.get_requested_fields()
+        return fields is None or name in fields
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['requested_fields'] = self.get_requested_fields()
+        return context
+
+
+class SparseFieldsSerializerMixin:
+    # Оставляет только поля из context['requested_fields']; вложенные
+    # сериализаторы отдаются целиком.
+
+    def get_fields(self):
+        fields = super().get_fields()
+        requested = self.context.get('requested_fields')
+        parent = self.parent
+        if isinstance(parent, ListSerializer):
+            parent = parent.parent
+        if requested is None or parent is not None:
+            return fields
+        return OrderedDict(
+            (name, field) for name, field in fields.items()
+            if name in requested
+        )
+
+
+class ReplicaReadMixin:
+    # Безопасные запросы читают с реплики, если она настроена и
+    # пользователь не закреплён за основной базой после своей записи.
+    # Аутентификация в initial() ещё идёт через основную базу.
+    _replica_token = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        user = request.user
+        if (request.method in SAFE_METHODS and replica_configured()
+                and not (user.is_authenticated
+                         and is_pinned_to_primary(request, user))):
+            self._replica_token = enable_replica_reads()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if self._replica_token is not None:
+            disable_replica_reads(self._replica_token)
+            self._replica_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class LoadSheddingMixin:
+    # Дорогие запросы (выгрузки, создание рецептов с картинками, глубокие
+    # страницы) выполняются не больше EXPENSIVE_CONCURRENCY одновременно
+    # на все воркеры; остальные сразу получают 503 с Retry-After.
+    _slot = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if get_throttle_scope(request, self) != EXPENSIVE_SCOPE:
+            return
+        self._limiter = get_concurrency_limiter()
+        self._slot = self._limiter.acquire()
+        if self._slot is None:
+            raise ServiceOverloaded(settings.EXPENSIVE_RETRY_AFTER)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if self._slot is not None:
+            self._limiter.release(self._slot)
+            self._slot = None
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class AnonymousListCacheMixin:
+    # Список для анонима целиком определяется строкой запроса, поэтому
+    # готовый ответ хранится в кэше сжатым gzip под ключом из
+    # нормализованных параметров и версии get_list_version(); смена версии
+    # разом устаревает все страницы. Клиент, принимающий gzip, получает
+    # тело без распаковки. Авторизованные пользователи и запросы с
+    # параметрами не из list_cache_params идут мимо кэша. Версию меняют и
+    # другие процессы (run_worker), поэтому кэш включается только с общим
+    # кэшем (CACHE_SHARED).
+    list_cache_name = None
+    list_cache_params = ()
+    _list_cache_key = None
+
+    def get_list_version(self):
+        raise NotImplementedError
+
+    @property
+    def list_cache_counters(self):
+        return get_counters(self.list_cache_name)
+
+    def get_list_cache_key(self, request):
+        params = request.query_params
+        if (request.user.is_authenticated
+                or not settings.CACHE_SHARED
+                or not settings.RECIPE_LIST_CACHE_TIMEOUT
+                or request.accepted_renderer.format != 'json'
+                or set(params) - set(self.list_cache_params)):
+            return None
+        query = urlencode(sorted(
+            (name, sorted(params.getlist(name))) for name in params
+        ), doseq=True)
+        # Ссылки next и previous в ответе абсолютные.
+        digest = hashlib.sha1(
+            f'{request.build_absolute_uri("/")}?{query}'.encode()
+        ).hexdigest()
+        return f'{self.list_cache_name}:{self.get_list_version()}:{digest}'
+
+    def list(self, request, *args, **kwargs):
+        self._list_cache_key = self.get_list_cache_key(request)
+        if self._list_cache_key is None:
+            return super().list(request, *args, **kwargs)
+        cached = cache.get(self._list_cache_key)
+        if cached is None:
+            self.list_cache_counters.miss()
+            return super().list(request, *args, **kwargs)
+        self.list_cache_counters.hit()
+        content_type, body = cached
+        if ACCEPTS_GZIP.search(request.META.get('HTTP_ACCEPT_ENCODING', '')):
+            response = HttpResponse(body, content_type=content_type)
+            response['Content-Encoding'] = 'gzip'
+        else:
+            response = HttpResponse(
+                gzip.decompress(body), content_type=content_type
+            )
+        return response
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        key, self._list_cache_key = self._list_cache_key, None
+        if key is None:
+            return response
+        # Тот же адрес из кэша может прийти сжатым.
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if isinstance(response, Response) and response.status_code == 200:
+            response.render()
+            cache.set(key, (
+                response['Content-Type'], gzip.compress(response.content)
+            ), settings.RECIPE_LIST_CACHE_TIMEOUT)
+        return response
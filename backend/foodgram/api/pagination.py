@@ -1,6 +1,49 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+
+from foodgram.paginators import EstimatedCountPaginator
 
 
 class CustomPageNumberPagination(PageNumberPagination):
+    # count для больших выборок без фильтров приблизительный, об этом
+    # говорит count_estimated в ответе.
+    page_size = 6
+    page_size_query_param = 'limit'
+    django_paginator_class = EstimatedCountPaginator
+
+    def get_paginated_response(self, data):
+        paginator = self.page.paginator
+        return Response({
+            'count': paginator.count,
+            'count_estimated': paginator.count_estimated,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+
+class IdCursorPagination(CursorPagination):
     page_size = 6
     page_size_query_param = 'limit'
+    ordering = 'id'
+
+
+class UserPagination(CustomPageNumberPagination):
+    # Постраничная выдача как у остальных списков; с ?cursor= переключается
+    # на курсор по id, которому не нужен COUNT(*) и OFFSET по всей таблице.
+    cursor_query_param = 'cursor'
+    cursor_pagination_class = IdCursorPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        if self.cursor_query_param in request.query_params:
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
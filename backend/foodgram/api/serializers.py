@@ -1,11 +1,14 @@
 from django.db import transaction
+from django.db.models import OuterRef, Subquery
 from djoser.serializers import UserSerializer
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers, validators
 
 from recipes.models import (FavoriteRecipe, Ingredient, IngredientWithAmount,
                             Recipe, ShoppingCart, Tag)
+from recipes.snapshots import get_document
 from users.models import CustomUser, Follow
+from .mixins import SparseFieldsSerializerMixin
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -67,7 +70,7 @@ class AddIngredientSerializer(serializers.ModelSerializer):
         )
 
 
-class CustomUserSerializer(UserSerializer):
+class CustomUserSerializer(SparseFieldsSerializerMixin, UserSerializer):
     is_subscribed = serializers.SerializerMethodField()
 
     class Meta(UserSerializer.Meta):
@@ -82,6 +85,8 @@ class CustomUserSerializer(UserSerializer):
         )
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         request = self.context.get('request')
         if request is None or request.user.is_anonymous:
             return False
@@ -130,6 +135,70 @@ class RecipeSerializer(serializers.ModelSerializer):
         return self.in_list(obj, ShoppingCart)
 
 
+RECIPE_FIELDS = (
+    'id',
+    'tags',
+    'author',
+    'name',
+    'image',
+    'text',
+    'ingredients',
+    'is_favorited',
+    'is_in_shopping_cart',
+    'cooking_time'
+)
+RECIPE_SNAPSHOT_FIELDS = frozenset(RECIPE_FIELDS) - {
+    'id', 'is_favorited', 'is_in_shopping_cart'
+}
+
+
+def represent_recipe(document, request=None, fields=None, is_favorited=False,
+                     is_in_shopping_cart=False, is_subscribed=False):
+    image = document.get('image')
+    if image and request is not None:
+        image = request.build_absolute_uri(image)
+    author = document.get('author')
+    if author is not None:
+        author = {**author, 'is_subscribed': is_subscribed}
+    data = {
+        'id': document['id'],
+        'tags': document.get('tags'),
+        'author': author,
+        'name': document.get('name'),
+        'image': image,
+        'text': document.get('text'),
+        'ingredients': document.get('ingredients'),
+        'is_favorited': is_favorited,
+        'is_in_shopping_cart': is_in_shopping_cart,
+        'cooking_time': document.get('cooking_time'),
+    }
+    if fields is None:
+        return data
+    return {name: value for name, value in data.items() if name in fields}
+
+
+class RecipeSnapshotSerializer(serializers.BaseSerializer):
+    # Форма RecipeSerializer, собранная из снимка рецепта; флаги
+    # пользователя приходят аннотациями из RecipeViewSet.get_queryset.
+
+    def to_representation(self, instance):
+        fields = self.context.get('requested_fields')
+        if fields is None or fields & RECIPE_SNAPSHOT_FIELDS:
+            document = get_document(instance)
+        else:
+            document = {'id': instance.pk}
+        return represent_recipe(
+            document,
+            self.context.get('request'),
+            fields,
+            is_favorited=getattr(instance, 'is_favorited', False),
+            is_in_shopping_cart=getattr(
+                instance, 'is_in_shopping_cart', False
+            ),
+            is_subscribed=getattr(instance, 'is_subscribed', False),
+        )
+
+
 class AddRecipeSerializer(serializers.ModelSerializer):
     tags = serializers.PrimaryKeyRelatedField(
         queryset=Tag.objects.all(),
@@ -273,7 +342,34 @@ class SubscribeSerializer(serializers.ModelSerializer):
         return data
 
 
-class FollowSerializer(serializers.ModelSerializer):
+def get_recipes_limit(request):
+    value = request.query_params.get('recipes_limit')
+    if not value:
+        return None
+    if not value.isdigit():
+        raise serializers.ValidationError(
+            {'recipes_limit': 'Ожидается целое неотрицательное число.'}
+        )
+    return int(value)
+
+
+def limit_recipes_per_author(queryset, recipes_limit):
+    # Первые recipes_limit рецептов каждого автора отбираются в базе
+    # подзапросом по индексу (author, -pub_date), а не обрезкой в Python
+    # после загрузки всех рецептов.
+    if recipes_limit is None:
+        return queryset
+    if not recipes_limit:
+        return queryset.none()
+    return queryset.filter(pk__in=Subquery(
+        Recipe.objects.filter(
+            author=OuterRef('author')
+        ).values('pk')[:recipes_limit]
+    ))
+
+
+class FollowSerializer(SparseFieldsSerializerMixin,
+                       serializers.ModelSerializer):
     email = serializers.ReadOnlyField(source='author.email')
     id = serializers.ReadOnlyField(source='author.id')
     username = serializers.ReadOnlyField(source='author.username')
@@ -291,6 +387,8 @@ class FollowSerializer(serializers.ModelSerializer):
         )
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         request = self.context.get('request')
         return Follow.objects.filter(
             author=obj.author, user=request.user
@@ -298,17 +396,20 @@ class FollowSerializer(serializers.ModelSerializer):
 
     def get_recipes(self, obj):
         request = self.context.get('request')
-        if request.GET.get('recipes_limit'):
-            recipes_limit = int(request.GET.get('recipes_limit'))
-            queryset = Recipe.objects.filter(
-                author=obj.author)[:recipes_limit]
+        if 'recipes' in getattr(obj.author, '_prefetched_objects_cache', {}):
+            # Предвыборка уже ограничена limit_recipes_per_author.
+            queryset = obj.author.recipes.all()
         else:
-            queryset = Recipe.objects.filter(
-                author=obj.author)
+            queryset = Recipe.objects.filter(author=obj.author)
+            recipes_limit = get_recipes_limit(request)
+            if recipes_limit is not None:
+                queryset = queryset[:recipes_limit]
         serializer = RecipeShortSerializer(
             queryset, read_only=True, many=True
         )
         return serializer.data
 
     def get_recipes_count(self, obj):
+        if hasattr(obj, 'recipes_count'):
+            return obj.recipes_count
         return obj.author.recipes.all().count()
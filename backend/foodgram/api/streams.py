@@ -0,0 +1,213 @@
+import asyncio
+import json
+from urllib.parse import parse_qs
+
+from django.conf import settings
+from django.core import signing
+from django.db import close_old_connections
+from rest_framework.exceptions import AuthenticationFailed
+
+from foodgram.pubsub import hub
+from recipes.events import author_channel, recipe_event
+from recipes.models import Recipe
+from users.models import CustomUser, Follow
+from .authentication import CachedTokenAuthentication
+
+# Поток server-sent events о новых рецептах авторов, на которых подписан
+# пользователь. Работает только под ASGI (foodgram/asgi.py): соединение
+# держит корутина с очередью, а не поток воркера. Клиент авторизуется
+# заголовком Authorization: Token <ключ> или, из браузерного EventSource,
+# который не умеет заголовки, подписанным токеном ?token= с
+# /api/recipes/events/token/. После обрыва EventSource шлёт Last-Event-ID,
+# и пропущенные рецепты досылаются из базы. Подписки пользователя
+# перечитываются раз в SSE_FOLLOWS_REFRESH секунд.
+EVENTS_TOKEN_SALT = 'api.streams.recipe_events'
+
+
+def make_events_token(user):
+    return signing.dumps({'user': user.pk}, salt=EVENTS_TOKEN_SALT)
+
+
+def authenticate_events_token(token):
+    try:
+        payload = signing.loads(token, salt=EVENTS_TOKEN_SALT,
+                                max_age=settings.SSE_TOKEN_MAX_AGE)
+    except signing.SignatureExpired:
+        raise AuthenticationFailed('Срок действия токена истёк.')
+    except signing.BadSignature:
+        raise AuthenticationFailed('Недопустимый токен.')
+    user = CustomUser.objects.filter(
+        pk=payload['user'], is_active=True
+    ).first()
+    if user is None:
+        raise AuthenticationFailed('Пользователь неактивен или удален.')
+    return user
+
+
+def authenticate(headers, query):
+    auth = headers.get(b'authorization', b'').split()
+    if len(auth) == 2 and auth[0].lower() == b'token':
+        user, _ = CachedTokenAuthentication().authenticate_credentials(
+            auth[1].decode('latin1')
+        )
+        return user
+    if query.get('token'):
+        return authenticate_events_token(query['token'][0])
+    raise AuthenticationFailed('Учетные данные не были предоставлены.')
+
+
+def followed_authors(user_id):
+    return list(Follow.objects.filter(user_id=user_id).values_list(
+        'author_id', flat=True
+    ))
+
+
+def load_authors(user_id):
+    try:
+        return followed_authors(user_id)
+    finally:
+        close_old_connections()
+
+
+def load_subscriber(scope):
+    headers = dict(scope.get('headers', ()))
+    query = parse_qs(scope.get('query_string', b'').decode('latin1'))
+    try:
+        user = authenticate(headers, query)
+        return user.pk, followed_authors(user.pk)
+    finally:
+        close_old_connections()
+
+
+def load_backlog(authors, last_id):
+    try:
+        return [
+            recipe_event(recipe) for recipe in Recipe.objects.filter(
+                author_id__in=authors, pk__gt=last_id
+            ).only('id', 'name', 'author_id', 'pub_date').order_by(
+                'pk'
+            )[:settings.SSE_REPLAY_LIMIT]
+        ]
+    finally:
+        close_old_connections()
+
+
+def format_event(event):
+    data = json.dumps(event, ensure_ascii=False)
+    return f'id: {event["id"]}\nevent: recipe\ndata: {data}\n\n'.encode()
+
+
+async def send_error(send, status, detail):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json')],
+    })
+    await send({
+        'type': 'http.response.body',
+        'body': json.dumps({'detail': detail}, ensure_ascii=False).encode(),
+    })
+
+
+async def wait_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def next_message(subscription, disconnect, timeout):
+    # Событие из очереди или None, если за timeout секунд его не было.
+    event = asyncio.ensure_future(subscription.queue.get())
+    await asyncio.wait(
+        {event, disconnect}, timeout=timeout,
+        return_when=asyncio.FIRST_COMPLETED
+    )
+    if event.cancel():
+        return None
+    return event.result()
+
+
+async def stream(subscription, user_id, receive, send, replayed=()):
+    loop = asyncio.get_running_loop()
+    disconnect = asyncio.ensure_future(wait_disconnect(receive))
+    ping_at = loop.time() + settings.SSE_HEARTBEAT
+    refresh_at = loop.time() + settings.SSE_FOLLOWS_REFRESH
+    try:
+        while not (disconnect.done() or subscription.overflowed):
+            event = await next_message(
+                subscription, disconnect,
+                max(0, min(ping_at, refresh_at) - loop.time())
+            )
+            if loop.time() >= refresh_at:
+                authors = await loop.run_in_executor(
+                    None, load_authors, user_id
+                )
+                hub.update(subscription,
+                           (author_channel(pk) for pk in authors))
+                refresh_at = loop.time() + settings.SSE_FOLLOWS_REFRESH
+            if event is not None and event['id'] in replayed:
+                # Уже отправлен из базы: опубликован между подпиской и
+                # чтением пропущенного.
+                event = None
+            if event is not None:
+                body = format_event(event)
+            elif loop.time() >= ping_at:
+                body = b': ping\n\n'
+            else:
+                continue
+            ping_at = loop.time() + settings.SSE_HEARTBEAT
+            if not disconnect.done():
+                await send({
+                    'type': 'http.response.body',
+                    'body': body,
+                    'more_body': True,
+                })
+    finally:
+        disconnect.cancel()
+
+
+async def recipe_events(scope, receive, send):
+    if scope['method'] != 'GET':
+        await send_error(send, 405, f'Метод "{scope["method"]}" не разрешен.')
+        return
+    loop = asyncio.get_running_loop()
+    try:
+        user_id, authors = await loop.run_in_executor(
+            None, load_subscriber, scope
+        )
+    except AuthenticationFailed as error:
+        await send_error(send, 401, str(error.detail))
+        return
+    # Сначала подписка, потом пропущенное из базы: рецепт, опубликованный
+    # между ними, придёт в очередь, а не потеряется; повтор отсекается по
+    # id.
+    subscription = hub.subscribe(author_channel(pk) for pk in authors)
+    try:
+        backlog = []
+        last_id = dict(scope.get('headers', ())).get(
+            b'last-event-id', b''
+        ).decode('latin1')
+        if last_id.isdigit() and authors:
+            backlog = await loop.run_in_executor(
+                None, load_backlog, authors, int(last_id)
+            )
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream; charset=utf-8'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+            ],
+        })
+        for event in backlog:
+            await send({
+                'type': 'http.response.body',
+                'body': format_event(event),
+                'more_body': True,
+            })
+        await stream(subscription, user_id, receive, send,
+                     {event['id'] for event in backlog})
+        if subscription.overflowed:
+            await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        hub.unsubscribe(subscription)
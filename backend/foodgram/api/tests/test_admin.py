@@ -0,0 +1,48 @@
+from datetime import date
+
+from django.test import TestCase
+
+from recipes.models import Recipe, RecipeDailyStats
+from users.models import CustomUser
+
+CHANGELIST_URL = '/admin/recipes/recipe/'
+
+
+class RecipeAdminTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_superuser(
+            email='admin@example.com', username='admin',
+            first_name='Админ', last_name='Тестов', password='pass'
+        )
+        recipe = Recipe.objects.create(
+            author=cls.admin, name='Рецепт', text='Перемешать и подать',
+            image='backend_media/recipe.png', cooking_time=5
+        )
+        RecipeDailyStats.objects.bulk_create(
+            RecipeDailyStats(
+                recipe=recipe, author=cls.admin, day=date(2024, 1, day),
+                favorites=favorites, shopping_carts=2
+            )
+            for day, favorites in ((1, 3), (2, -1))
+        )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_counters_come_from_daily_stats(self):
+        response = self.client.get(CHANGELIST_URL)
+        self.assertEqual(response.status_code, 200)
+        result = response.context['cl'].result_list[0]
+        self.assertEqual(result.favorites_count, 2)
+        self.assertEqual(result.shopping_cart_count, 4)
+
+    def test_counters_are_not_sortable(self):
+        response = self.client.get(CHANGELIST_URL, {'o': '5'})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(
+            'favorites_count', str(response.context['cl'].get_ordering(
+                response.wsgi_request, response.context['cl'].queryset
+            ))
+        )
@@ -0,0 +1,90 @@
+import asyncio
+import json
+import threading
+
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import SimpleTestCase, override_settings
+from django.urls import path
+from django.views.decorators.csrf import csrf_exempt
+
+from foodgram.asgi_handler import ASGIHandler
+
+first_chunk_sent = threading.Event()
+
+
+def stream_view(request):
+    def chunks():
+        yield b'first'
+        # Вторая часть генерируется только после отправки первой.
+        yield b'second' if first_chunk_sent.wait(5) else b'buffered'
+    return StreamingHttpResponse(chunks())
+
+
+@csrf_exempt
+def echo_view(request):
+    return HttpResponse(request.body)
+
+
+urlpatterns = [
+    path('stream/', stream_view),
+    path('echo/', echo_view),
+]
+
+
+def make_scope(path, method='GET'):
+    return {
+        'type': 'http',
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': path,
+        'root_path': '',
+        'query_string': b'',
+        'headers': [(b'host', b'testserver')],
+        'server': ('testserver', 80),
+        'client': ('127.0.0.1', 0),
+    }
+
+
+@override_settings(ROOT_URLCONF='api.tests.test_asgi')
+class ASGIHandlerTests(SimpleTestCase):
+
+    def setUp(self):
+        first_chunk_sent.clear()
+
+    def call(self, scope, messages):
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+            if message.get('body') == b'first':
+                first_chunk_sent.set()
+
+        asyncio.run(ASGIHandler()(scope, receive, send))
+        return sent
+
+    def test_streaming_response_is_sent_by_chunks(self):
+        sent = self.call(make_scope('/stream/'), [{'type': 'http.request'}])
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertEqual(
+            [message.get('body') for message in sent[1:]],
+            [b'first', b'second', None]
+        )
+
+    def test_chunked_request_body(self):
+        sent = self.call(make_scope('/echo/', 'POST'), [
+            {'type': 'http.request', 'body': b'{"a": ', 'more_body': True},
+            {'type': 'http.request', 'body': b'1}'},
+        ])
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertEqual(json.loads(sent[1]['body']), {'a': 1})
+
+    def test_disconnect_before_body_skips_view(self):
+        sent = self.call(make_scope('/echo/', 'POST'), [
+            {'type': 'http.request', 'body': b'{', 'more_body': True},
+            {'type': 'http.disconnect'},
+        ])
+        self.assertEqual(sent, [])
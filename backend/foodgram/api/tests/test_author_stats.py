@@ -0,0 +1,146 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TransactionTestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from recipes.models import (AuthorDailyStats, FavoriteRecipe, Recipe,
+                            RecipeDailyStats)
+from users.models import CustomUser, Follow
+
+STATS_URL = '/api/users/me/stats/'
+
+
+class AuthorStatsTests(TransactionTestCase):
+    # Итоги пишутся в on_commit, поэтому нужны настоящие транзакции.
+
+    def setUp(self):
+        cache.clear()
+        self.author = CustomUser.objects.create_user(
+            email='author@example.com', username='author',
+            first_name='Автор', last_name='Тестов', password='pass'
+        )
+        self.reader = CustomUser.objects.create_user(
+            email='reader@example.com', username='reader',
+            first_name='Читатель', last_name='Тестов', password='pass'
+        )
+        self.recipe = Recipe.objects.create(
+            author=self.author, name='Рецепт', text='Перемешать и подать',
+            image='backend_media/recipe.png', cooking_time=5
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+
+    def favorite(self, method='post'):
+        return getattr(self.client, method)(
+            f'/api/recipes/{self.recipe.pk}/favorite/'
+        )
+
+    def follow(self, method='post'):
+        return getattr(self.client, method)(
+            f'/api/users/{self.author.pk}/subscribe/'
+        )
+
+    def stats(self, **params):
+        client = APIClient()
+        client.force_authenticate(self.author)
+        return client.get(STATS_URL, params)
+
+    def test_actions_are_counted(self):
+        self.assertEqual(self.favorite().status_code, 201)
+        self.assertEqual(self.client.post(
+            f'/api/recipes/{self.recipe.pk}/shopping_cart/'
+        ).status_code, 201)
+        self.assertEqual(self.follow().status_code, 201)
+        response = self.stats()
+        self.assertEqual(response.status_code, 200)
+        counts = {'favorites': 1, 'shopping_carts': 1, 'followers': 1}
+        self.assertEqual(response.data['totals'], counts)
+        self.assertEqual(response.data['period'], counts)
+        self.assertEqual(response.data['days'][-1], {
+            'date': timezone.localdate().isoformat(), **counts
+        })
+        self.assertEqual(response.data['top_recipes'], [{
+            'id': self.recipe.pk, 'name': self.recipe.name,
+            'favorites': 1, 'shopping_carts': 1,
+        }])
+
+    def test_removals_are_counted(self):
+        self.favorite()
+        self.follow()
+        self.assertEqual(self.favorite('delete').status_code, 204)
+        self.assertEqual(self.follow('delete').status_code, 204)
+        totals = self.stats().data['totals']
+        self.assertEqual(totals['favorites'], 0)
+        self.assertEqual(totals['followers'], 0)
+
+    def test_invalid_period(self):
+        today = timezone.localdate()
+        for params in (
+            {'from': 'вчера'},
+            {'from': today.isoformat(),
+             'to': (today - timedelta(days=1)).isoformat()},
+            {'from': (today - timedelta(days=400)).isoformat()},
+        ):
+            with self.subTest(params=params):
+                self.assertEqual(self.stats(**params).status_code, 400)
+
+    def test_recipe_deletion_is_counted(self):
+        self.favorite()
+        other = Recipe.objects.create(
+            author=self.author, name='Другой', text='Подать',
+            image='backend_media/other.png', cooking_time=5
+        )
+        self.client.post(f'/api/recipes/{other.pk}/favorite/')
+        self.recipe.delete()
+        self.assertEqual(self.stats().data['totals']['favorites'], 1)
+
+    def test_user_deletion_is_counted(self):
+        self.favorite()
+        self.follow()
+        self.reader.delete()
+        response = self.stats()
+        self.assertEqual(response.data['totals']['favorites'], 0)
+        self.assertEqual(response.data['totals']['followers'], 0)
+        self.assertEqual(response.data['top_recipes'][0]['favorites'], 0)
+
+    def rebuild(self, *args):
+        call_command('rebuild_author_stats', *args, stdout=StringIO())
+
+    def test_rebuild_keeps_history(self):
+        past = timezone.localdate() - timedelta(days=3)
+        AuthorDailyStats.objects.create(
+            author=self.author, day=past, favorites=2
+        )
+        RecipeDailyStats.objects.create(
+            recipe=self.recipe, author=self.author, day=past, favorites=2
+        )
+        # Избранное и подписка появились в обход API.
+        FavoriteRecipe.objects.create(user=self.reader, recipe=self.recipe)
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.rebuild()
+        self.assertEqual(AuthorDailyStats.objects.get(day=past).favorites, 2)
+        today = AuthorDailyStats.objects.get(day=timezone.localdate())
+        self.assertEqual((today.favorites, today.followers), (-1, 1))
+        self.assertEqual(
+            RecipeDailyStats.objects.get(day=timezone.localdate()).favorites,
+            -1
+        )
+        self.rebuild()
+        self.assertEqual(AuthorDailyStats.objects.count(), 2)
+        self.assertEqual(self.stats().data['totals']['favorites'], 1)
+
+    def test_rebuild_reset_replaces_history(self):
+        past = timezone.localdate() - timedelta(days=3)
+        AuthorDailyStats.objects.create(
+            author=self.author, day=past, favorites=5
+        )
+        FavoriteRecipe.objects.create(user=self.reader, recipe=self.recipe)
+        self.rebuild('--reset')
+        self.assertEqual(
+            list(AuthorDailyStats.objects.values_list('day', 'favorites')),
+            [(timezone.localdate(), 1)]
+        )
@@ -0,0 +1,50 @@
+import uuid
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from recipes.catalog import VERSION_KEY, Catalog
+from recipes.models import Tag
+
+
+class CatalogTests(TestCase):
+    # Второй экземпляр Catalog — копия справочников в другом воркере.
+    # Правка из чужого процесса делается через update(): сигналы и смена
+    # версии в этом процессе не срабатывают.
+
+    def setUp(self):
+        cache.clear()
+        self.tag = Tag.objects.order_by('pk').first()
+
+    def rename_elsewhere(self, name):
+        Tag.objects.filter(pk=self.tag.pk).update(name=name)
+
+    def tag_name(self, catalog):
+        return next(
+            row['name'] for row in catalog.tags() if row['id'] == self.tag.pk
+        )
+
+    @override_settings(CACHE_SHARED=True)
+    def test_shared_version_reaches_other_workers(self):
+        other = Catalog()
+        self.tag_name(other)
+        self.rename_elsewhere('Переименован')
+        cache.set(VERSION_KEY, uuid.uuid4().hex, None)
+        self.assertEqual(self.tag_name(other), 'Переименован')
+
+    @override_settings(CACHE_SHARED=False, CATALOG_LOCAL_TIMEOUT=60)
+    def test_local_copy_is_served_within_timeout(self):
+        other = Catalog()
+        self.tag_name(other)
+        with CaptureQueriesContext(connection) as queries:
+            self.tag_name(other)
+        self.assertEqual(len(queries), 0)
+
+    @override_settings(CACHE_SHARED=False, CATALOG_LOCAL_TIMEOUT=0)
+    def test_local_copy_expires_without_shared_cache(self):
+        other = Catalog()
+        self.tag_name(other)
+        self.rename_elsewhere('Переименован')
+        self.assertEqual(self.tag_name(other), 'Переименован')
@@ -0,0 +1,94 @@
+import base64
+import json
+from datetime import timedelta
+
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api.changes import encode_token
+from recipes.models import Recipe, RecipeTombstone
+from users.models import CustomUser
+
+CHANGES_URL = '/api/recipes/changes/'
+
+
+class ChangesMixin:
+
+    def create_author(self):
+        return CustomUser.objects.create_user(
+            email='author@example.com', username='author',
+            first_name='Автор', last_name='Тестов', password='pass'
+        )
+
+    def create_recipe(self, author, name):
+        return Recipe.objects.create(
+            author=author, name=name, text='Сварить',
+            image='backend_media/soup.png', cooking_time=30
+        )
+
+    def get_changes(self, **params):
+        response = APIClient().get(CHANGES_URL, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+
+@override_settings(RECIPE_CHANGES_SETTLE=0)
+class RecipeChangesTests(ChangesMixin, TestCase):
+
+    def setUp(self):
+        self.author = self.create_author()
+        self.recipes = [
+            self.create_recipe(self.author, f'Рецепт {i}') for i in range(3)
+        ]
+
+    def test_changes_are_ordered(self):
+        data = self.get_changes()
+        self.assertEqual(data['changed'], [r.pk for r in self.recipes])
+        self.assertEqual(data['deleted'], [])
+        self.assertFalse(data['has_more'])
+
+    def test_token_round_trip(self):
+        first = self.get_changes(limit=2)
+        self.assertEqual(first['changed'], [r.pk for r in self.recipes[:2]])
+        self.assertTrue(first['has_more'])
+        second = self.get_changes(since=first['next'], limit=2)
+        self.assertEqual(second['changed'], [self.recipes[2].pk])
+        self.assertFalse(second['has_more'])
+        Recipe.objects.filter(pk=self.recipes[0].pk).update(
+            updated_at=timezone.now()
+        )
+        third = self.get_changes(since=second['next'])
+        self.assertEqual(third['changed'], [self.recipes[0].pk])
+
+    def test_deleted_recipe_is_reported(self):
+        token = self.get_changes()['next']
+        deleted_id = self.recipes[1].pk
+        self.recipes[1].delete()
+        data = self.get_changes(since=token)
+        self.assertEqual(data['deleted'], [deleted_id])
+
+    def test_expired_token_is_gone(self):
+        issued = timezone.now() - timedelta(days=365)
+        token = encode_token(issued, {'changed': None, 'deleted': None})
+        response = APIClient().get(CHANGES_URL, {'since': token})
+        self.assertEqual(response.status_code, 410)
+
+    def test_malformed_token_is_rejected(self):
+        token = base64.urlsafe_b64encode(json.dumps({}).encode()).decode()
+        for since in ('не-токен', token):
+            response = APIClient().get(CHANGES_URL, {'since': since})
+            self.assertEqual(response.status_code, 400)
+
+
+class TombstoneCommitTests(ChangesMixin, TransactionTestCase):
+
+    def test_tombstone_is_stamped_after_commit(self):
+        recipe = self.create_recipe(self.create_author(), 'Суп')
+        with transaction.atomic():
+            recipe.delete()
+            # Каскад ещё идёт, транзакция не закоммичена.
+            before_commit = timezone.now()
+        tombstone = RecipeTombstone.objects.get()
+        self.assertGreaterEqual(tombstone.deleted_at, before_commit)
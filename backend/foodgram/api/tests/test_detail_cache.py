@@ -0,0 +1,120 @@
+import json
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe, RecipeSnapshot, Tag
+from recipes.snapshots import (detail_cache_counters, load_document,
+                               rebuild_snapshot)
+from users.models import CustomUser
+
+
+class RecipeDetailCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = CustomUser.objects.create_user(
+            email='author@example.com', username='author',
+            first_name='Автор', last_name='Тестов', password='pass'
+        )
+        cls.recipe = Recipe.objects.create(
+            author=author, name='Суп', text='Сварить',
+            image='backend_media/soup.png', cooking_time=30
+        )
+
+    def setUp(self):
+        cache.clear()
+        rebuild_snapshot(self.recipe.pk)
+        self.client = APIClient()
+        self.url = f'/api/recipes/{self.recipe.pk}/'
+
+    def get_name(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response.json()['name']
+
+    def rename_in_worker(self, name):
+        # Пересборка в run_worker: база меняется, а память веб-процесса
+        # недоступна.
+        Recipe.objects.filter(pk=self.recipe.pk).update(name=name)
+        snapshot = RecipeSnapshot.objects.get(recipe=self.recipe)
+        document = json.loads(snapshot.document)
+        document['name'] = name
+        RecipeSnapshot.objects.filter(pk=snapshot.pk).update(
+            document=json.dumps(document, ensure_ascii=False),
+            version=snapshot.version + 1
+        )
+
+    @override_settings(CACHE_SHARED=True)
+    def test_hit_skips_database(self):
+        before = detail_cache_counters.values()
+        self.get_name()
+        with CaptureQueriesContext(connection) as queries:
+            self.get_name()
+        self.assertEqual(len(queries), 0)
+        after = detail_cache_counters.values()
+        for event in ('hits', 'misses'):
+            self.assertEqual(after[event], before.get(event, 0) + 1)
+
+    @override_settings(CACHE_SHARED=True)
+    def test_rebuild_invalidates_shared_cache(self):
+        self.get_name()
+        Recipe.objects.filter(pk=self.recipe.pk).update(name='Борщ')
+        rebuild_snapshot(self.recipe.pk)
+        self.assertEqual(self.get_name(), 'Борщ')
+
+    @override_settings(CACHE_SHARED=True)
+    def test_rebuild_during_fill_is_not_overwritten(self):
+        def load_then_rebuild(recipe_id):
+            loaded = load_document(recipe_id)
+            Recipe.objects.filter(pk=recipe_id).update(name='Борщ')
+            rebuild_snapshot(recipe_id)
+            return loaded
+
+        with mock.patch('recipes.snapshots.load_document',
+                        side_effect=load_then_rebuild):
+            self.assertEqual(self.get_name(), 'Суп')
+        self.assertEqual(self.get_name(), 'Борщ')
+
+    @override_settings(CACHE_SHARED=True)
+    def test_deletion_during_fill_is_not_overwritten(self):
+        def load_then_delete(recipe_id):
+            loaded = load_document(recipe_id)
+            Recipe.objects.filter(pk=recipe_id).delete()
+            return loaded
+
+        with mock.patch('recipes.snapshots.load_document',
+                        side_effect=load_then_delete):
+            self.get_name()
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    @override_settings(CACHE_SHARED=False)
+    def test_without_shared_cache_worker_rebuild_is_visible(self):
+        self.get_name()
+        self.rename_in_worker('Борщ')
+        self.assertEqual(self.get_name(), 'Борщ')
+
+
+@override_settings(TASKS_EAGER=True)
+class TagDeletionTests(TransactionTestCase):
+    # Пересборка ставится в очередь после коммита.
+
+    def test_tag_deletion_rebuilds_recipes(self):
+        author = CustomUser.objects.create_user(
+            email='author@example.com', username='author',
+            first_name='Автор', last_name='Тестов', password='pass'
+        )
+        recipe = Recipe.objects.create(
+            author=author, name='Суп', text='Сварить',
+            image='backend_media/soup.png', cooking_time=30
+        )
+        tag = Tag.objects.create(name='Тест', color='#123456', slug='test')
+        recipe.tags.add(tag)
+        url = f'/api/recipes/{recipe.pk}/'
+        self.assertEqual(len(APIClient().get(url).json()['tags']), 1)
+        tag.delete()
+        self.assertEqual(APIClient().get(url).json()['tags'], [])
@@ -0,0 +1,168 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from api import fast_serializers
+from api.renderers import ORJSONRenderer
+from api.serializers import (FollowSerializer, RecipeSerializer,
+                             RecipeShortSerializer, TagSerializer)
+from api.views import recipe_user_flags
+from recipes.models import (FavoriteRecipe, Ingredient, IngredientWithAmount,
+                            Recipe, ShoppingCart, Tag)
+from users.models import CustomUser, Follow
+
+
+class FastSerializersTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            email='reader@example.com', username='reader',
+            first_name='Читатель', last_name='Тестов', password='pass'
+        )
+        cls.authors = [
+            CustomUser.objects.create_user(
+                email=f'author{i}@example.com', username=f'author{i}',
+                first_name=f'Автор{i}', last_name='Тестов', password='pass'
+            )
+            for i in range(3)
+        ]
+        tags = list(Tag.objects.all())
+        ingredients = list(Ingredient.objects.all()[:10])
+        for i in range(9):
+            author = cls.authors[i % 3]
+            recipe = Recipe.objects.create(
+                author=author,
+                name=f'Рецепт {i} "с кавычками"',
+                text='Перемешать и подать',
+                image=f'backend_media/recipe{i}.png',
+                cooking_time=i + 1,
+            )
+            recipe.tags.set(tags[:i % 3 + 1])
+            IngredientWithAmount.objects.bulk_create(
+                IngredientWithAmount(
+                    recipe=recipe, ingredient=ingredient, amount=j + 1
+                )
+                for j, ingredient in enumerate(ingredients[:i % 4 + 1])
+            )
+            if i % 2:
+                FavoriteRecipe.objects.create(user=cls.user, recipe=recipe)
+            if i % 3:
+                ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+        for author in cls.authors[:2]:
+            Follow.objects.create(user=cls.user, author=author)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def make_request(self, path, data=None):
+        request = Request(APIRequestFactory().get(path, data))
+        request.user = self.user
+        return request
+
+    def assertSameBytes(self, expected, actual):
+        self.assertEqual(
+            JSONRenderer().render(expected),
+            ORJSONRenderer().render(actual)
+        )
+
+    def test_renderer_matches_json_renderer(self):
+        data = TagSerializer(Tag.objects.all(), many=True).data
+        data = {'results': data, 1: 'ключ', 'text': 'a b c'}
+        self.assertEqual(
+            JSONRenderer().render(data), ORJSONRenderer().render(data)
+        )
+
+    def test_tags(self):
+        queryset = Tag.objects.all()
+        self.assertSameBytes(
+            TagSerializer(queryset, many=True).data,
+            fast_serializers.serialize_tags(
+                queryset.values(*fast_serializers.TAG_FIELDS)
+            )
+        )
+
+    def test_short_recipes(self):
+        queryset = Recipe.objects.all()
+        rows = queryset.values(*fast_serializers.RECIPE_SHORT_FIELDS)
+        self.assertSameBytes(
+            RecipeShortSerializer(queryset, many=True).data,
+            fast_serializers.serialize_short_recipes(rows)
+        )
+        request = self.make_request('/api/recipes/')
+        self.assertSameBytes(
+            RecipeShortSerializer(
+                queryset, many=True, context={'request': request}
+            ).data,
+            fast_serializers.serialize_short_recipes(rows, request)
+        )
+
+    def test_recipes(self):
+        request = self.make_request('/api/recipes/')
+        queryset = Recipe.objects.all()
+        annotated = queryset.annotate(**recipe_user_flags(self.user))
+        self.assertSameBytes(
+            RecipeSerializer(
+                queryset, many=True, context={'request': request}
+            ).data,
+            fast_serializers.serialize_recipes(
+                fast_serializers.recipe_values(annotated), request
+            )
+        )
+
+    def test_follows(self):
+        for recipes_limit in (None, 2):
+            data = {'recipes_limit': recipes_limit} if recipes_limit else {}
+            request = self.make_request('/api/users/subscriptions/', data)
+            queryset = self.user.follower.all()
+            view = self.client.get('/api/users/subscriptions/', data)
+            with override_settings(API_FAST_SERIALIZERS=True):
+                fast_view = self.client.get(
+                    '/api/users/subscriptions/', data
+                )
+            self.assertEqual(view.content, fast_view.content)
+            self.assertSameBytes(
+                FollowSerializer(
+                    queryset, many=True, context={'request': request}
+                ).data,
+                fast_view.json()['results']
+            )
+
+    def test_follows_recipes_limit_in_sql(self):
+        for fast in (False, True):
+            with override_settings(API_FAST_SERIALIZERS=fast), \
+                    CaptureQueriesContext(connection) as queries:
+                response = self.client.get(
+                    '/api/users/subscriptions/', {'recipes_limit': 1}
+                )
+            for author in response.json()['results']:
+                self.assertEqual(len(author['recipes']), 1)
+            recipe_queries = [
+                query['sql'] for query in queries.captured_queries
+                if 'cooking_time' in query['sql']
+            ]
+            self.assertEqual(len(recipe_queries), 1)
+            self.assertIn('LIMIT 1', recipe_queries[0])
+
+    def test_follows_invalid_recipes_limit(self):
+        for fast in (False, True):
+            for value in ('abc', '-1', '1.5'):
+                with override_settings(API_FAST_SERIALIZERS=fast):
+                    response = self.client.get(
+                        '/api/users/subscriptions/', {'recipes_limit': value}
+                    )
+                self.assertEqual(response.status_code, 400)
+
+    def test_list_endpoints(self):
+        for path in ('/api/tags/', '/api/recipes/', '/api/recipes/?limit=4',
+                     '/api/recipes/?is_favorited=1&tags=lunch'):
+            with self.subTest(path=path):
+                response = self.client.get(path)
+                with override_settings(API_FAST_SERIALIZERS=True):
+                    fast_response = self.client.get(path)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.content, fast_response.content)
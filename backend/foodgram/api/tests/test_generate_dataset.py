@@ -0,0 +1,78 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.db.models import F
+from django.test import TestCase, override_settings
+
+from recipes.models import (FavoriteRecipe, IngredientWithAmount, Recipe,
+                            ShoppingCart)
+from users.models import CustomUser, Follow
+
+MEDIA_ROOT = tempfile.mkdtemp()
+SIZE = ('--users', '12', '--recipes', '30', '--follows', '3',
+        '--favorites', '4', '--carts', '2', '--batch-size', '7',
+        '--skip-snapshots')
+
+
+@override_settings(DB_DISPOSABLE=True, MEDIA_ROOT=MEDIA_ROOT)
+class GenerateDatasetTests(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def generate(self, seed):
+        call_command('generate_dataset', *SIZE, '--seed', str(seed),
+                     stdout=StringIO())
+
+    def dataset(self):
+        def rows(model, *fields):
+            return list(model.objects.order_by(*fields).values_list(*fields))
+
+        return {
+            'users': rows(CustomUser, 'pk', 'username'),
+            'recipes': rows(Recipe, 'pk', 'author_id', 'cooking_time'),
+            'tags': rows(Recipe.tags.through, 'recipe_id', 'tag_id'),
+            'ingredients': rows(IngredientWithAmount, 'recipe_id',
+                                'ingredient_id', 'amount'),
+            'follows': rows(Follow, 'user_id', 'author_id'),
+            'favorites': rows(FavoriteRecipe, 'user_id', 'recipe_id'),
+            'carts': rows(ShoppingCart, 'user_id', 'recipe_id'),
+        }
+
+    def regenerate(self, seed):
+        CustomUser.objects.all().delete()
+        self.generate(seed)
+        return self.dataset()
+
+    def test_row_counts(self):
+        self.generate(1)
+        self.assertEqual(CustomUser.objects.count(), 12)
+        self.assertEqual(Recipe.objects.count(), 30)
+        self.assertFalse(Follow.objects.filter(user=F('author')).exists())
+        for recipe in Recipe.objects.prefetch_related(
+            'tags', 'ingredient_in_recipe'
+        ):
+            with self.subTest(recipe=recipe.pk):
+                self.assertIn(len(recipe.tags.all()), (1, 2, 3))
+                self.assertGreaterEqual(
+                    len(recipe.ingredient_in_recipe.all()), 2
+                )
+        for model in (Follow, FavoriteRecipe, ShoppingCart):
+            with self.subTest(model=model.__name__):
+                self.assertGreater(model.objects.count(), 0)
+
+    def test_same_seed_same_dataset(self):
+        self.generate(5)
+        first = self.dataset()
+        self.assertEqual(self.regenerate(5), first)
+        self.assertNotEqual(self.regenerate(6), first)
+
+    @override_settings(DB_DISPOSABLE=False)
+    def test_refuses_without_disposable_database(self):
+        with self.assertRaisesMessage(CommandError, 'DB_DISPOSABLE=True'):
+            self.generate(1)
+        self.assertFalse(CustomUser.objects.exists())
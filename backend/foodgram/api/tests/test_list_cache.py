@@ -0,0 +1,73 @@
+import gzip
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe
+from recipes.snapshots import bump_recipe_list_version, rebuild_snapshot
+from users.models import CustomUser
+
+LIST_URL = '/api/recipes/?limit=5'
+
+
+class RecipeListCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = CustomUser.objects.create_user(
+            email='author@example.com', username='author',
+            first_name='Автор', last_name='Тестов', password='pass'
+        )
+        cls.create_recipe('Суп')
+
+    @classmethod
+    def create_recipe(cls, name):
+        recipe = Recipe.objects.create(
+            author=cls.author, name=name, text='Сварить',
+            image='backend_media/soup.png', cooking_time=30
+        )
+        rebuild_snapshot(recipe.pk)
+        return recipe
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def names(self, response):
+        self.assertEqual(response.status_code, 200)
+        return [recipe['name'] for recipe in response.json()['results']]
+
+    @override_settings(CACHE_SHARED=True)
+    def test_miss_then_hit(self):
+        miss = self.client.get(LIST_URL)
+        self.assertIn('Accept-Encoding', miss['Vary'])
+        with CaptureQueriesContext(connection) as queries:
+            hit = self.client.get(LIST_URL)
+        self.assertEqual(len(queries), 0)
+        self.assertIn('Accept-Encoding', hit['Vary'])
+        self.assertEqual(self.names(hit), self.names(miss))
+
+    @override_settings(CACHE_SHARED=True)
+    def test_hit_is_served_compressed(self):
+        miss = self.client.get(LIST_URL, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(miss.has_header('Content-Encoding'))
+        hit = self.client.get(LIST_URL, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(hit['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(hit.content), miss.content)
+
+    @override_settings(CACHE_SHARED=True)
+    def test_version_bump_invalidates(self):
+        self.client.get(LIST_URL)
+        self.create_recipe('Борщ')
+        self.assertNotIn('Борщ', self.names(self.client.get(LIST_URL)))
+        bump_recipe_list_version()
+        self.assertIn('Борщ', self.names(self.client.get(LIST_URL)))
+
+    @override_settings(CACHE_SHARED=False)
+    def test_without_shared_cache_lists_are_not_cached(self):
+        self.client.get(LIST_URL)
+        self.create_recipe('Борщ')
+        self.assertIn('Борщ', self.names(self.client.get(LIST_URL)))
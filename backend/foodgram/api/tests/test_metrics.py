@@ -0,0 +1,69 @@
+import json
+import os
+import runpy
+import tempfile
+from types import SimpleNamespace
+from unittest import mock
+
+from django.conf import settings
+from django.test import SimpleTestCase, override_settings
+
+from foodgram.metrics import MetricsRegistry
+
+REQUESTS = 'foodgram_http_requests_total'
+LABELS = 'route="tags",method="GET",status="200"'
+DEAD_PID = 999999999
+
+
+@override_settings(METRICS_DIR=tempfile.mkdtemp())
+class WorkerMetricsTests(SimpleTestCase):
+
+    def setUp(self):
+        self.hooks = runpy.run_path(
+            os.path.join(settings.BASE_DIR, 'gunicorn.conf.py')
+        )
+        for name in os.listdir(settings.METRICS_DIR):
+            os.remove(os.path.join(settings.METRICS_DIR, name))
+        self.registry = MetricsRegistry()
+        self.registry.incr(REQUESTS, LABELS)
+        self.write_worker(DEAD_PID, 5)
+
+    def write_worker(self, pid, requests):
+        path = os.path.join(settings.METRICS_DIR, f'{pid}.json')
+        with open(path, 'w') as file:
+            json.dump({
+                'histograms': {},
+                'counters': {REQUESTS: {LABELS: requests}},
+            }, file)
+
+    def total(self):
+        return self.registry.collect()['counters'][REQUESTS][LABELS]
+
+    def test_exited_worker_is_not_summed(self):
+        self.assertEqual(self.total(), 6)
+        self.hooks['child_exit'](None, SimpleNamespace(pid=DEAD_PID))
+        self.assertEqual(self.total(), 1)
+
+    def test_start_clears_previous_run(self):
+        self.hooks['on_starting'](None)
+        self.assertEqual(os.listdir(settings.METRICS_DIR), [])
+
+
+class GunicornConfigTests(SimpleTestCase):
+
+    def load(self, **environ):
+        with mock.patch.dict(os.environ, environ):
+            return runpy.run_path(
+                os.path.join(settings.BASE_DIR, 'gunicorn.conf.py')
+            )
+
+    def test_asgi_by_default(self):
+        config = self.load()
+        self.assertEqual(config['wsgi_app'], 'foodgram.asgi:application')
+        self.assertEqual(config['worker_class'],
+                         'uvicorn.workers.UvicornWorker')
+
+    def test_sync_workers(self):
+        config = self.load(GUNICORN_ASGI='False')
+        self.assertEqual(config['wsgi_app'], 'foodgram.wsgi:application')
+        self.assertEqual(config['worker_class'], 'sync')
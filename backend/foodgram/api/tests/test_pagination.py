@@ -0,0 +1,71 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from foodgram.paginators import EstimatedCountPaginator
+from users.models import CustomUser
+
+USERS_URL = '/api/users/'
+ROW_COUNT_KEY = f'row-count:default:{CustomUser._meta.db_table}'
+
+
+class EstimatedCountPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        for number in range(5):
+            CustomUser.objects.create_user(
+                email=f'user{number}@example.com', username=f'user{number}',
+                first_name='Пользователь', last_name='Тестов',
+                password='pass'
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def get_page(self, page):
+        return self.client.get(USERS_URL, {'limit': 2, 'page': page})
+
+    def test_small_table_is_counted_exactly(self):
+        response = self.get_page(3)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 5)
+        self.assertFalse(response.data['count_estimated'])
+        self.assertIsNone(response.data['next'])
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(self.get_page(4).status_code, 404)
+
+    @override_settings(PAGINATION_EXACT_COUNT_THRESHOLD=1)
+    def test_filtered_list_is_counted_exactly(self):
+        paginator = EstimatedCountPaginator(
+            CustomUser.objects.filter(username__lt='user3').order_by('id'), 2
+        )
+        self.assertEqual(paginator.count, 3)
+        self.assertFalse(paginator.count_estimated)
+        self.assertFalse(paginator.page(2).has_next())
+
+    @override_settings(PAGINATION_EXACT_COUNT_THRESHOLD=1)
+    def test_low_estimate_keeps_last_page_reachable(self):
+        # Оценка отстаёт от настоящих пяти строк.
+        cache.set(ROW_COUNT_KEY, 2)
+        first = self.get_page(1)
+        self.assertEqual(first.data['count'], 2)
+        self.assertTrue(first.data['count_estimated'])
+        self.assertIsNotNone(first.data['next'])
+        second = self.get_page(2)
+        self.assertEqual(second.status_code, 200)
+        self.assertIsNotNone(second.data['next'])
+        last = self.get_page(3)
+        self.assertEqual(last.status_code, 200)
+        self.assertEqual(len(last.data['results']), 1)
+        self.assertIsNone(last.data['next'])
+        self.assertEqual(self.get_page(4).status_code, 404)
+
+    @override_settings(PAGINATION_EXACT_COUNT_THRESHOLD=1)
+    def test_high_estimate_ends_on_last_row(self):
+        cache.set(ROW_COUNT_KEY, 100)
+        last = self.get_page(3)
+        self.assertTrue(last.data['count_estimated'])
+        self.assertIsNone(last.data['next'])
+        self.assertEqual(self.get_page(4).status_code, 404)
@@ -0,0 +1,132 @@
+from importlib import import_module
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock, skipUnless
+
+from django.apps import apps
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from foodgram.db import table_row_count
+from foodgram.partitioning import (is_partitioned, partitioning_supported,
+                                   sync_partitions)
+from recipes.models import FavoriteRecipe, Recipe
+from users.models import CustomUser
+
+MIGRATIONS = (
+    'recipes.migrations.0009_partition_relation_tables',
+    'users.migrations.0003_partition_follow',
+)
+DDL = ('ALTER', 'CREATE', 'DROP', 'INSERT')
+COMMAND = 'api.management.commands.sync_partitions'
+
+
+class PartitionMigrationTests(TestCase):
+
+    def run_migration(self, direction):
+        # Редактор схемы SQLite нельзя открыть внутри транзакции теста, а
+        # миграции без секционирования берут у него только соединение.
+        schema_editor = connection.schema_editor()
+        with CaptureQueriesContext(connection) as queries:
+            for name in MIGRATIONS:
+                getattr(import_module(name), direction)(apps, schema_editor)
+        return [
+            query['sql'] for query in queries
+            if query['sql'].lstrip().upper().startswith(DDL)
+        ]
+
+    @override_settings(DB_PARTITIONS=0)
+    def test_migrations_are_noops_without_partitions(self):
+        if is_partitioned(connection, FavoriteRecipe._meta.db_table):
+            self.skipTest('Таблицы уже секционированы')
+        for direction in ('forwards', 'backwards'):
+            with self.subTest(direction=direction):
+                self.assertEqual(self.run_migration(direction), [])
+
+    @skipUnless(connection.vendor != 'postgresql', 'Только не PostgreSQL')
+    @override_settings(DB_PARTITIONS=4)
+    def test_migrations_are_noops_outside_postgres(self):
+        for direction in ('forwards', 'backwards'):
+            with self.subTest(direction=direction):
+                self.assertEqual(self.run_migration(direction), [])
+
+
+class SyncPartitionsGuardTests(TransactionTestCase):
+    # Команда открывает редактор схемы, а в SQLite это нельзя делать
+    # внутри транзакции.
+
+    def sync(self, *args):
+        stdout = StringIO()
+        call_command('sync_partitions', *args, stdout=stdout)
+        return stdout.getvalue()
+
+    def test_old_postgres_is_not_supported(self):
+        for vendor, version in (('postgresql', 100000), ('sqlite', 0)):
+            with self.subTest(vendor=vendor):
+                self.assertFalse(partitioning_supported(
+                    SimpleNamespace(vendor=vendor, pg_version=version)
+                ))
+        self.assertTrue(partitioning_supported(
+            SimpleNamespace(vendor='postgresql', pg_version=110000)
+        ))
+
+    @skipUnless(connection.vendor != 'postgresql', 'Только не PostgreSQL')
+    def test_unsupported_database(self):
+        with self.assertRaisesMessage(CommandError, 'PostgreSQL 11+'):
+            self.sync()
+        self.assertEqual(
+            sync_partitions(apps, connection.schema_editor(), 'recipes', 4),
+            []
+        )
+
+    @mock.patch(f'{COMMAND}.partitioning_supported', return_value=True)
+    def test_negative_partitions(self, supported):
+        with self.assertRaisesMessage(CommandError, 'отрицательным'):
+            self.sync('--partitions', '-1')
+
+    @mock.patch(f'{COMMAND}.sync_partitions', return_value=[])
+    @mock.patch(f'{COMMAND}.partitioning_supported', return_value=True)
+    def test_nothing_to_rebuild(self, supported, sync):
+        self.assertIn('уже соответствуют', self.sync('--partitions', '2'))
+        self.assertEqual(
+            [call[0][2:] for call in sync.call_args_list],
+            [('recipes', 2), ('users', 2)]
+        )
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Только PostgreSQL')
+class PartitionedRowCountTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = CustomUser.objects.create_user(
+            email='author@example.com', username='author',
+            first_name='Автор', last_name='Тестов', password='pass'
+        )
+        recipe = Recipe.objects.create(
+            author=author, name='Суп', text='Сварить',
+            image='backend_media/soup.png', cooking_time=30
+        )
+        for number in range(20):
+            user = CustomUser.objects.create_user(
+                email=f'user{number}@example.com', username=f'user{number}',
+                first_name='Пользователь', last_name='Тестов',
+                password='pass'
+            )
+            FavoriteRecipe.objects.create(user=user, recipe=recipe)
+
+    def test_analyzed_table_is_estimated(self):
+        # Autovacuum анализирует секции, но не саму секционированную
+        # таблицу.
+        table = FavoriteRecipe._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT inhrelid::regclass::text FROM pg_inherits '
+                'WHERE inhparent = to_regclass(%s)',
+                [table]
+            )
+            tables = [row[0] for row in cursor.fetchall()] or [table]
+            cursor.execute(f'ANALYZE {", ".join(tables)}')
+        self.assertEqual(table_row_count(table), (20, True))
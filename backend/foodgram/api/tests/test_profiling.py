@@ -0,0 +1,26 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from foodgram.profiling import SQLCapture
+from users.models import CustomUser
+
+SECRET = 'pbkdf2_sha256$секрет'
+
+
+class SQLCaptureTests(TestCase):
+
+    def capture(self):
+        capture = SQLCapture('default')
+        with connection.execute_wrapper(capture):
+            CustomUser.objects.filter(password=SECRET).exists()
+        return capture.queries
+
+    def test_params_are_redacted_by_default(self):
+        queries = self.capture()
+        self.assertEqual(len(queries), 1)
+        self.assertIsNone(queries[0]['params'])
+        self.assertNotIn(SECRET, str(queries))
+
+    @override_settings(PROFILING_SQL_PARAMS=True)
+    def test_params_are_kept_when_enabled(self):
+        self.assertIn(SECRET, self.capture()[0]['params'])
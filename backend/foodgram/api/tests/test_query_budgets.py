@@ -0,0 +1,385 @@
+import base64
+import io
+import shutil
+import tempfile
+from collections import defaultdict, namedtuple
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, get_resolver, resolve
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient, APITestCase
+
+from recipes.models import (FavoriteRecipe, Ingredient, IngredientWithAmount,
+                            Recipe, ShoppingCart, Tag)
+from users.models import CustomUser, Follow
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+Budget = namedtuple(
+    'Budget', 'method path budget anonymous data setup teardown',
+    defaults=(False, None, None, None)
+)
+
+# Маршруты djoser для писем и активации фронтенд не вызывает, корень API
+# только перечисляет ссылки.
+UNBUDGETED_ROUTES = {
+    'api-root',
+    'customuser-activation',
+    'customuser-resend-activation',
+    'customuser-reset-password',
+    'customuser-reset-password-confirm',
+    'customuser-reset-username',
+    'customuser-reset-username-confirm',
+    'customuser-set-username',
+}
+
+
+def image_data():
+    content = io.BytesIO()
+    Image.new('RGB', (1, 1)).save(content, 'PNG')
+    encoded = base64.b64encode(content.getvalue()).decode()
+    return f'data:image/png;base64,{encoded}'
+
+
+NEW_PASSWORD = 'Gjvbljh-2026'
+
+RECIPE_DATA = {
+    'name': 'Новый рецепт',
+    'text': 'Описание',
+    'cooking_time': 10,
+}
+
+# Бюджет SQL-запросов на каждый маршрут api/urls.py и users/urls.py.
+# Число запросов должно укладываться в бюджет и не расти, когда рецептов
+# становится 50 вместо одного, а ингредиентов в рецепте — 30 вместо одного.
+# Пути подставляют id из QueryBudgetTests.ids.
+# QueryBudgetCoverageTests не даёт добавить маршрут без бюджета.
+QUERY_BUDGETS = {
+    'tag-list': Budget('get', '/api/tags/', 1, anonymous=True),
+    'tag-detail': Budget('get', '/api/tags/{tag}/', 1, anonymous=True),
+    'ingredient-list': Budget(
+        'get', '/api/ingredients/?name=а', 1, anonymous=True
+    ),
+    'ingredient-detail': Budget(
+        'get', '/api/ingredients/{ingredient}/', 1, anonymous=True
+    ),
+    'recipe-list-anonymous': Budget(
+        'get', '/api/recipes/?limit=50', 2, anonymous=True
+    ),
+    'recipe-list': Budget('get', '/api/recipes/?limit=50', 2),
+    'recipe-list-by-tags': Budget(
+        'get', '/api/recipes/?limit=50&tags={tag_slug}', 3
+    ),
+    'recipe-list-by-author': Budget(
+        'get', '/api/recipes/?limit=50&author={author}', 3
+    ),
+    'recipe-list-favorited': Budget(
+        'get', '/api/recipes/?limit=50&is_favorited=1', 2
+    ),
+    'recipe-list-in-shopping-cart': Budget(
+        'get', '/api/recipes/?limit=50&is_in_shopping_cart=1', 2
+    ),
+    'recipe-list-fields': Budget(
+        'get', '/api/recipes/?limit=50&fields=id,name,is_favorited', 2
+    ),
+    'recipe-detail-anonymous': Budget(
+        'get', '/api/recipes/{recipe}/', 1, anonymous=True
+    ),
+    'recipe-detail': Budget('get', '/api/recipes/{recipe}/', 2),
+    'recipe-create': Budget(
+        'post', '/api/recipes/', 19, data='create_data',
+        teardown='delete_created_recipe'
+    ),
+    'recipe-update': Budget(
+        'patch', '/api/recipes/{own}/', 24, data='update_data'
+    ),
+    'recipe-delete': Budget(
+        'delete', '/api/recipes/{disposable}/', 12,
+        setup='create_disposable_recipe'
+    ),
+    'recipe-favorite-add': Budget(
+        'post', '/api/recipes/{spare}/favorite/', 4,
+        teardown='remove_spare_favorite'
+    ),
+    'recipe-favorite-remove': Budget(
+        'delete', '/api/recipes/{spare}/favorite/', 2,
+        setup='add_spare_favorite'
+    ),
+    'recipe-shopping-cart-add': Budget(
+        'post', '/api/recipes/{spare}/shopping_cart/', 3,
+        teardown='remove_spare_from_cart'
+    ),
+    'recipe-shopping-cart-remove': Budget(
+        'delete', '/api/recipes/{spare}/shopping_cart/', 3,
+        setup='add_spare_to_cart'
+    ),
+    'recipe-list-ids': Budget(
+        'get', '/api/recipes/?ids={recipe},{own},999999', 1
+    ),
+    'recipe-batch': Budget(
+        'post', '/api/recipes/batch/', 1, data='batch_data'
+    ),
+    'recipe-changes': Budget(
+        'get', '/api/recipes/changes/', 2, anonymous=True
+    ),
+    'recipe-download-shopping-cart': Budget(
+        'get', '/api/recipes/download_shopping_cart/', 1
+    ),
+    'user-list': Budget('get', '/api/users/?limit=50', 2, anonymous=True),
+    'user-list-cursor': Budget(
+        'get', '/api/users/?cursor=&limit=50', 1, anonymous=True
+    ),
+    'user-detail': Budget('get', '/api/users/{author}/', 1),
+    'user-me': Budget('get', '/api/users/me/', 1),
+    'user-me-stats': Budget('get', '/api/users/me/stats/', 3),
+    'subscriptions': Budget(
+        'get', '/api/users/subscriptions/?limit=50&recipes_limit=3', 3
+    ),
+    'user-create': Budget(
+        'post', '/api/users/', 5, anonymous=True, data='user_data',
+        teardown='delete_created_user'
+    ),
+    'user-set-password': Budget(
+        'post', '/api/users/set_password/', 2, data='password_data',
+        teardown='restore_password'
+    ),
+    'token-login': Budget(
+        'post', '/api/auth/token/login/', 6, anonymous=True,
+        data='login_data'
+    ),
+    'token-logout': Budget(
+        'post', '/api/auth/token/logout/', 2, setup='create_reader_token'
+    ),
+    'recipe-events-token': Budget('post', '/api/recipes/events/token/', 0),
+    'subscribe': Budget(
+        'post', '/api/users/{stranger}/subscribe/', 8,
+        teardown='unsubscribe_stranger'
+    ),
+    'unsubscribe': Budget(
+        'delete', '/api/users/{stranger}/subscribe/', 3,
+        setup='subscribe_stranger'
+    ),
+}
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class QueryBudgetTests(APITestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.reader = self.create_user('reader')
+        self.stranger = self.create_user('stranger')
+        self.client.force_authenticate(self.reader)
+        self.anonymous = APIClient()
+        self.tags = list(Tag.objects.all())
+        self.ingredients = list(Ingredient.objects.order_by('pk')[:30])
+        self.authors = []
+        self.own = self.create_recipe(self.reader)
+        self.spare = self.create_recipe(self.stranger)
+
+    @property
+    def ids(self):
+        return {
+            'tag': self.tags[0].pk,
+            'tag_slug': self.tags[0].slug,
+            'ingredient': self.ingredients[0].pk,
+            'author': self.authors[0].pk,
+            'recipe': self.first_recipe.pk,
+            'own': self.own.pk,
+            'spare': self.spare.pk,
+            'stranger': self.stranger.pk,
+            'disposable': getattr(self, 'disposable', None),
+        }
+
+    def create_user(self, username):
+        return CustomUser.objects.create_user(
+            email=f'{username}@example.com', username=username,
+            first_name=username, last_name=username, password='pass'
+        )
+
+    def create_recipe(self, author, ingredients=1):
+        recipe = Recipe.objects.create(
+            author=author, name=f'Рецепт {author}', text='Описание',
+            image='backend_media/recipe.png', cooking_time=5
+        )
+        recipe.tags.set(self.tags)
+        self.add_ingredients(recipe, ingredients)
+        return recipe
+
+    def add_ingredients(self, recipe, count):
+        present = set(recipe.ingredient_in_recipe.values_list(
+            'ingredient_id', flat=True
+        ))
+        IngredientWithAmount.objects.bulk_create(
+            IngredientWithAmount(recipe=recipe, ingredient=ingredient,
+                                 amount=2)
+            for ingredient in self.ingredients[:count]
+            if ingredient.pk not in present
+        )
+
+    def populate(self, recipes, ingredients):
+        # Рецепты читателя из избранного и корзины, по 10 на автора, на
+        # всех авторов читатель подписан.
+        existing = Recipe.objects.exclude(
+            pk__in=(self.own.pk, self.spare.pk)
+        ).count()
+        for index in range(existing, recipes):
+            if index % 10 == 0:
+                author = self.create_user(f'author{index}')
+                self.authors.append(author)
+                Follow.objects.create(user=self.reader, author=author)
+            recipe = self.create_recipe(self.authors[-1], ingredients)
+            FavoriteRecipe.objects.create(user=self.reader, recipe=recipe)
+            ShoppingCart.objects.create(user=self.reader, recipe=recipe)
+        for recipe in Recipe.objects.all():
+            self.add_ingredients(recipe, ingredients)
+        self.first_recipe = Recipe.objects.exclude(
+            pk__in=(self.own.pk, self.spare.pk)
+        ).order_by('pk').first()
+        # В TestCase нет коммитов, поэтому снимки пересобираются вручную.
+        call_command('rebuild_recipe_snapshots', stdout=io.StringIO())
+
+    def create_data(self):
+        return {
+            **RECIPE_DATA,
+            'tags': [tag.pk for tag in self.tags],
+            'ingredients': [
+                {'id': ingredient.pk, 'amount': 5}
+                for ingredient in self.ingredients[:3]
+            ],
+            'image': image_data(),
+        }
+
+    def batch_data(self):
+        return {'ids': list(Recipe.objects.values_list('pk', flat=True))}
+
+    def user_data(self):
+        return {
+            'email': 'newcomer@example.com', 'username': 'newcomer',
+            'first_name': 'Новичок', 'last_name': 'Тестов',
+            'password': NEW_PASSWORD,
+        }
+
+    def delete_created_user(self):
+        CustomUser.objects.filter(username='newcomer').delete()
+
+    def password_data(self):
+        return {'new_password': NEW_PASSWORD, 'current_password': 'pass'}
+
+    def restore_password(self):
+        self.reader.set_password('pass')
+        self.reader.save()
+
+    def login_data(self):
+        return {'email': self.reader.email, 'password': 'pass'}
+
+    def create_reader_token(self):
+        Token.objects.get_or_create(user=self.reader)
+
+    def update_data(self):
+        data = self.create_data()
+        del data['image']
+        data['name'] = 'Изменённый рецепт'
+        return data
+
+    def delete_created_recipe(self):
+        Recipe.objects.filter(name=RECIPE_DATA['name']).delete()
+
+    def create_disposable_recipe(self):
+        self.disposable = self.create_recipe(
+            self.reader, len(self.first_recipe.ingredients.all())
+        ).pk
+
+    def add_spare_favorite(self):
+        FavoriteRecipe.objects.create(user=self.reader, recipe=self.spare)
+
+    def remove_spare_favorite(self):
+        FavoriteRecipe.objects.filter(recipe=self.spare).delete()
+
+    def add_spare_to_cart(self):
+        ShoppingCart.objects.create(user=self.reader, recipe=self.spare)
+
+    def remove_spare_from_cart(self):
+        ShoppingCart.objects.filter(recipe=self.spare).delete()
+
+    def subscribe_stranger(self):
+        Follow.objects.create(user=self.reader, author=self.stranger)
+
+    def unsubscribe_stranger(self):
+        Follow.objects.filter(author=self.stranger).delete()
+
+    def measure(self, name, budget):
+        if budget.setup:
+            getattr(self, budget.setup)()
+        client = self.anonymous if budget.anonymous else self.client
+        data = getattr(self, budget.data)() if budget.data else None
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(client, budget.method)(
+                budget.path.format(**self.ids), data, format='json'
+            )
+        self.assertLess(
+            response.status_code, 400, f'{name}: {response.content}'
+        )
+        if budget.teardown:
+            getattr(self, budget.teardown)()
+        return [query['sql'] for query in queries]
+
+    def measure_all(self):
+        return {
+            name: self.measure(name, budget)
+            for name, budget in QUERY_BUDGETS.items()
+        }
+
+    def test_query_counts_do_not_grow(self):
+        self.populate(recipes=1, ingredients=1)
+        small = self.measure_all()
+        self.populate(recipes=50, ingredients=30)
+        large = self.measure_all()
+        for name, budget in QUERY_BUDGETS.items():
+            with self.subTest(endpoint=name):
+                self.assertLessEqual(
+                    len(small[name]), budget.budget, '\n'.join(small[name])
+                )
+                self.assertEqual(
+                    len(small[name]), len(large[name]),
+                    '\n'.join(large[name])
+                )
+
+
+def api_routes(patterns, prefix=''):
+    # Маршруты в том виде, в каком их отдаёт ResolverMatch.route.
+    for pattern in patterns:
+        route = str(pattern.pattern)
+        if prefix and route.startswith('^'):
+            route = route[1:]
+        route = prefix + route
+        if isinstance(pattern, URLResolver):
+            yield from api_routes(pattern.url_patterns, route)
+        elif route.startswith('api/') and '(?P<format>' not in route:
+            yield route, pattern.name
+
+
+class QueryBudgetCoverageTests(SimpleTestCase):
+
+    def test_every_route_has_budget(self):
+        ids = defaultdict(lambda: 1)
+        budgeted = {
+            resolve(budget.path.format_map(ids).split('?')[0]).route
+            for budget in QUERY_BUDGETS.values()
+        }
+        for route, name in api_routes(get_resolver().url_patterns):
+            if name in UNBUDGETED_ROUTES:
+                continue
+            with self.subTest(route=route):
+                self.assertIn(route, budgeted,
+                              f'Нет бюджета в QUERY_BUDGETS: {route}')
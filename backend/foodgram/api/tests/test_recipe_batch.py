@@ -0,0 +1,59 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe
+from users.models import CustomUser
+
+LIST_URL = '/api/recipes/'
+BATCH_URL = '/api/recipes/batch/'
+
+
+class RecipeBatchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = CustomUser.objects.create_user(
+            email='author@example.com', username='author',
+            first_name='Автор', last_name='Тестов', password='pass'
+        )
+        cls.recipe = Recipe.objects.create(
+            author=author, name='Рецепт', text='Перемешать и подать',
+            image='backend_media/recipe.png', cooking_time=5
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_query_ids(self):
+        response = self.client.get(LIST_URL, {'ids': f'{self.recipe.pk},,7'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [recipe['id'] for recipe in response.data['results']],
+            [self.recipe.pk]
+        )
+        self.assertEqual(response.data['missing'], [7])
+
+    def test_batch_accepts_ints_and_digit_strings(self):
+        response = self.client.post(
+            BATCH_URL, {'ids': [self.recipe.pk, str(self.recipe.pk), '8']},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['missing'], [8])
+
+    def test_invalid_query_ids(self):
+        for value in ('0', '-1', '+1', '1.5', '1e3', '١', str(2 ** 63)):
+            with self.subTest(value=value):
+                response = self.client.get(LIST_URL, {'ids': value})
+                self.assertEqual(response.status_code, 400)
+
+    def test_invalid_batch_ids(self):
+        for value in (True, 1.5, 0, 2 ** 63, None, [1], '1.0'):
+            with self.subTest(value=value):
+                response = self.client.post(
+                    BATCH_URL, {'ids': [value]}, format='json'
+                )
+                self.assertEqual(response.status_code, 400)
@@ -0,0 +1,142 @@
+import asyncio
+import json
+from unittest import mock
+from urllib.parse import urlencode
+
+from django.core import signing
+from django.test import TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+
+from api.streams import EVENTS_TOKEN_SALT, load_backlog, recipe_events
+from foodgram.pubsub import hub
+from recipes.events import author_channel, recipe_event
+from recipes.models import Recipe
+from users.models import CustomUser, Follow
+
+TOKEN_URL = '/api/recipes/events/token/'
+
+
+def make_scope(query=None, headers=()):
+    return {
+        'type': 'http',
+        'method': 'GET',
+        'path': '/api/recipes/events/',
+        'query_string': urlencode(query or {}).encode(),
+        'headers': list(headers),
+    }
+
+
+@override_settings(SSE_HEARTBEAT=10, SSE_FOLLOWS_REFRESH=0.05)
+class RecipeEventsTests(TransactionTestCase):
+    # Поток читает базу из пула потоков, поэтому данные должны быть
+    # закоммичены.
+
+    def setUp(self):
+        self.reader = CustomUser.objects.create_user(
+            email='reader@example.com', username='reader',
+            first_name='Читатель', last_name='Тестов', password='pass'
+        )
+        self.author = CustomUser.objects.create_user(
+            email='author@example.com', username='author',
+            first_name='Автор', last_name='Тестов', password='pass'
+        )
+        self.recipe = Recipe.objects.create(
+            author=self.author, name='Суп', text='Сварить',
+            image='backend_media/soup.png', cooking_time=30
+        )
+
+    def get_token(self):
+        client = APIClient()
+        client.force_authenticate(self.reader)
+        response = client.post(TOKEN_URL)
+        self.assertEqual(response.status_code, 200)
+        return response.data['token']
+
+    def run_stream(self, scope, during=None, duration=0.3):
+        sent = []
+
+        async def receive():
+            await asyncio.sleep(duration)
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+
+        async def main():
+            task = asyncio.ensure_future(recipe_events(scope, receive, send))
+            if during is not None:
+                await during()
+            await task
+
+        asyncio.run(main())
+        return sent
+
+    def test_token_requires_authentication(self):
+        self.assertEqual(APIClient().post(TOKEN_URL).status_code, 401)
+
+    def test_query_token_authenticates(self):
+        sent = self.run_stream(make_scope({'token': self.get_token()}),
+                               duration=0.05)
+        self.assertEqual(sent[0]['status'], 200)
+
+    def test_invalid_tokens_are_rejected(self):
+        expired = signing.dumps({'user': self.reader.pk},
+                                salt=EVENTS_TOKEN_SALT)
+        for query, settings in (
+            ({}, {}),
+            ({'token': 'подделка'}, {}),
+            ({'token': expired}, {'SSE_TOKEN_MAX_AGE': -1}),
+        ):
+            with self.subTest(query=query), override_settings(**settings):
+                sent = self.run_stream(make_scope(query), duration=0)
+                self.assertEqual(sent[0]['status'], 401)
+
+    def test_new_follow_is_picked_up_without_reconnect(self):
+        event = recipe_event(self.recipe)
+
+        async def follow_and_publish():
+            await asyncio.sleep(0.02)
+            await asyncio.get_running_loop().run_in_executor(
+                None, lambda: Follow.objects.create(
+                    user=self.reader, author=self.author
+                )
+            )
+            await asyncio.sleep(0.15)
+            hub.dispatch(author_channel(self.author.pk), event)
+
+        sent = self.run_stream(
+            make_scope({'token': self.get_token()}), follow_and_publish
+        )
+        bodies = b''.join(message.get('body', b'') for message in sent[1:])
+        self.assertIn(json.dumps(event, ensure_ascii=False).encode(), bodies)
+
+    def test_recipe_published_during_replay_is_sent_once(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        published = []
+
+        def publish(name):
+            published.append(Recipe.objects.create(
+                author=self.author, name=name, text='Сварить',
+                image='backend_media/soup.png', cooking_time=30
+            ).pk)
+
+        def load_and_publish(authors, last_id):
+            # Один рецепт успевает попасть в выборку из базы, другой
+            # публикуется сразу после неё.
+            publish('Борщ')
+            backlog = load_backlog(authors, last_id)
+            publish('Щи')
+            return backlog
+
+        scope = make_scope({'token': self.get_token()}, [
+            (b'last-event-id', str(self.recipe.pk - 1).encode()),
+        ])
+        # Подписка этого теста привязывает хаб к его циклу событий.
+        with mock.patch.object(hub, 'loop', None), mock.patch(
+            'api.streams.load_backlog', side_effect=load_and_publish
+        ):
+            sent = self.run_stream(scope)
+        bodies = b''.join(message.get('body', b'') for message in sent[1:])
+        for pk in [self.recipe.pk] + published:
+            with self.subTest(recipe=pk):
+                self.assertEqual(bodies.count(f'id: {pk}\n'.encode()), 1)
@@ -0,0 +1,87 @@
+import os
+import sqlite3
+import tempfile
+from unittest import skipUnless
+
+from django.core.cache import cache
+from django.db import connection, connections
+from django.test import TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+
+from foodgram.db import REPLICA_ALIAS
+from recipes.models import FavoriteRecipe, Recipe
+from users.models import CustomUser
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Реплика — копия файла SQLite')
+class ReplicaRoutingTests(TransactionTestCase):
+    # Основная база — тестовая SQLite, реплика — её копия в отдельном
+    # файле, которая после копирования перестаёт получать записи.
+
+    def setUp(self):
+        cache.clear()
+        self.reader = CustomUser.objects.create_user(
+            email='reader@example.com', username='reader',
+            first_name='Читатель', last_name='Тестов', password='pass'
+        )
+        self.recipe = Recipe.objects.create(
+            author=self.reader, name='Суп', text='Сварить',
+            image='backend_media/soup.png', cooking_time=30
+        )
+        self.add_replica()
+
+    def add_replica(self):
+        descriptor, path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(descriptor)
+        self.addCleanup(os.remove, path)
+        connection.ensure_connection()
+        replica = sqlite3.connect(path)
+        connection.connection.backup(replica)
+        replica.close()
+        connections.databases[REPLICA_ALIAS] = {
+            **connections.databases['default'], 'NAME': path,
+        }
+        self.addCleanup(self.remove_replica)
+
+    def remove_replica(self):
+        connections[REPLICA_ALIAS].close()
+        del connections[REPLICA_ALIAS]
+        del connections.databases[REPLICA_ALIAS]
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def is_favorited(self, client):
+        response = client.get(f'/api/recipes/{self.recipe.pk}/')
+        self.assertEqual(response.status_code, 200)
+        return response.data['is_favorited']
+
+    def test_write_goes_to_primary_and_pins_next_read(self):
+        client = self.client_for(self.reader)
+        self.assertFalse(self.is_favorited(client))
+        response = client.post(f'/api/recipes/{self.recipe.pk}/favorite/')
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(FavoriteRecipe.objects.using('default').exists())
+        self.assertFalse(
+            FavoriteRecipe.objects.using(REPLICA_ALIAS).exists()
+        )
+        # Закрепление едет в cookie и видно воркеру с другим кэшем.
+        cache.clear()
+        self.assertTrue(self.is_favorited(client))
+        # Без закрепления безопасное чтение идёт на отстающую реплику.
+        self.assertFalse(self.is_favorited(self.client_for(self.reader)))
+
+    @override_settings(REPLICA_PIN_SECONDS=0)
+    def test_without_pin_reads_go_to_replica(self):
+        client = self.client_for(self.reader)
+        client.post(f'/api/recipes/{self.recipe.pk}/favorite/')
+        self.assertFalse(self.is_favorited(client))
+
+    @override_settings(CACHE_SHARED=True)
+    def test_shared_cache_pins_clients_without_cookies(self):
+        self.client_for(self.reader).post(
+            f'/api/recipes/{self.recipe.pk}/favorite/'
+        )
+        self.assertTrue(self.is_favorited(self.client_for(self.reader)))
@@ -0,0 +1,98 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from api.management.commands.run_benchmarks import Command
+from recipes.models import Recipe
+from users.models import CustomUser
+
+SCENARIO = 'recipe_list'
+# Замер подменяется, чтобы сравнение с эталоном не зависело от машины.
+MEASURED = {
+    'p50_ms': 10.0, 'p90_ms': 12.0, 'p95_ms': 13.0, 'p99_ms': 15.0,
+    'mean_ms': 10.5, 'max_ms': 16.0, 'queries': 4, 'alloc_peak_kb': 1000.0,
+}
+
+
+@override_settings(DB_DISPOSABLE=True)
+class RunBenchmarksBaselineTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = CustomUser.objects.create_user(
+            email='author@example.com', username='author',
+            first_name='Автор', last_name='Тестов', password='pass'
+        )
+        Recipe.objects.create(
+            author=author, name='Суп', text='Сварить',
+            image='backend_media/soup.png', cooking_time=30
+        )
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write_baseline(self, vendor=None, **metrics):
+        path = os.path.join(self.directory, 'baseline.json')
+        with open(path, 'w') as file:
+            json.dump({
+                'meta': {'vendor': vendor or connection.vendor},
+                'results': {SCENARIO: {**MEASURED, **metrics}},
+            }, file)
+        return path
+
+    def run_benchmarks(self, baseline, margin='0.25'):
+        stdout = StringIO()
+        with mock.patch.object(Command, 'measure', return_value=MEASURED):
+            call_command(
+                'run_benchmarks', '--scenario', SCENARIO,
+                '--output', os.path.join(self.directory, 'results.json'),
+                '--baseline', baseline, '--margin', margin, stdout=stdout
+            )
+        return stdout.getvalue()
+
+    def test_within_margin_passes(self):
+        for metrics in (
+            {},
+            # Замер превышает эталон, но не больше чем на 25%.
+            {'p50_ms': 8.0, 'p95_ms': 10.5, 'alloc_peak_kb': 850.0},
+            {'queries': 5},
+        ):
+            with self.subTest(metrics=metrics):
+                self.assertIn('Эталон не превышен', self.run_benchmarks(
+                    self.write_baseline(**metrics)
+                ))
+
+    def test_small_latency_difference_is_noise(self):
+        # Без допуска, но разница меньше миллисекунды.
+        self.assertIn('Эталон не превышен', self.run_benchmarks(
+            self.write_baseline(p95_ms=12.5), margin='0'
+        ))
+
+    def test_regressions_fail(self):
+        for metrics, metric in (
+            ({'p50_ms': 7.0}, 'p50_ms'),
+            ({'p95_ms': 10.0}, 'p95_ms'),
+            ({'alloc_peak_kb': 700.0}, 'alloc_peak_kb'),
+            ({'queries': 3}, 'queries'),
+        ):
+            with self.subTest(metric=metric):
+                with self.assertRaisesMessage(
+                    CommandError, f'{SCENARIO}.{metric}:'
+                ):
+                    self.run_benchmarks(self.write_baseline(**metrics))
+
+    def test_query_growth_fails_regardless_of_margin(self):
+        with self.assertRaisesMessage(CommandError, f'{SCENARIO}.queries:'):
+            self.run_benchmarks(self.write_baseline(queries=3), margin='10')
+
+    def test_other_vendor_baseline_fails(self):
+        with self.assertRaisesMessage(CommandError, 'Эталон снят на'):
+            self.run_benchmarks(self.write_baseline(vendor='oracle'))
@@ -0,0 +1,111 @@
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe
+from recipes.snapshots import rebuild_snapshot
+from users.models import CustomUser, Follow
+
+
+class SparseFieldsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = CustomUser.objects.create_user(
+            email='reader@example.com', username='reader',
+            first_name='Читатель', last_name='Тестов', password='pass'
+        )
+        cls.author = CustomUser.objects.create_user(
+            email='author@example.com', username='author',
+            first_name='Автор', last_name='Тестов', password='pass'
+        )
+        cls.recipe = Recipe.objects.create(
+            author=cls.author, name='Суп', text='Сварить',
+            image='backend_media/soup.png', cooking_time=30
+        )
+        rebuild_snapshot(cls.recipe.pk)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+
+    def get(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def first(self, url, **params):
+        return self.get(url, **params)['results'][0]
+
+    def assertSparse(self, item, fields=None, omit=None):
+        if fields is not None:
+            self.assertEqual(set(item), set(fields))
+        for name in omit or ():
+            self.assertNotIn(name, item)
+
+    def check_both_paths(self, check):
+        for fast in (False, True):
+            with self.subTest(fast=fast), override_settings(
+                API_FAST_SERIALIZERS=fast
+            ):
+                check()
+
+    def test_recipe_list(self):
+        def check():
+            item = self.first('/api/recipes/', fields='id,name,is_favorited')
+            self.assertEqual(item, {
+                'id': self.recipe.pk, 'name': 'Суп', 'is_favorited': False
+            })
+            item = self.first('/api/recipes/', omit='author,text')
+            self.assertSparse(item, omit=('author', 'text'))
+            self.assertEqual(item['name'], 'Суп')
+            self.assertIn('is_in_shopping_cart', item)
+
+        self.check_both_paths(check)
+
+    def test_recipe_detail(self):
+        url = f'/api/recipes/{self.recipe.pk}/'
+        self.assertEqual(self.get(url, fields='id,cooking_time'), {
+            'id': self.recipe.pk, 'cooking_time': 30
+        })
+        item = self.get(url, omit='ingredients,tags')
+        self.assertSparse(item, omit=('ingredients', 'tags'))
+        self.assertEqual(item['author']['username'], 'author')
+
+    def test_subscription_list(self):
+        def check():
+            url = '/api/users/subscriptions/'
+            item = self.first(url, fields='id,recipes_count')
+            self.assertEqual(item, {'id': self.author.pk, 'recipes_count': 1})
+            item = self.first(url, omit='recipes,is_subscribed')
+            self.assertSparse(item, omit=('recipes', 'is_subscribed'))
+            self.assertEqual(item['recipes_count'], 1)
+
+        self.check_both_paths(check)
+
+    def test_user_list(self):
+        item = self.first('/api/users/', fields='id,is_subscribed')
+        self.assertEqual(item, {'id': self.reader.pk, 'is_subscribed': False})
+        item = self.first('/api/users/', omit='email')
+        self.assertSparse(item, omit=('email',))
+        self.assertIn('username', item)
+
+    def test_user_detail(self):
+        url = f'/api/users/{self.author.pk}/'
+        self.assertEqual(self.get(url, fields='username,is_subscribed'), {
+            'username': 'author', 'is_subscribed': True
+        })
+        self.assertSparse(self.get(url, omit='email,first_name'),
+                          omit=('email', 'first_name'))
+
+    def test_unknown_field_names(self):
+        for url in ('/api/recipes/', f'/api/recipes/{self.recipe.pk}/',
+                    '/api/users/subscriptions/', '/api/users/',
+                    f'/api/users/{self.author.pk}/'):
+            for param in ('fields', 'omit'):
+                with self.subTest(url=url, param=param):
+                    response = self.client.get(url, {param: 'id,пароль,zz'})
+                    self.assertEqual(response.status_code, 400)
+                    self.assertEqual(response.json(), {
+                        param: ['Неизвестные поля: zz, пароль']
+                    })
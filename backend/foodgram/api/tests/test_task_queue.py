@@ -0,0 +1,154 @@
+import json
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import OperationalError
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from tasks.models import Task
+from tasks.queue import Lease, claim_tasks, run_task, task
+
+RETRY_DELAY = 10
+TIMEOUT = 60
+calls = []
+
+
+@task('tests.record', timeout=TIMEOUT)
+def record_task(value):
+    calls.append(value)
+
+
+@task('tests.fail', max_attempts=3, retry_delay=RETRY_DELAY, timeout=TIMEOUT)
+def fail_task():
+    raise RuntimeError('сбой')
+
+
+class TaskQueueTests(TestCase):
+
+    def setUp(self):
+        calls.clear()
+
+    def create(self, name, *args):
+        return Task.objects.create(
+            name=name, payload=json.dumps({'args': args, 'kwargs': {}}),
+            max_attempts=3
+        )
+
+    def claim_and_run(self, worker='worker-1'):
+        for pk in claim_tasks(worker, 1):
+            run_task(Task.objects.get(pk=pk), worker)
+
+    def expire(self, instance):
+        # Таймаут видимости истёк.
+        Task.objects.filter(pk=instance.pk).update(
+            run_at=timezone.now() - timedelta(seconds=1)
+        )
+
+    def test_success_deletes_task(self):
+        instance = self.create('tests.record', 1)
+        self.claim_and_run()
+        self.assertEqual(calls, [1])
+        self.assertFalse(Task.objects.filter(pk=instance.pk).exists())
+
+    def test_retry_with_backoff(self):
+        instance = self.create('tests.fail')
+        for attempt, delay in ((1, RETRY_DELAY), (2, RETRY_DELAY * 2)):
+            started = timezone.now()
+            with self.assertLogs('tasks.queue', 'ERROR'):
+                self.claim_and_run()
+            instance.refresh_from_db()
+            self.assertEqual(instance.status, Task.PENDING)
+            self.assertEqual(instance.attempts, attempt)
+            self.assertIn('сбой', instance.last_error)
+            self.assertGreaterEqual(
+                instance.run_at, started + timedelta(seconds=delay)
+            )
+            self.assertEqual(claim_tasks('worker-1', 1), [])
+            self.expire(instance)
+
+    def test_fails_after_max_attempts(self):
+        instance = self.create('tests.fail')
+        for _ in range(3):
+            self.expire(instance)
+            with self.assertLogs('tasks.queue', 'ERROR'):
+                self.claim_and_run()
+        instance.refresh_from_db()
+        self.assertEqual(instance.status, Task.FAILED)
+        self.assertEqual(instance.attempts, 3)
+        self.expire(instance)
+        self.assertEqual(claim_tasks('worker-1', 1), [])
+
+    def test_claimed_task_is_invisible_until_timeout(self):
+        instance = self.create('tests.record', 1)
+        self.assertEqual(claim_tasks('worker-1', 1), [instance.pk])
+        self.assertEqual(claim_tasks('worker-2', 1), [])
+        self.expire(instance)
+        self.assertEqual(claim_tasks('worker-2', 1), [instance.pk])
+        # Первый воркер потерял задачу и не пишет результат.
+        stale = Task.objects.get(pk=instance.pk)
+        stale.attempts, stale.locked_by = 1, 'worker-1'
+        run_task(stale, 'worker-1')
+        instance.refresh_from_db()
+        self.assertEqual(instance.locked_by, 'worker-2')
+
+    def test_worker_dying_on_last_attempt_fails_task(self):
+        instance = self.create('tests.record', 1)
+        Task.objects.filter(pk=instance.pk).update(
+            status=Task.RUNNING, attempts=3, locked_by='worker-1'
+        )
+        self.expire(instance)
+        self.assertEqual(claim_tasks('worker-2', 1), [])
+        instance.refresh_from_db()
+        self.assertEqual(instance.status, Task.FAILED)
+        self.assertEqual(calls, [])
+
+    def test_lease_extends_visibility(self):
+        instance = self.create('tests.record', 1)
+        claim_tasks('worker-1', 1)
+        instance.refresh_from_db()
+        lease = Lease(instance, 'worker-1')
+        Task.objects.filter(pk=instance.pk).update(
+            run_at=timezone.now() + timedelta(seconds=1)
+        )
+        self.assertTrue(lease.extend())
+        instance.refresh_from_db()
+        self.assertGreater(
+            instance.run_at, timezone.now() + timedelta(seconds=TIMEOUT - 5)
+        )
+        self.expire(instance)
+        claim_tasks('worker-2', 1)
+        self.assertFalse(lease.extend())
+
+
+class RunWorkerTests(TransactionTestCase):
+    # Воркер забирает задачи в отдельных транзакциях.
+
+    def test_crash_around_task_is_logged(self):
+        failing, passing = (
+            Task.objects.create(
+                name='tests.record', payload=json.dumps({
+                    'args': [value], 'kwargs': {},
+                }), max_attempts=3
+            ).pk
+            for value in (1, 2)
+        )
+        executed = []
+
+        def execute_task(pk, worker):
+            if pk == failing:
+                raise OperationalError('соединение разорвано')
+            executed.append(pk)
+
+        with mock.patch('signal.signal'), mock.patch(
+            'tasks.management.commands.run_worker.execute_task',
+            side_effect=execute_task
+        ), self.assertLogs(
+            'tasks.management.commands.run_worker', 'ERROR'
+        ) as logs:
+            call_command('run_worker', '--once', '--concurrency', '2',
+                         stdout=StringIO())
+        self.assertEqual(executed, [passing])
+        self.assertIn(f'задачи {failing}', logs.output[0])
@@ -0,0 +1,114 @@
+import multiprocessing
+import tempfile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from api.throttling import (CacheConcurrencyLimiter, FileConcurrencyLimiter,
+                            get_concurrency_limiter, local_store)
+
+TAGS_URL = '/api/tags/'
+NGINX_ADDR = '172.18.0.5'
+DEEP_PAGE_URL = '/api/recipes/?page=51'
+
+
+def throttle_settings(num_proxies):
+    return {
+        **settings.REST_FRAMEWORK,
+        'DEFAULT_THROTTLE_RATES': {
+            **settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'],
+            'read': '1/min',
+        },
+        'NUM_PROXIES': num_proxies,
+    }
+
+
+class AnonymousThrottleIdentTests(TestCase):
+
+    def setUp(self):
+        local_store.clear()
+        self.client = APIClient()
+
+    def get(self, forwarded_for=None):
+        extra = {'REMOTE_ADDR': NGINX_ADDR}
+        if forwarded_for is not None:
+            extra['HTTP_X_FORWARDED_FOR'] = forwarded_for
+        return self.client.get(TAGS_URL, **extra).status_code
+
+    @override_settings(REST_FRAMEWORK=throttle_settings(1))
+    def test_clients_behind_proxy_have_own_buckets(self):
+        self.assertEqual(self.get('203.0.113.1'), 200)
+        self.assertEqual(self.get('203.0.113.2'), 200)
+        self.assertEqual(self.get('203.0.113.1'), 429)
+
+    @override_settings(REST_FRAMEWORK=throttle_settings(1))
+    def test_spoofed_forwarded_for_is_ignored(self):
+        # nginx дописывает настоящий адрес клиента в конец заголовка.
+        self.assertEqual(self.get('198.51.100.1, 203.0.113.1'), 200)
+        self.assertEqual(self.get('198.51.100.2, 203.0.113.1'), 429)
+
+    @override_settings(REST_FRAMEWORK=throttle_settings(0))
+    def test_without_proxy_forwarded_for_is_ignored(self):
+        self.assertEqual(self.get('203.0.113.1'), 200)
+        self.assertEqual(self.get('203.0.113.2'), 429)
+
+
+def hold_slot(acquired, done):
+    # Другой воркер: занимает слот и держит его до сигнала.
+    slot = FileConcurrencyLimiter().acquire()
+    acquired.set()
+    done.wait(10)
+    FileConcurrencyLimiter().release(slot)
+
+
+@override_settings(EXPENSIVE_CONCURRENCY=1,
+                   EXPENSIVE_SLOTS_DIR=tempfile.mkdtemp())
+class ConcurrencyLimiterTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        local_store.clear()
+
+    def assert_sheds(self, first, second):
+        slot = first.acquire()
+        self.assertIsNotNone(slot)
+        self.assertIsNone(second.acquire())
+        first.release(slot)
+        slot = second.acquire()
+        self.assertIsNotNone(slot)
+        second.release(slot)
+
+    @override_settings(CACHE_SHARED=True)
+    def test_cache_slots_are_shared(self):
+        self.assert_sheds(CacheConcurrencyLimiter(),
+                          CacheConcurrencyLimiter())
+
+    def test_file_slots_are_shared(self):
+        self.assert_sheds(FileConcurrencyLimiter(), FileConcurrencyLimiter())
+
+    def test_slot_held_by_other_process_sheds_request(self):
+        context = multiprocessing.get_context('fork')
+        acquired, done = context.Event(), context.Event()
+        worker = context.Process(target=hold_slot, args=(acquired, done))
+        worker.start()
+        try:
+            self.assertTrue(acquired.wait(10))
+            response = APIClient().get(DEEP_PAGE_URL)
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response['Retry-After'],
+                             str(settings.EXPENSIVE_RETRY_AFTER))
+        finally:
+            done.set()
+            worker.join(10)
+        self.assertNotEqual(APIClient().get(DEEP_PAGE_URL).status_code, 503)
+
+    def test_slot_is_released_after_response(self):
+        for _ in range(3):
+            self.assertNotEqual(
+                APIClient().get(DEEP_PAGE_URL).status_code, 503
+            )
+        slot = get_concurrency_limiter().acquire()
+        self.assertIsNotNone(slot)
+        get_concurrency_limiter().release(slot)
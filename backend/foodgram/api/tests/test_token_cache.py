@@ -0,0 +1,94 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.authentication import TokenCache, token_cache
+from users.models import CustomUser
+
+ME_URL = '/api/users/me/'
+
+
+@override_settings(CACHE_SHARED=True)
+class TokenCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            email='reader@example.com', username='reader',
+            first_name='Читатель', last_name='Тестов', password='pass'
+        )
+
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        # Объекты setUpTestData общие для тестов, а тесты их меняют.
+        self.user = CustomUser.objects.get(pk=self.user.pk)
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def auth_queries(self):
+        # Запросы к базе на одну аутентификацию.
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(ME_URL).status_code, 200)
+        return [
+            query['sql'] for query in queries.captured_queries
+            if 'authtoken_token' in query['sql']
+        ]
+
+    def test_cached_token_skips_database(self):
+        self.assertEqual(len(self.auth_queries()), 1)
+        self.assertEqual(self.auth_queries(), [])
+
+    def test_logout_invalidates(self):
+        self.auth_queries()
+        response = self.client.post('/api/auth/token/logout/')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.client.get(ME_URL).status_code, 401)
+
+    def test_token_delete_invalidates(self):
+        self.auth_queries()
+        self.token.delete()
+        self.assertEqual(self.client.get(ME_URL).status_code, 401)
+
+    def test_deactivation_invalidates(self):
+        self.auth_queries()
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(ME_URL).status_code, 401)
+
+    def test_password_change_invalidates(self):
+        self.auth_queries()
+        self.user.set_password('new-pass')
+        self.user.save()
+        self.assertEqual(len(self.auth_queries()), 1)
+
+    def test_stale_write_after_invalidation_is_rejected(self):
+        # Запрос прочитал токен из базы, затем токен отозвали, и только
+        # потом запрос записал прочитанное в кэш.
+        key = self.token.key
+        generation = token_cache.generation(key)
+        stale = (self.user, self.token)
+        token_cache.invalidate(key)
+        token_cache.set(key, stale, generation)
+        token_cache.clear()
+        self.assertIsNone(token_cache.get(key))
+
+    @override_settings(TOKEN_CACHE_LOCAL_TIMEOUT=0)
+    def test_invalidation_reaches_other_workers(self):
+        first, second = TokenCache(), TokenCache()
+        key = self.token.key
+        first.set(key, (self.user, self.token), first.generation(key))
+        self.assertIsNotNone(second.get(key))
+        first.invalidate(key)
+        self.assertIsNone(second.get(key))
+
+    @override_settings(CACHE_SHARED=False)
+    def test_process_local_cache_is_not_used(self):
+        self.assertEqual(len(self.auth_queries()), 1)
+        self.assertEqual(len(self.auth_queries()), 1)
+        self.token.delete()
+        self.assertEqual(self.client.get(ME_URL).status_code, 401)
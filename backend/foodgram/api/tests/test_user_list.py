@@ -0,0 +1,106 @@
+import json
+from unittest import mock
+
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from api.views import CustomUserViewSet
+from users.models import CustomUser, Follow
+
+USERS_URL = '/api/users/'
+
+
+class UserListTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            CustomUser.objects.create_user(
+                email=f'user{number}@example.com', username=f'user{number}',
+                first_name='Пользователь', last_name='Тестов',
+                password='pass'
+            )
+            for number in range(5)
+        ]
+        cls.admin = CustomUser.objects.create_user(
+            email='admin@example.com', username='admin',
+            first_name='Админ', last_name='Тестов', password='pass',
+            is_staff=True
+        )
+        Follow.objects.create(user=cls.admin, author=cls.users[0])
+
+    def client_for(self, user=None):
+        client = APIClient()
+        if user is not None:
+            client.force_authenticate(user)
+        return client
+
+    def test_page_number_response(self):
+        response = self.client_for().get(USERS_URL, {'limit': 2, 'page': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 6)
+        self.assertIn('page=3', response.data['next'])
+        self.assertEqual(
+            [user['id'] for user in response.data['results']],
+            [self.users[2].pk, self.users[3].pk]
+        )
+
+    def test_cursor_response(self):
+        client = self.client_for()
+        response = client.get(USERS_URL, {'limit': 4, 'cursor': ''})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('count', response.data)
+        self.assertIsNone(response.data['previous'])
+        self.assertIn('cursor=', response.data['next'])
+        ids = [user['id'] for user in response.data['results']]
+        response = client.get(response.data['next'])
+        self.assertIsNone(response.data['next'])
+        ids += [user['id'] for user in response.data['results']]
+        self.assertEqual(
+            ids, [user.pk for user in self.users] + [self.admin.pk]
+        )
+
+    def test_stream_requires_staff(self):
+        response = self.client_for(self.users[0]).get(
+            USERS_URL, {'stream': 1}
+        )
+        self.assertEqual(response.status_code, 403)
+
+    def stream(self, **params):
+        response = self.client_for(self.admin).get(
+            USERS_URL, {'stream': 1, **params}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        return list(response.streaming_content)
+
+    @mock.patch.object(CustomUserViewSet, 'stream_chunk_size', 2)
+    def test_stream_is_json_array_across_chunks(self):
+        chunks = self.stream()
+        # Скобки и три куска по две строки.
+        self.assertEqual(len(chunks), 5)
+        users = json.loads(b''.join(chunks))
+        self.assertEqual(
+            [user['id'] for user in users],
+            [user.pk for user in self.users] + [self.admin.pk]
+        )
+        self.assertEqual(set(users[0]), set(CustomUserViewSet.sparse_fields))
+        self.assertTrue(users[0]['is_subscribed'])
+        self.assertFalse(users[1]['is_subscribed'])
+
+    @mock.patch.object(CustomUserViewSet, 'stream_chunk_size', 4)
+    def test_stream_honours_fields(self):
+        users = json.loads(b''.join(self.stream(fields='id,username')))
+        self.assertEqual(len(users), 6)
+        self.assertEqual(users[0], {
+            'id': self.users[0].pk, 'username': 'user0'
+        })
+        users = json.loads(b''.join(self.stream(omit='email,is_subscribed')))
+        self.assertEqual(len(users), 6)
+        self.assertNotIn('email', users[0])
+        self.assertNotIn('is_subscribed', users[0])
+
+    def test_empty_stream(self):
+        with mock.patch.object(CustomUserViewSet, 'get_queryset',
+                               lambda view: CustomUser.objects.none()):
+            self.assertEqual(json.loads(b''.join(self.stream())), [])
@@ -0,0 +1,190 @@
+import fcntl
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.exceptions import APIException
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+READ_SCOPE = 'read'
+WRITE_SCOPE = 'write'
+EXPENSIVE_SCOPE = 'expensive'
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    # '20/min' -> (ёмкость ведра, токенов в секунду).
+    count, period = rate.split('/')
+    return int(count), int(count) / PERIODS[period[0]]
+
+
+def get_throttle_scope(request, view):
+    # Класс эндпоинта: действие из view.throttle_scopes, глубокая страница
+    # списка как дорогой запрос, иначе чтение или запись по методу.
+    action = getattr(view, 'action', None)
+    scopes = getattr(view, 'throttle_scopes', {})
+    if action in scopes:
+        return scopes[action]
+    page = request.query_params.get('page', '')
+    if page.isdigit() and int(page) > settings.THROTTLE_DEEP_PAGE:
+        return EXPENSIVE_SCOPE
+    return READ_SCOPE if request.method in SAFE_METHODS else WRITE_SCOPE
+
+
+def take_token(state, capacity, rate, now):
+    tokens, updated = state or (capacity, now)
+    tokens = min(capacity, tokens + (now - updated) * rate)
+    if tokens >= 1:
+        return (tokens - 1, now), None
+    return (tokens, now), (1 - tokens) / rate
+
+
+class LocalBucketStore:
+    # Вёдра в памяти процесса: без сетевых вызовов, но у каждого воркера
+    # gunicorn свой лимит.
+
+    def __init__(self):
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key, capacity, rate):
+        now = time.monotonic()
+        with self._lock:
+            state, wait = take_token(
+                self._buckets.get(key), capacity, rate, now
+            )
+            self._buckets[key] = state
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > settings.THROTTLE_LOCAL_SIZE:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class CacheBucketStore:
+    # Вёдра в общем Django-кэше: лимит на все воркеры. Чтение и запись не
+    # атомарны, поэтому при гонке лимит может быть немного превышен.
+    key_prefix = 'throttle'
+
+    def consume(self, key, capacity, rate):
+        cache_key = f'{self.key_prefix}:{key}'
+        state, wait = take_token(
+            cache.get(cache_key), capacity, rate, time.time()
+        )
+        cache.set(cache_key, state, int(capacity / rate) + 1)
+        return wait
+
+    def clear(self):
+        pass
+
+
+local_store = LocalBucketStore()
+cache_store = CacheBucketStore()
+
+
+def get_bucket_store():
+    if settings.THROTTLE_STORE == 'cache':
+        return cache_store
+    return local_store
+
+
+class TokenBucketThrottle(BaseThrottle):
+    # Ведро токенов на пару (пользователь или IP, класс эндпоинта).
+    # Ставки берутся из REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'].
+
+    def allow_request(self, request, view):
+        self._wait = None
+        if not settings.THROTTLE_ENABLED:
+            return True
+        scope = get_throttle_scope(request, view)
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(scope)
+        if rate is None:
+            return True
+        if request.user.is_authenticated:
+            ident = f'user:{request.user.pk}'
+        else:
+            ident = f'ip:{self.get_ident(request)}'
+        self._wait = get_bucket_store().consume(
+            f'{scope}:{ident}', *parse_rate(rate)
+        )
+        return self._wait is None
+
+    def wait(self):
+        return self._wait
+
+
+class ServiceOverloaded(APIException):
+    status_code = 503
+    default_detail = 'Сервер перегружен, повторите запрос позже.'
+    default_code = 'overloaded'
+
+    def __init__(self, wait):
+        super().__init__()
+        self.wait = wait
+
+
+class CacheConcurrencyLimiter:
+    # Счётчик выполняемых дорогих запросов в общем кэше: лимит на все
+    # воркеры и хосты. Счётчик живёт EXPENSIVE_SLOT_TIMEOUT секунд, поэтому
+    # слоты упавшего воркера не занимают лимит навсегда.
+    key = 'expensive:in-flight'
+
+    def acquire(self):
+        cache.add(self.key, 0, settings.EXPENSIVE_SLOT_TIMEOUT)
+        try:
+            in_flight = cache.incr(self.key)
+        except ValueError:
+            # Счётчик истёк между add и incr.
+            cache.add(self.key, 1, settings.EXPENSIVE_SLOT_TIMEOUT)
+            return True
+        if in_flight > settings.EXPENSIVE_CONCURRENCY:
+            self.release(True)
+            return None
+        return True
+
+    def release(self, slot):
+        try:
+            cache.decr(self.key)
+        except ValueError:
+            pass
+
+
+class FileConcurrencyLimiter:
+    # Без общего кэша слоты — файлы с блокировкой flock в общем для
+    # воркеров каталоге: лимит на все процессы хоста. Блокировку упавшего
+    # процесса снимает ОС.
+
+    def acquire(self):
+        directory = settings.EXPENSIVE_SLOTS_DIR
+        os.makedirs(directory, exist_ok=True)
+        for number in range(settings.EXPENSIVE_CONCURRENCY):
+            slot = open(os.path.join(directory, f'slot-{number}'), 'a')
+            try:
+                fcntl.flock(slot, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                slot.close()
+                continue
+            return slot
+        return None
+
+    def release(self, slot):
+        fcntl.flock(slot, fcntl.LOCK_UN)
+        slot.close()
+
+
+cache_limiter = CacheConcurrencyLimiter()
+file_limiter = FileConcurrencyLimiter()
+
+
+def get_concurrency_limiter():
+    if settings.CACHE_SHARED:
+        return cache_limiter
+    return file_limiter
@@ -1,8 +1,8 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from .views import (FavoriteView, IngredientViewSet, RecipeViewSet,
-                    TagViewSet)
+from .views import (FavoriteView, IngredientViewSet, RecipeEventsTokenView,
+                    RecipeViewSet, TagViewSet)
 
 app_name = 'api'
 
@@ -14,6 +14,7 @@ router.register('recipes', RecipeViewSet, basename='recipe')
 
 
 urlpatterns = [
+    path('recipes/events/token/', RecipeEventsTokenView.as_view()),
     path('', include(router.urls)),
     path('recipes/<int:favorite_id>/favorite/', FavoriteView.as_view()),
 
@@ -1,32 +1,126 @@
-from django.db.models import Sum
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.db.models import (BooleanField, Count, Exists, OuterRef,
+                              Prefetch, Subquery, Sum, Value)
+from django.db.models.functions import Coalesce
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 from django_filters.rest_framework import DjangoFilterBackend
+from djoser.views import UserViewSet
 from rest_framework import generics, permissions, status, views, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.validators import ValidationError
 
+from recipes.catalog import catalog
 from recipes.models import (FavoriteRecipe, Ingredient, IngredientWithAmount,
                             Recipe, ShoppingCart, Tag)
+from recipes.snapshots import get_cached_document, recipe_list_version
+from recipes.stats import (author_stats, record_cart_add, record_favorite,
+                           record_follow)
 from users.models import CustomUser, Follow
+from . import fast_serializers
+from .changes import get_changes
 from .filters import IngredientFilter, TagFilter
-from .pagination import CustomPageNumberPagination
-from .serializers import (AddRecipeSerializer, FavoriteSerializer,
-                          FollowSerializer, IngredientSerializer,
-                          RecipeSerializer, RecipeShortSerializer,
-                          SubscribeSerializer, TagSerializer)
+from .mixins import (AnonymousListCacheMixin, LoadSheddingMixin,
+                     ReplicaReadMixin, SparseFieldsViewMixin)
+from .pagination import CustomPageNumberPagination, UserPagination
+from .renderers import ORJSONRenderer
+from .serializers import (RECIPE_FIELDS, RECIPE_SNAPSHOT_FIELDS,
+                          AddRecipeSerializer, CustomUserSerializer,
+                          FavoriteSerializer, FollowSerializer,
+                          IngredientSerializer, RecipeShortSerializer,
+                          RecipeSnapshotSerializer, SubscribeSerializer,
+                          TagSerializer, get_recipes_limit,
+                          limit_recipes_per_author, represent_recipe)
+from .streams import make_events_token
+from .throttling import EXPENSIVE_SCOPE, READ_SCOPE
 from .utils import convert_txt
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+RECIPE_FLAG_FIELDS = {
+    'is_favorited': 'is_favorited',
+    'is_in_shopping_cart': 'is_in_shopping_cart',
+    'is_subscribed': 'author',
+}
+# Наибольшее значение bigint в PostgreSQL.
+MAX_ID = 2 ** 63 - 1
+
+
+def parse_id(value):
+    # Принимает целое число или строку из цифр ASCII. bool — подкласс int,
+    # а int() пропустил бы 1.5, '+1', '١' и переполнение bigint в запросе.
+    if isinstance(value, str):
+        value = value.strip()
+        if not (value.isascii() and value.isdigit()):
+            raise ValidationError({'ids': 'Ожидаются целые числа.'})
+        value = int(value)
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValidationError({'ids': 'Ожидаются целые числа.'})
+    if not 0 < value <= MAX_ID:
+        raise ValidationError({'ids': f'Ожидаются id от 1 до {MAX_ID}.'})
+    return value
+
+
+def recipe_user_flags(user, fields=None):
+    flags = {
+        'is_favorited': Exists(FavoriteRecipe.objects.filter(
+            user=user, recipe=OuterRef('pk')
+        )),
+        'is_in_shopping_cart': Exists(ShoppingCart.objects.filter(
+            user=user, recipe=OuterRef('pk')
+        )),
+        'is_subscribed': Exists(Follow.objects.filter(
+            user=user, author=OuterRef('author')
+        )),
+    }
+    if fields is None:
+        return flags
+    return {
+        name: flag for name, flag in flags.items()
+        if RECIPE_FLAG_FIELDS[name] in fields
+    }
+
+
+class FastListMixin:
+    # При API_FAST_SERIALIZERS список строится из .values() функциями
+    # api.fast_serializers вместо сериализаторов DRF.
+
+    def get_fast_values(self, queryset):
+        raise NotImplementedError
+
+    def fast_serialize(self, rows):
+        raise NotImplementedError
+
+    def list(self, request, *args, **kwargs):
+        if not settings.API_FAST_SERIALIZERS:
+            return super().list(request, *args, **kwargs)
+        rows = self.get_fast_values(
+            self.filter_queryset(self.get_queryset())
+        )
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(self.fast_serialize(page))
+        return Response(self.fast_serialize(rows))
+
+
+class TagViewSet(ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     search_fields = ('^name',)
     permission_classes = (AllowAny,)
 
+    def list(self, request, *args, **kwargs):
+        return Response(catalog.tags())
+
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     search_fields = ('^name',)
@@ -34,15 +128,128 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     filter_backends = (DjangoFilterBackend,)
     filter_class = IngredientFilter
 
+    def list(self, request, *args, **kwargs):
+        # Поиск по справочнику в памяти, как icontains в IngredientFilter.
+        return Response(catalog.ingredients(request.query_params.get('name')))
 
-class SubscriptionViewSet(generics.ListAPIView):
+
+class SubscriptionViewSet(LoadSheddingMixin, ReplicaReadMixin,
+                          SparseFieldsViewMixin, FastListMixin,
+                          generics.ListAPIView):
     serializer_class = FollowSerializer
     pagination_class = CustomPageNumberPagination
     permission_classes = (IsAuthenticated, )
+    sparse_fields = FollowSerializer.Meta.fields
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.recipes_limit = get_recipes_limit(request)
+
+    def get_queryset(self):
+        user = self.request.user
+        queryset = user.follower.select_related('author')
+        if self.is_field_requested('is_subscribed'):
+            queryset = queryset.annotate(
+                is_subscribed=Exists(Follow.objects.filter(
+                    user=user, author=OuterRef('author')
+                ))
+            )
+        if self.is_field_requested('recipes_count'):
+            queryset = queryset.annotate(recipes_count=Coalesce(Subquery(
+                Recipe.objects.filter(
+                    author=OuterRef('author')
+                ).order_by().values('author').annotate(
+                    count=Count('pk')
+                ).values('count')
+            ), 0))
+        if self.is_field_requested('recipes'):
+            queryset = queryset.prefetch_related(Prefetch(
+                'author__recipes',
+                queryset=limit_recipes_per_author(
+                    Recipe.objects.only(
+                        *fast_serializers.RECIPE_SHORT_FIELDS, 'author'
+                    ),
+                    self.recipes_limit
+                )
+            ))
+        return queryset
+
+    def get_fast_values(self, queryset):
+        return fast_serializers.follow_values(
+            queryset.prefetch_related(None)
+        )
+
+    def fast_serialize(self, rows):
+        return fast_serializers.serialize_follows(
+            rows, self.recipes_limit, self.get_requested_fields()
+        )
+
+
+class CustomUserViewSet(LoadSheddingMixin, SparseFieldsViewMixin,
+                        UserViewSet):
+    pagination_class = UserPagination
+    sparse_fields = CustomUserSerializer.Meta.fields
+    stream_query_param = 'stream'
+    stream_chunk_size = 2000
 
     def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action not in ('list', 'retrieve'):
+            return queryset
         user = self.request.user
-        return user.follower.all()
+        if user.is_authenticated and self.is_field_requested('is_subscribed'):
+            queryset = queryset.annotate(
+                is_subscribed=Exists(Follow.objects.filter(
+                    user=user, author=OuterRef('pk')
+                ))
+            )
+        return queryset.order_by('id')
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get(self.stream_query_param) in (
+            '1', 'true'
+        ):
+            if not request.user.is_staff:
+                raise PermissionDenied(
+                    'Потоковая выгрузка доступна только администраторам'
+                )
+            return self.stream_list()
+        return super().list(request, *args, **kwargs)
+
+    def stream_list(self):
+        fields = [
+            name for name in self.sparse_fields
+            if name != 'is_subscribed' and self.is_field_requested(name)
+        ]
+        queryset = self.filter_queryset(self.get_queryset())
+        with_subscribed = 'is_subscribed' in queryset.query.annotations
+        if with_subscribed:
+            fields.append('is_subscribed')
+        elif self.is_field_requested('is_subscribed'):
+            queryset = queryset.annotate(is_subscribed=Value(
+                False, output_field=BooleanField()
+            ))
+            fields.append('is_subscribed')
+        rows = queryset.values(*fields).iterator(
+            chunk_size=self.stream_chunk_size
+        )
+        return StreamingHttpResponse(
+            self.render_stream(rows), content_type='application/json'
+        )
+
+    def render_stream(self, rows):
+        # Отдаёт JSON-массив кусками по stream_chunk_size строк, не собирая
+        # весь список пользователей в памяти.
+        renderer = ORJSONRenderer()
+        separator = b''
+        yield b'['
+        while True:
+            chunk = list(islice(rows, self.stream_chunk_size))
+            if not chunk:
+                break
+            yield separator + renderer.render(chunk)[1:-1]
+            separator = b','
+        yield b']'
 
 
 class SubscribeView(views.APIView):
@@ -50,6 +257,8 @@ class SubscribeView(views.APIView):
     permission_classes = (IsAuthenticated, )
 
     def post(self, request, pk):
+        # Проверяется до подписки: ответ с рецептами строится после save.
+        get_recipes_limit(request)
         author = get_object_or_404(CustomUser, pk=pk)
         user = self.request.user
         data = {
@@ -62,6 +271,7 @@ class SubscribeView(views.APIView):
         )
         serializer.is_valid(raise_exception=True)
         serializer.save()
+        record_follow(author.pk, 1)
         return Response(data=serializer.data, status=status.HTTP_201_CREATED)
 
     def delete(self, request, pk):
@@ -73,21 +283,176 @@ class SubscribeView(views.APIView):
             author=author
         )
         subscription.delete()
+        record_follow(author.pk, -1)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class AuthorStatsView(views.APIView):
+    # Статистика текущего пользователя как автора по дневным итогам
+    # recipes.stats; период задаётся ?from= и ?to= (ГГГГ-ММ-ДД).
+    permission_classes = (IsAuthenticated, )
+
+    def get_date(self, name, default):
+        value = self.request.query_params.get(name)
+        if not value:
+            return default
+        try:
+            day = parse_date(value)
+        except ValueError:
+            day = None
+        if day is None:
+            raise ValidationError(
+                {name: 'Ожидается дата в формате ГГГГ-ММ-ДД.'}
+            )
+        return day
+
+    def get(self, request):
+        end = self.get_date('to', timezone.localdate())
+        start = self.get_date('from', end - timedelta(
+            days=settings.AUTHOR_STATS_DEFAULT_DAYS - 1
+        ))
+        if start > end:
+            raise ValidationError(
+                {'from': 'Начало периода позже его конца.'}
+            )
+        if (end - start).days >= settings.AUTHOR_STATS_MAX_DAYS:
+            raise ValidationError({'from': (
+                'Период не может быть длиннее '
+                f'{settings.AUTHOR_STATS_MAX_DAYS} дней.'
+            )})
+        return Response(author_stats(
+            request.user, start, end, settings.AUTHOR_STATS_TOP_RECIPES
+        ))
+
+
+class RecipeEventsTokenView(views.APIView):
+    # Короткоживущий токен для EventSource, который не умеет слать
+    # заголовок Authorization: /api/recipes/events/?token=<токен>.
+    permission_classes = (IsAuthenticated, )
+
+    def post(self, request):
+        return Response({
+            'token': make_events_token(request.user),
+            'expires_in': settings.SSE_TOKEN_MAX_AGE,
+        })
+
+
+class RecipeViewSet(AnonymousListCacheMixin, LoadSheddingMixin,
+                    ReplicaReadMixin, SparseFieldsViewMixin, FastListMixin,
+                    viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
+    list_cache_name = 'recipe_list_cache'
+    list_cache_params = (
+        'page', 'limit', 'tags', 'author', 'is_favorited',
+        'is_in_shopping_cart', 'fields', 'omit',
+    )
     pagination_class = CustomPageNumberPagination
     permission_classes = (permissions.IsAuthenticatedOrReadOnly,)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = TagFilter
+    sparse_fields = RECIPE_FIELDS
+    throttle_scopes = {
+        'create': EXPENSIVE_SCOPE,
+        'update': EXPENSIVE_SCOPE,
+        'partial_update': EXPENSIVE_SCOPE,
+        'download_shopping_cart': EXPENSIVE_SCOPE,
+        'batch': READ_SCOPE,
+    }
+    ids_query_param = 'ids'
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action not in ('list', 'retrieve', 'batch'):
+            return queryset
+        fields = self.get_requested_fields()
+        queryset = queryset.only('id', 'author')
+        if fields is None or fields & RECIPE_SNAPSHOT_FIELDS:
+            queryset = queryset.select_related('snapshot')
+        user = self.request.user
+        if user.is_authenticated:
+            queryset = queryset.annotate(**recipe_user_flags(user, fields))
+        return queryset
+
+    def get_list_version(self):
+        return recipe_list_version()
 
     def get_serializer_class(self):
-        if self.action in ('list', 'retrieve'):
-            return RecipeSerializer
+        if self.action in ('list', 'retrieve', 'batch'):
+            return RecipeSnapshotSerializer
         return AddRecipeSerializer
 
+    def get_fast_values(self, queryset):
+        return fast_serializers.recipe_values(
+            queryset, self.get_requested_fields()
+        )
+
+    def fast_serialize(self, rows):
+        return fast_serializers.serialize_recipes(
+            rows, self.request, self.get_requested_fields()
+        )
+
+    def list(self, request, *args, **kwargs):
+        if self.ids_query_param in request.query_params:
+            return self.get_many([
+                value for value in
+                request.query_params[self.ids_query_param].split(',')
+                if value.strip()
+            ])
+        return super().list(request, *args, **kwargs)
+
+    @action(methods=['post'], detail=False, permission_classes=(AllowAny,))
+    def batch(self, request):
+        ids = request.data.get('ids')
+        if not isinstance(ids, list):
+            raise ValidationError({'ids': 'Ожидается список id рецептов.'})
+        return self.get_many(ids)
+
+    def get_many(self, values):
+        # Рецепты по списку id одним запросом в порядке запроса; id, которых
+        # нет, перечисляются в missing.
+        ids = list(dict.fromkeys(parse_id(value) for value in values))
+        if len(ids) > settings.RECIPE_BATCH_MAX_SIZE:
+            raise ValidationError({'ids': (
+                'Не больше '
+                f'{settings.RECIPE_BATCH_MAX_SIZE} рецептов за запрос.'
+            )})
+        queryset = self.get_queryset().filter(pk__in=ids)
+        if settings.API_FAST_SERIALIZERS:
+            found = {row['id']: row for row in self.get_fast_values(queryset)}
+            results = self.fast_serialize(
+                [found[pk] for pk in ids if pk in found]
+            )
+        else:
+            found = {recipe.pk: recipe for recipe in queryset}
+            results = self.get_serializer(
+                [found[pk] for pk in ids if pk in found], many=True
+            ).data
+        return Response({
+            'results': results,
+            'missing': [pk for pk in ids if pk not in found],
+        })
+
+    def retrieve(self, request, *args, **kwargs):
+        # Общая для всех пользователей часть рецепта берётся из кэша,
+        # личные флаги досчитываются одним запросом.
+        try:
+            recipe_id = int(kwargs[self.lookup_field])
+        except ValueError:
+            raise Http404
+        document = get_cached_document(recipe_id)
+        if document is None:
+            raise Http404
+        flags = {}
+        fields = self.get_requested_fields()
+        user_flags = {}
+        if request.user.is_authenticated:
+            user_flags = recipe_user_flags(request.user, fields)
+        if user_flags:
+            flags = Recipe.objects.filter(pk=recipe_id).annotate(
+                **user_flags
+            ).values(*user_flags).first() or {}
+        return Response(represent_recipe(document, request, fields, **flags))
+
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
@@ -101,6 +466,20 @@ class RecipeViewSet(viewsets.ModelViewSet):
         else:
             return self.delete_recipe(ShoppingCart, request, pk)
 
+    @action(detail=False, permission_classes=(AllowAny,))
+    def changes(self, request):
+        try:
+            limit = min(
+                int(request.query_params.get('limit',
+                                             settings.RECIPE_CHANGES_LIMIT)),
+                settings.RECIPE_CHANGES_MAX_LIMIT
+            )
+        except ValueError:
+            raise ValidationError({'limit': 'Ожидается целое число.'})
+        return Response(get_changes(
+            request.query_params.get('since'), max(limit, 1)
+        ))
+
     @action(
         detail=False,
         permission_classes=(IsAuthenticated,)
@@ -121,6 +500,8 @@ class RecipeViewSet(viewsets.ModelViewSet):
         if model.objects.filter(recipe=recipe, user=user).exists():
             raise ValidationError('Рецепт уже добавлен')
         model.objects.create(recipe=recipe, user=user)
+        if model is ShoppingCart:
+            record_cart_add(recipe)
         serializer = RecipeShortSerializer(recipe)
         return Response(data=serializer.data, status=status.HTTP_201_CREATED)
 
@@ -146,11 +527,16 @@ class FavoriteView(views.APIView):
             context={'request': request}
         )
         serializer.is_valid(raise_exception=True)
-        serializer.save()
+        favorite = serializer.save()
+        record_favorite(favorite.recipe, 1)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     def delete(self, request, favorite_id):
         user = request.user
         recipe = get_object_or_404(Recipe, id=favorite_id)
-        FavoriteRecipe.objects.filter(user=user, recipe=recipe).delete()
+        deleted, _ = FavoriteRecipe.objects.filter(
+            user=user, recipe=recipe
+        ).delete()
+        if deleted:
+            record_favorite(recipe, -1)
         return Response(status=status.HTTP_204_NO_CONTENT)
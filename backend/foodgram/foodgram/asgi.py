@@ -0,0 +1,13 @@
+import os
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
+
+django.setup(set_prefix=False)
+
+from api.streams import recipe_events  # noqa: E402
+from foodgram.asgi_handler import ASGIHandler  # noqa: E402
+
+application = ASGIHandler()
+application.route(r'^/api/recipes/events/$')(recipe_events)
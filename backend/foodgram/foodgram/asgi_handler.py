@@ -0,0 +1,142 @@
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import SyncToAsync
+from asgiref.wsgi import WsgiToAsgiInstance
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+
+# Django 2.2 не умеет ни асинхронных вьюх, ни асинхронного ORM, поэтому
+# WSGI-приложение оборачивается WsgiToAsgi из asgiref: тело запроса
+# дочитывается в цикле событий, а сама вьюха выполняется в пуле потоков.
+# Лёгкие запросы на чтение идут в отдельный пул, чтобы тяжёлые записи
+# (разбор base64-картинок) не вытесняли их. Нативные async-вьюхи
+# регистрируются через ASGIHandler.route().
+READ_ROUTES = (
+    re.compile(r'^/api/tags/(\d+/)?$'),
+    re.compile(r'^/api/ingredients/(\d+/)?$'),
+    re.compile(r'^/api/recipes/(\d+/)?$'),
+    re.compile(r'^/api/users/subscriptions/$'),
+)
+READ_METHODS = ('GET', 'HEAD')
+
+
+class ClientDisconnected(Exception):
+    pass
+
+
+class WSGIInstance(WsgiToAsgiInstance):
+
+    def __init__(self, wsgi_application, executor):
+        super().__init__(wsgi_application)
+        self.executor = executor
+
+    async def __call__(self, scope, receive, send):
+        self.send = send
+
+        async def receive_request():
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                raise ClientDisconnected
+            return message
+
+        try:
+            await super().__call__(scope, receive_request, send)
+        except ClientDisconnected:
+            pass
+
+    def build_environ(self, scope, body):
+        environ = super().build_environ(scope, body)
+        # Длина берётся по фактически прочитанному телу: при chunked-запросе
+        # заголовка Content-Length нет.
+        body.seek(0, 2)
+        environ['CONTENT_LENGTH'] = str(body.tell())
+        body.seek(0)
+        return environ
+
+    async def run_wsgi_app(self, body):
+        content = await SyncToAsync(
+            self.run, thread_sensitive=False, executor=self.executor
+        )(body)
+        if content is not None:
+            await self.send(self.response_start)
+            await self.send({'type': 'http.response.body', 'body': content})
+
+    def run(self, body):
+        # Вьюха, чтение ответа и его закрытие идут в одном потоке: соединения
+        # с БД в Django привязаны к потоку, а close() вызывает
+        # close_old_connections. Обычный ответ уже целиком в памяти, его
+        # отправляет цикл событий, и медленный клиент не держит поток.
+        # Потоковый ответ передаётся по частям по мере генерации.
+        response = self.wsgi_application(
+            self.build_environ(self.scope, body), self.start_response
+        )
+        try:
+            if not getattr(response, 'streaming', False):
+                return b''.join(response)
+            self.response_started = True
+            self.sync_send(self.response_start)
+            for chunk in response:
+                self.sync_send({
+                    'type': 'http.response.body',
+                    'body': chunk,
+                    'more_body': True,
+                })
+            self.sync_send({'type': 'http.response.body'})
+            return None
+        finally:
+            response.close()
+
+
+class ASGIHandler:
+
+    def __init__(self):
+        self.wsgi_handler = WSGIHandler()
+        self.read_executor = ThreadPoolExecutor(
+            max_workers=settings.ASGI_READ_THREADS,
+            thread_name_prefix='asgi-read'
+        )
+        self.executor = ThreadPoolExecutor(
+            max_workers=settings.ASGI_THREADS,
+            thread_name_prefix='asgi'
+        )
+        self.async_routes = []
+
+    def route(self, pattern):
+        compiled = re.compile(pattern)
+
+        def decorator(view):
+            self.async_routes.append((compiled, view))
+            return view
+        return decorator
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        for pattern, view in self.async_routes:
+            match = pattern.match(scope['path'])
+            if match:
+                await view(scope, receive, send, **match.groupdict())
+                return
+        await WSGIInstance(self.wsgi_handler, self.get_executor(scope))(
+            scope, receive, send
+        )
+
+    def get_executor(self, scope):
+        if scope['method'] in READ_METHODS and any(
+            pattern.match(scope['path']) for pattern in READ_ROUTES
+        ):
+            return self.read_executor
+        return self.executor
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.read_executor.shutdown(wait=False)
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
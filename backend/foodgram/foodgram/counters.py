@@ -0,0 +1,50 @@
+import threading
+from collections import defaultdict
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+class Counters:
+
+    def __init__(self, name):
+        self.name = name
+        self._values = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def incr(self, key, value=1):
+        with self._lock:
+            self._values[key] += value
+
+    def hit(self):
+        self.incr('hits')
+
+    def miss(self):
+        self.incr('misses')
+
+    def values(self):
+        with self._lock:
+            return dict(self._values)
+
+    def hit_ratio(self):
+        values = self.values()
+        total = values.get('hits', 0) + values.get('misses', 0)
+        if not total:
+            return None
+        return values.get('hits', 0) / total
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+
+def get_counters(name):
+    with _registry_lock:
+        if name not in _registry:
+            _registry[name] = Counters(name)
+        return _registry[name]
+
+
+def all_counters():
+    with _registry_lock:
+        return dict(_registry)
@@ -0,0 +1,134 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+
+REPLICA_ALIAS = 'replica'
+
+_replica_reads = ContextVar('replica_reads', default=False)
+
+
+def table_row_count(table, using='default'):
+    # (число строк, оценка ли это): PostgreSQL отдаёт статистику
+    # планировщика, остальные СУБД и неанализированные таблицы — COUNT(*).
+    # У секционированной таблицы своей статистики нет (reltuples 0 или -1),
+    # поэтому складываются оценки секций.
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                "SELECT CASE WHEN c.relkind = 'p' THEN ("
+                '    SELECT CASE WHEN count(*) = 0 OR min(p.reltuples) < 0'
+                '        THEN -1 ELSE sum(p.reltuples) END'
+                '    FROM pg_inherits i JOIN pg_class p ON p.oid = i.inhrelid'
+                '    WHERE i.inhparent = c.oid'
+                ') ELSE c.reltuples END::bigint '
+                'FROM pg_class c WHERE c.oid = to_regclass(%s)',
+                [table]
+            )
+            row = cursor.fetchone()
+            if row is not None and row[0] >= 0:
+                return row[0], True
+        cursor.execute(
+            f'SELECT COUNT(*) FROM {connection.ops.quote_name(table)}'
+        )
+        return cursor.fetchone()[0], False
+
+
+def estimated_row_count(table, using='default'):
+    return table_row_count(table, using)[0]
+
+
+def require_disposable_database():
+    # Синтетические данные и замеры не должны попасть в рабочую базу.
+    if not settings.DB_DISPOSABLE:
+        raise ImproperlyConfigured(
+            'Команда пишет в базу данных. Укажите отдельную базу в DB_NAME '
+            'и задайте DB_DISPOSABLE=True'
+        )
+
+
+def replica_configured():
+    return REPLICA_ALIAS in connections.databases
+
+
+def enable_replica_reads():
+    return _replica_reads.set(True)
+
+
+def disable_replica_reads(token):
+    _replica_reads.reset(token)
+
+
+@contextmanager
+def replica_reads():
+    token = enable_replica_reads()
+    try:
+        yield
+    finally:
+        disable_replica_reads(token)
+
+
+# Закрепление за основной базой после записи видно любому воркеру: оно
+# едет в подписанной cookie, а для клиентов без cookie — в общем кэше
+# (CACHE_SHARED); кэш в памяти процесса другие воркеры не видят.
+PIN_COOKIE = 'db_pin'
+PIN_SALT = 'foodgram.db.pin'
+
+
+def _pin_key(user_id):
+    return f'db-pin:{user_id}'
+
+
+def pin_to_primary(user, response):
+    response.set_signed_cookie(
+        PIN_COOKIE, str(user.pk), salt=PIN_SALT,
+        max_age=settings.REPLICA_PIN_SECONDS, httponly=True, samesite='Lax'
+    )
+    if settings.CACHE_SHARED:
+        cache.set(_pin_key(user.pk), True, settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned_to_primary(request, user):
+    pinned = request.get_signed_cookie(
+        PIN_COOKIE, default=None, salt=PIN_SALT,
+        max_age=settings.REPLICA_PIN_SECONDS
+    )
+    if pinned == str(user.pk):
+        return True
+    return (settings.CACHE_SHARED
+            and cache.get(_pin_key(user.pk)) is not None)
+
+
+class PrimaryReplicaRouter:
+    # Чтения уходят на реплику только внутри replica_reads(): его включают
+    # вьюсеты с ReplicaReadMixin для безопасных методов.
+
+    def db_for_read(self, model, **hints):
+        if _replica_reads.get() and replica_configured():
+            return REPLICA_ALIAS
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схему и данные реплика получает репликацией с основной базы.
+        return db != REPLICA_ALIAS
+
+
+def close_unusable_connections(**kwargs):
+    # Аналог CONN_HEALTH_CHECKS из новых версий Django: постоянное
+    # соединение, которое оборвала СУБД или балансировщик, закрывается до
+    # того, как запрос на нём упадёт.
+    if not settings.DB_CONN_HEALTH_CHECKS:
+        return
+    for connection in connections.all():
+        if connection.connection is not None and not connection.is_usable():
+            connection.close()
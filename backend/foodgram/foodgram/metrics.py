@@ -0,0 +1,254 @@
+import glob
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import Http404, HttpResponse
+
+from .counters import all_counters
+
+HISTOGRAMS = {
+    'foodgram_http_request_duration_seconds': (
+        'Время обработки запроса',
+        (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    ),
+    'foodgram_http_db_queries': (
+        'Число SQL-запросов на HTTP-запрос',
+        (0, 1, 2, 3, 5, 10, 20, 50, 100),
+    ),
+    'foodgram_http_response_size_bytes': (
+        'Размер тела ответа',
+        (100, 1000, 10000, 100000, 1000000, 10000000),
+    ),
+}
+COUNTERS = {
+    'foodgram_http_requests_total': 'Число запросов по статусу ответа',
+    'foodgram_http_db_seconds_total': 'Суммарное время SQL-запросов',
+    'foodgram_cache_events_total': 'События кэшей из foodgram.counters',
+}
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def worker_metrics_path(pid):
+    return os.path.join(settings.METRICS_DIR, f'{pid}.json')
+
+
+def remove_worker_metrics(pid):
+    # Вызывается мастером gunicorn при выходе воркера (gunicorn.conf.py):
+    # иначе /metrics суммировал бы файлы умерших процессов вечно.
+    if not settings.METRICS_DIR:
+        return
+    try:
+        os.remove(worker_metrics_path(pid))
+    except FileNotFoundError:
+        pass
+
+
+def clear_worker_metrics():
+    # Файлы, оставшиеся от прошлого запуска; pid новых воркеров могут с
+    # ними совпасть.
+    if not settings.METRICS_DIR:
+        return
+    for pattern in ('*.json', '*.tmp'):
+        for path in glob.glob(os.path.join(settings.METRICS_DIR, pattern)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def format_labels(**labels):
+    parts = []
+    for name, value in labels.items():
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"')
+        value = value.replace('\n', '\\n')
+        parts.append(f'{name}="{value}"')
+    return ','.join(parts)
+
+
+class QueryStats:
+    # Обёртка для connection.execute_wrapper: считает запросы и их время.
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - started
+
+
+class MetricsRegistry:
+    # Метрики процесса. Под gunicorn каждый воркер копит свои значения и,
+    # если задан METRICS_DIR, периодически сбрасывает их в файл
+    # <pid>.json; /metrics суммирует файлы всех воркеров, поэтому ответ не
+    # зависит от того, какой воркер принял запрос Prometheus.
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = defaultdict(dict)
+        self._counters = defaultdict(lambda: defaultdict(int))
+        self._flushed = 0
+
+    def observe(self, name, labels, value):
+        bounds = HISTOGRAMS[name][1]
+        with self._lock:
+            data = self._histograms[name].get(labels)
+            if data is None:
+                data = self._histograms[name][labels] = [0] * (len(bounds) + 2)
+            for index, bound in enumerate(bounds):
+                if value <= bound:
+                    data[index] += 1
+            data[-2] += value
+            data[-1] += 1
+
+    def incr(self, name, labels, value=1):
+        with self._lock:
+            self._counters[name][labels] += value
+
+    def record_request(self, request, response, duration, stats):
+        match = request.resolver_match
+        route = match.view_name if match else 'unmatched'
+        labels = format_labels(route=route, method=request.method)
+        self.observe('foodgram_http_request_duration_seconds', labels,
+                     duration)
+        self.observe('foodgram_http_db_queries', labels, stats.count)
+        if not response.streaming:
+            self.observe('foodgram_http_response_size_bytes', labels,
+                         len(response.content))
+        self.incr('foodgram_http_db_seconds_total', labels, stats.duration)
+        self.incr('foodgram_http_requests_total', format_labels(
+            route=route, method=request.method, status=response.status_code
+        ))
+
+    def snapshot(self):
+        with self._lock:
+            data = {
+                'histograms': {
+                    name: {labels: list(values)
+                           for labels, values in series.items()}
+                    for name, series in self._histograms.items()
+                },
+                'counters': {
+                    name: dict(series)
+                    for name, series in self._counters.items()
+                },
+            }
+        events = {}
+        for cache_name, counters in all_counters().items():
+            for event, value in counters.values().items():
+                events[format_labels(cache=cache_name, event=event)] = value
+        data['counters']['foodgram_cache_events_total'] = events
+        return data
+
+    def flush(self, force=False):
+        directory = settings.METRICS_DIR
+        now = time.monotonic()
+        if not directory or (
+            not force and now - self._flushed < settings.METRICS_FLUSH_INTERVAL
+        ):
+            return
+        self._flushed = now
+        os.makedirs(directory, exist_ok=True)
+        path = worker_metrics_path(os.getpid())
+        temp_path = f'{path}.{threading.get_ident()}.tmp'
+        with open(temp_path, 'w') as file:
+            json.dump(self.snapshot(), file)
+        os.replace(temp_path, path)
+
+    def collect(self):
+        if not settings.METRICS_DIR:
+            return self.snapshot()
+        self.flush(force=True)
+        merged = {'histograms': {}, 'counters': {}}
+        for path in glob.glob(os.path.join(settings.METRICS_DIR, '*.json')):
+            try:
+                with open(path) as file:
+                    data = json.load(file)
+            except (OSError, ValueError):
+                continue
+            for name, series in data['histograms'].items():
+                target = merged['histograms'].setdefault(name, {})
+                for labels, values in series.items():
+                    if labels in target:
+                        values = [
+                            a + b for a, b in zip(target[labels], values)
+                        ]
+                    target[labels] = values
+            for name, series in data['counters'].items():
+                target = merged['counters'].setdefault(name, {})
+                for labels, value in series.items():
+                    target[labels] = target.get(labels, 0) + value
+        return merged
+
+    def render(self):
+        data = self.collect()
+        lines = []
+        for name, (description, bounds) in HISTOGRAMS.items():
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} histogram')
+            for labels, values in sorted(data['histograms'].get(name, {})
+                                         .items()):
+                for bound, value in zip(bounds, values):
+                    lines.append(
+                        f'{name}_bucket{{{labels},le="{bound}"}} {value}'
+                    )
+                lines.append(f'{name}_bucket{{{labels},le="+Inf"}} '
+                             f'{values[-1]}')
+                lines.append(f'{name}_sum{{{labels}}} {values[-2]}')
+                lines.append(f'{name}_count{{{labels}}} {values[-1]}')
+        for name, description in COUNTERS.items():
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} counter')
+            for labels, value in sorted(data['counters'].get(name, {})
+                                        .items()):
+                lines.append(f'{name}{{{labels}}} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+
+metrics = MetricsRegistry()
+
+
+class MetricsMiddleware:
+    # Стоит первым в MIDDLEWARE, чтобы время и запросы к БД учитывали всю
+    # цепочку. Запросы, выполненные при отдаче потокового ответа, не
+    # попадают в счётчик.
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = QueryStats()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(stats))
+            response = self.get_response(request)
+        metrics.record_request(
+            request, response, time.perf_counter() - started, stats
+        )
+        metrics.flush()
+        return response
+
+
+def metrics_view(request):
+    if not settings.METRICS_ENABLED:
+        raise Http404
+    return HttpResponse(metrics.render(), content_type=CONTENT_TYPE)
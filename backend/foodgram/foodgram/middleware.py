@@ -0,0 +1,21 @@
+from django.conf import settings
+from rest_framework.permissions import SAFE_METHODS
+
+from .db import pin_to_primary, replica_configured
+
+
+class PrimaryPinMiddleware:
+    # После успешной записи пользователь на REPLICA_PIN_SECONDS читает с
+    # основной базы, чтобы не увидеть реплику, отстающую от его изменений.
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        user = getattr(request, 'user', None)
+        if (request.method not in SAFE_METHODS and response.status_code < 400
+                and user is not None and user.is_authenticated
+                and settings.REPLICA_PIN_SECONDS and replica_configured()):
+            pin_to_primary(user, response)
+        return response
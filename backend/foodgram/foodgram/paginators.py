@@ -0,0 +1,75 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, Page, Paginator
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+
+from .db import table_row_count
+
+
+class EstimatedPage(Page):
+    # has_more задаётся, когда count приблизительный: следующая страница
+    # есть, если выбралась лишняя строка.
+    has_more = None
+
+    def has_next(self):
+        if self.has_more is None:
+            return super().has_next()
+        return self.has_more
+
+    def end_index(self):
+        if self.has_more is None:
+            return super().end_index()
+        return self.start_index() + len(self.object_list) - 1
+
+
+class EstimatedCountPaginator(Paginator):
+    # COUNT(*) по большой таблице читает её целиком. Выборка без фильтров
+    # из таблицы от PAGINATION_EXACT_COUNT_THRESHOLD строк получает оценку
+    # планировщика или кэшированный на PAGINATION_COUNT_CACHE_TIMEOUT
+    # подсчёт, и count_estimated становится True. Отфильтрованные и
+    # небольшие выборки считаются точно.
+    # Оценка бывает меньше настоящего числа строк, поэтому она только
+    # показывается: страницы за оценкой не отклоняются, а о следующей
+    # странице говорит выбранная сверх per_page строка.
+    count_estimated = False
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is None or query.where or query.distinct:
+            return super().count
+        table = self.object_list.model._meta.db_table
+        using = self.object_list.db
+        key = f'row-count:{using}:{table}'
+        count = cache.get(key)
+        if count is None:
+            count, estimated = table_row_count(table, using)
+            if count < settings.PAGINATION_EXACT_COUNT_THRESHOLD:
+                return super().count if estimated else count
+            cache.set(key, count, settings.PAGINATION_COUNT_CACHE_TIMEOUT)
+        self.count_estimated = True
+        return count
+
+    def validate_number(self, number):
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            if self.count_estimated and int(number) >= 1:
+                return int(number)
+            raise
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if not self.count_estimated:
+            return super().page(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage(_('That page contains no results'))
+        page = self._get_page(rows[:self.per_page], number, self)
+        page.has_more = len(rows) > self.per_page
+        return page
+
+    def _get_page(self, *args, **kwargs):
+        return EstimatedPage(*args, **kwargs)
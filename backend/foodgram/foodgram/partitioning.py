@@ -0,0 +1,145 @@
+from django.conf import settings
+
+# Хэш-секционирование самых больших таблиц связей в PostgreSQL 11+.
+# Модели Django не меняются: таблица пересоздаётся секционированной с теми
+# же столбцами, индексами и внешними ключами. Первичный ключ дополняется
+# ключом секционирования, потому что PostgreSQL требует его в каждом
+# уникальном ограничении; поэтому ключ не может быть NULL, а уникальность
+# самого id держится на последовательности. В остальных СУБД и при
+# DB_PARTITIONS=0 таблицы остаются обычными.
+MIN_POSTGRES_VERSION = 110000
+# Приложение -> {модель: поле, по которому секционируется её таблица}.
+# Избранное, корзина и подписки читаются по пользователю, ингредиенты —
+# по рецепту.
+PARTITION_KEYS = {
+    'recipes': {
+        'FavoriteRecipe': 'user',
+        'ShoppingCart': 'user',
+        'IngredientWithAmount': 'recipe',
+    },
+    'users': {
+        'Follow': 'user',
+    },
+}
+
+
+def partitioning_supported(connection):
+    return (connection.vendor == 'postgresql'
+            and connection.pg_version >= MIN_POSTGRES_VERSION)
+
+
+def is_partitioned(connection, table):
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT 1 FROM pg_partitioned_table '
+            'WHERE partrelid = to_regclass(%s)',
+            [table]
+        )
+        return cursor.fetchone() is not None
+
+
+def partition_count(connection, table):
+    if not is_partitioned(connection, table):
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT count(*) FROM pg_inherits '
+            'WHERE inhparent = to_regclass(%s)',
+            [table]
+        )
+        return cursor.fetchone()[0]
+
+
+def rebuild_table(schema_editor, model, key=None, partitions=0):
+    # Переносит данные в новую таблицу: секционированную по полю key на
+    # partitions секций или обычную при key=None. Исходная таблица может
+    # быть и секционированной. Таблица заблокирована до конца миграции.
+    if key is not None and key.null:
+        raise ValueError(
+            f'Ключ секционирования {model.__name__}.{key.name} '
+            'должен быть NOT NULL'
+        )
+    table = model._meta.db_table
+    old_table = f'{table}_old'
+    quote = schema_editor.quote_name
+    pk = model._meta.pk.column
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('SELECT pg_get_serial_sequence(%s, %s)', [table, pk])
+        sequence = cursor.fetchone()[0]
+    schema_editor.execute(
+        f'ALTER TABLE {quote(table)} RENAME TO {quote(old_table)}'
+    )
+    partition_by = f' PARTITION BY HASH ({quote(key.column)})' if key else ''
+    schema_editor.execute(
+        f'CREATE TABLE {quote(table)} (LIKE {quote(old_table)} '
+        f'INCLUDING DEFAULTS INCLUDING CONSTRAINTS){partition_by}'
+    )
+    # Число секций в имени: при смене DB_PARTITIONS секции старой таблицы
+    # ещё существуют.
+    for remainder in range(partitions if key else 0):
+        schema_editor.execute(
+            f'CREATE TABLE {quote(f"{table}_p{partitions}_{remainder}")} '
+            f'PARTITION OF {quote(table)} FOR VALUES WITH '
+            f'(MODULUS {partitions}, REMAINDER {remainder})'
+        )
+    schema_editor.execute(
+        f'INSERT INTO {quote(table)} SELECT * FROM {quote(old_table)}'
+    )
+    # Последовательность id принадлежит старой таблице и удалилась бы
+    # вместе с ней.
+    if sequence:
+        schema_editor.execute(
+            f'ALTER SEQUENCE {sequence} OWNED BY {quote(table)}.{quote(pk)}'
+        )
+    schema_editor.execute(f'DROP TABLE {quote(old_table)}')
+    columns = [pk]
+    if key and key.column != pk:
+        columns.append(key.column)
+    schema_editor.execute(
+        f'ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(f"{table}_pkey")} '
+        f'PRIMARY KEY ({", ".join(quote(column) for column in columns)})'
+    )
+    for field in model._meta.local_fields:
+        if field.remote_field and field.db_constraint:
+            schema_editor.execute(schema_editor._create_fk_sql(
+                model, field, '_fk_%(to_table)s_%(to_column)s'
+            ))
+    for sql in schema_editor._model_indexes_sql(model):
+        schema_editor.execute(sql)
+    for model_constraint in model._meta.constraints:
+        schema_editor.add_constraint(model, model_constraint)
+
+
+def sync_partitions(apps, schema_editor, app_label, partitions=None):
+    # Приводит таблицы приложения к DB_PARTITIONS секциям: секционирует,
+    # меняет число секций или возвращает обычные таблицы. Возвращает
+    # пересозданные таблицы.
+    if partitions is None:
+        partitions = settings.DB_PARTITIONS
+    connection = schema_editor.connection
+    if not partitioning_supported(connection):
+        return []
+    rebuilt = []
+    for model_name, key in PARTITION_KEYS[app_label].items():
+        model = apps.get_model(app_label, model_name)
+        table = model._meta.db_table
+        if partition_count(connection, table) == partitions:
+            continue
+        if partitions:
+            rebuild_table(schema_editor, model,
+                          model._meta.get_field(key), partitions)
+        else:
+            rebuild_table(schema_editor, model)
+        rebuilt.append(table)
+    return rebuilt
+
+
+def partition_tables(apps, schema_editor, app_label):
+    if settings.DB_PARTITIONS:
+        sync_partitions(apps, schema_editor, app_label)
+
+
+def unpartition_tables(apps, schema_editor, app_label):
+    sync_partitions(apps, schema_editor, app_label, partitions=0)
@@ -0,0 +1,145 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import random
+import time
+import traceback
+import uuid
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from rest_framework.exceptions import AuthenticationFailed
+
+from api.authentication import CachedTokenAuthentication
+from . import metrics
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+PROFILE_PARAM = '_profile'
+PROFILE_ID_HEADER = 'X-Profile-Id'
+STACK_DEPTH = 5
+TOP_FUNCTIONS = 40
+# Обёртки execute_wrapper и middleware профилирования в стек не попадают.
+SKIP_FILES = (__file__, metrics.__file__)
+
+
+class SQLCapture:
+    # Обёртка для connection.execute_wrapper: сохраняет каждый запрос,
+    # его время и кадры кода проекта, из которых он был выполнен. Значения
+    # параметров (токены, хэши паролей) пишутся только при
+    # PROFILING_SQL_PARAMS, иначе остаётся SQL с плейсхолдерами.
+
+    def __init__(self, alias):
+        self.alias = alias
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'database': self.alias,
+                'sql': sql,
+                'params': (
+                    repr(params) if settings.PROFILING_SQL_PARAMS else None
+                ),
+                'many': many,
+                'duration': time.perf_counter() - started,
+                'stack': project_stack(),
+            })
+
+
+def project_stack():
+    frames = [
+        f'{os.path.relpath(frame.filename, settings.BASE_DIR)}:'
+        f'{frame.lineno} {frame.name}'
+        for frame in traceback.extract_stack()[:-2]
+        if frame.filename.startswith(settings.BASE_DIR)
+        and 'site-packages' not in frame.filename
+        and frame.filename not in SKIP_FILES
+    ]
+    return frames[-STACK_DEPTH:]
+
+
+class ProfilingMiddleware:
+    # Профилирует запрос под cProfile и пишет в PROFILING_DIR файлы
+    # <id>.prof (для pstats/snakeviz) и <id>.json со всеми SQL-запросами.
+    # Включается заголовком X-Profile: 1 или параметром ?_profile=1 для
+    # сотрудников, а при PROFILING_SAMPLE_RATE=N — для случайного
+    # запроса из N. При PROFILING_ENABLED=False middleware не подключается.
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        requested = self.is_requested(request)
+        if not requested and not self.is_sampled():
+            return self.get_response(request)
+        profile_id = uuid.uuid4().hex
+        profiler = cProfile.Profile()
+        captures = [SQLCapture(alias) for alias in connections]
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for capture in captures:
+                stack.enter_context(
+                    connections[capture.alias].execute_wrapper(capture)
+                )
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+        duration = time.perf_counter() - started
+        self.save(profile_id, request, response, duration, profiler, captures)
+        if requested:
+            response[PROFILE_ID_HEADER] = profile_id
+        return response
+
+    def is_requested(self, request):
+        if (request.META.get(PROFILE_HEADER) != '1'
+                and request.GET.get(PROFILE_PARAM) != '1'):
+            return False
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_staff:
+            return True
+        try:
+            result = CachedTokenAuthentication().authenticate(request)
+        except AuthenticationFailed:
+            return False
+        return result is not None and result[0].is_staff
+
+    def is_sampled(self):
+        rate = settings.PROFILING_SAMPLE_RATE
+        return rate > 0 and random.randrange(rate) == 0
+
+    def save(self, profile_id, request, response, duration, profiler,
+             captures):
+        directory = settings.PROFILING_DIR
+        os.makedirs(directory, exist_ok=True)
+        profiler.dump_stats(os.path.join(directory, f'{profile_id}.prof'))
+        summary = io.StringIO()
+        pstats.Stats(profiler, stream=summary).sort_stats(
+            'cumulative'
+        ).print_stats(TOP_FUNCTIONS)
+        queries = [query for capture in captures for query in capture.queries]
+        user = getattr(request, 'user', None)
+        with open(os.path.join(directory, f'{profile_id}.json'), 'w') as file:
+            json.dump({
+                'id': profile_id,
+                'method': request.method,
+                'path': request.path,
+                'query_string': request.META.get('QUERY_STRING', ''),
+                'user': user.pk if user is not None else None,
+                'status': response.status_code,
+                'duration': duration,
+                'sql_count': len(queries),
+                'sql_duration': sum(query['duration'] for query in queries),
+                'sql': queries,
+                'profile': summary.getvalue(),
+            }, file, ensure_ascii=False, indent=2)
@@ -0,0 +1,161 @@
+import asyncio
+import logging
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# Хаб публикаций для долгоживущих соединений (SSE). Подписка — очередь
+# asyncio в цикле событий ASGI-процесса; хаб хранит индекс канал ->
+# подписки, так что простаивающее соединение стоит одну очередь.
+# Сообщения публикуются через бэкенд из PUBSUB_BACKEND: LocalBackend
+# доставляет их в хаб своего процесса, CacheBackend пишет в общий кэш,
+# откуда каждый ASGI-процесс забирает новые раз в PUBSUB_POLL_INTERVAL.
+
+
+class Subscription:
+
+    def __init__(self, channels):
+        self.channels = set(channels)
+        self.queue = asyncio.Queue(maxsize=settings.PUBSUB_QUEUE_SIZE)
+        self.overflowed = False
+
+
+class Hub:
+
+    def __init__(self):
+        self.loop = None
+        self.channels = defaultdict(set)
+        self._backend = None
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = import_string(settings.PUBSUB_BACKEND)(self)
+        return self._backend
+
+    def subscribe(self, channels):
+        # Вызывается из цикла событий; первая подписка запускает бэкенд.
+        if self.loop is None:
+            self.loop = asyncio.get_running_loop()
+            self.backend.start()
+        subscription = Subscription(channels)
+        for channel in subscription.channels:
+            self.channels[channel].add(subscription)
+        return subscription
+
+    def update(self, subscription, channels):
+        # Меняет каналы открытой подписки, не теряя её очередь.
+        channels = set(channels)
+        self.discard(subscription, subscription.channels - channels)
+        for channel in channels - subscription.channels:
+            self.channels[channel].add(subscription)
+        subscription.channels = channels
+
+    def unsubscribe(self, subscription):
+        self.discard(subscription, subscription.channels)
+
+    def discard(self, subscription, channels):
+        for channel in channels:
+            subscribers = self.channels.get(channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self.channels[channel]
+
+    def publish(self, channel, message):
+        self.backend.publish(channel, message)
+
+    def deliver(self, channel, message):
+        # Можно вызывать из любого потока: раздача идёт в цикле событий.
+        loop = self.loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self.dispatch, channel, message)
+
+    def dispatch(self, channel, message):
+        for subscription in self.channels.get(channel, ()):
+            try:
+                subscription.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Медленный клиент отключается и догоняет пропущенное при
+                # переподключении.
+                subscription.overflowed = True
+
+
+class LocalBackend:
+    # Без общего хранилища: события видят только подписчики того же
+    # процесса. Подходит для разработки и единственного ASGI-воркера.
+
+    def __init__(self, hub):
+        self.hub = hub
+
+    def start(self):
+        pass
+
+    def publish(self, channel, message):
+        self.hub.deliver(channel, message)
+
+
+class CacheBackend:
+    # Журнал сообщений в общем Django-кэше (memcached, redis): номер
+    # последнего сообщения и сами сообщения под ключами с этим номером.
+    # Сообщение, ключ которого ещё не записан, ждёт одну лишнюю проверку.
+    key_prefix = 'pubsub'
+
+    def __init__(self, hub):
+        self.hub = hub
+        self.last_seq = None
+        self.pending = []
+
+    def _seq_key(self):
+        return f'{self.key_prefix}:seq'
+
+    def _message_key(self, seq):
+        return f'{self.key_prefix}:{seq}'
+
+    def start(self):
+        asyncio.ensure_future(self.poll())
+
+    def publish(self, channel, message):
+        cache.add(self._seq_key(), 0, None)
+        seq = cache.incr(self._seq_key())
+        cache.set(self._message_key(seq), (channel, message),
+                  settings.PUBSUB_RETENTION)
+
+    def current_seq(self):
+        return cache.get(self._seq_key(), 0)
+
+    def fetch(self):
+        seq = self.current_seq()
+        if seq < self.last_seq:
+            # Счётчик вытеснен из кэша и начался заново.
+            self.last_seq = 0
+        keys = self.pending + [
+            self._message_key(number)
+            for number in range(self.last_seq + 1, seq + 1)
+        ]
+        found = cache.get_many(keys)
+        self.pending = [
+            key for key in keys[len(self.pending):] if key not in found
+        ]
+        self.last_seq = seq
+        return [found[key] for key in keys if key in found]
+
+    async def poll(self):
+        loop = asyncio.get_running_loop()
+        self.last_seq = await loop.run_in_executor(None, self.current_seq)
+        while True:
+            await asyncio.sleep(settings.PUBSUB_POLL_INTERVAL)
+            try:
+                messages = await loop.run_in_executor(None, self.fetch)
+            except Exception:
+                logger.exception('Не удалось прочитать журнал публикаций')
+                continue
+            for channel, message in messages:
+                self.hub.dispatch(channel, message)
+
+
+hub = Hub()
@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 from dotenv import load_dotenv
 
@@ -26,17 +27,21 @@ INSTALLED_APPS = [
     'api.apps.ApiConfig',
     'recipes.apps.RecipesConfig',
     'users.apps.UsersConfig',
+    'tasks.apps.TasksConfig',
     'django_filters',
 ]
 
 MIDDLEWARE = [
+    'foodgram.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'foodgram.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'foodgram.middleware.PrimaryPinMiddleware',
 ]
 
 ROOT_URLCONF = 'foodgram.urls'
@@ -59,24 +64,175 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'foodgram.wsgi.application'
 
+ASGI_THREADS = int(os.getenv('ASGI_THREADS', default=8))
 
-"""DATABASES = {
-    'default': {
-        'ENGINE': os.getenv('DB_ENGINE'),
-        'NAME': os.getenv('DB_NAME'),
+ASGI_READ_THREADS = int(os.getenv('ASGI_READ_THREADS', default=32))
+
+
+DB_ENGINE = os.getenv('DB_ENGINE', default='django.db.backends.sqlite3')
+
+DB_CONN_MAX_AGE = int(os.getenv('DB_CONN_MAX_AGE', default=60))
+
+DB_CONN_HEALTH_CHECKS = os.getenv(
+    'DB_CONN_HEALTH_CHECKS', default='True'
+).lower() in ('true', '1', 'yes')
+
+
+def database_settings(prefix, default_name):
+    return {
+        'ENGINE': DB_ENGINE,
+        'NAME': os.getenv(f'{prefix}_NAME', default=default_name),
         'USER': os.getenv('POSTGRES_USER'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD'),
-        'HOST': os.getenv('DB_HOST'),
-        'PORT': os.getenv('DB_PORT')
+        'HOST': os.getenv(f'{prefix}_HOST'),
+        'PORT': os.getenv(f'{prefix}_PORT', default=os.getenv('DB_PORT')),
+        'CONN_MAX_AGE': DB_CONN_MAX_AGE,
     }
-}"""
+
+
 DATABASES = {
+    'default': database_settings('DB', 'db.sqlite'),
+}
+
+# Реплика для чтения: DB_REPLICA_HOST для Postgres или DB_REPLICA_NAME,
+# например копия файла SQLite основной базы для локальной проверки.
+if os.getenv('DB_REPLICA_HOST') or os.getenv('DB_REPLICA_NAME'):
+    DATABASES['replica'] = database_settings(
+        'DB_REPLICA', DATABASES['default']['NAME']
+    )
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+
+# Число хэш-секций для избранного, корзин, подписок и ингредиентов
+# рецептов в PostgreSQL 11+ (миграции foodgram.partitioning); 0 — обычные
+# таблицы.
+DB_PARTITIONS = int(os.getenv('DB_PARTITIONS', default=0))
+
+# База для generate_dataset и run_benchmarks: команды пишут в неё
+# пользователей, токены и рецепты и без этого флага не запускаются.
+DB_DISPOSABLE = os.getenv(
+    'DB_DISPOSABLE', default='False'
+).lower() in ('true', '1', 'yes')
+
+DATABASE_ROUTERS = ['foodgram.db.PrimaryReplicaRouter']
+
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', default=5))
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': 'db.sqlite',
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', default='foodgram'),
     }
 }
 
+# Кэш виден всем процессам (memcached, redis). Кэши, которые нельзя
+# сбросить в чужом процессе (токены, рецепты, списки), в памяти процесса
+# не включаются.
+CACHE_SHARED = os.getenv(
+    'CACHE_SHARED',
+    default=str(CACHES['default']['BACKEND'] not in (
+        'django.core.cache.backends.locmem.LocMemCache',
+        'django.core.cache.backends.dummy.DummyCache',
+    ))
+).lower() in ('true', '1', 'yes')
+
+RECIPE_CACHE_TIMEOUT = int(os.getenv('RECIPE_CACHE_TIMEOUT', default=300))
+
+# Сколько живёт копия справочников в процессе без общего кэша.
+CATALOG_LOCAL_TIMEOUT = int(os.getenv('CATALOG_LOCAL_TIMEOUT', default=30))
+
+# Кэш готовых ответов списка рецептов для анонимов; 0 — выключен.
+RECIPE_LIST_CACHE_TIMEOUT = int(
+    os.getenv('RECIPE_LIST_CACHE_TIMEOUT', default=60)
+)
+
+TOKEN_CACHE_TIMEOUT = int(os.getenv('TOKEN_CACHE_TIMEOUT', default=60))
+TOKEN_CACHE_LOCAL_TIMEOUT = int(
+    os.getenv('TOKEN_CACHE_LOCAL_TIMEOUT', default=5)
+)
+TOKEN_CACHE_LOCAL_SIZE = int(os.getenv('TOKEN_CACHE_LOCAL_SIZE', default=10000))
+
+PAGINATION_EXACT_COUNT_THRESHOLD = int(
+    os.getenv('PAGINATION_EXACT_COUNT_THRESHOLD', default=10000)
+)
+PAGINATION_COUNT_CACHE_TIMEOUT = int(
+    os.getenv('PAGINATION_COUNT_CACHE_TIMEOUT', default=60)
+)
+
+# Дельта-синхронизация рецептов: /api/recipes/changes/.
+RECIPE_CHANGES_LIMIT = 500
+RECIPE_CHANGES_MAX_LIMIT = 1000
+RECIPE_CHANGES_SETTLE = int(os.getenv('RECIPE_CHANGES_SETTLE', default=5))
+RECIPE_TOMBSTONE_DAYS = int(os.getenv('RECIPE_TOMBSTONE_DAYS', default=30))
+
+# Наибольшее число рецептов в /api/recipes/?ids= и /api/recipes/batch/.
+RECIPE_BATCH_MAX_SIZE = 100
+
+# Статистика автора: /api/users/me/stats/.
+AUTHOR_STATS_DEFAULT_DAYS = 30
+AUTHOR_STATS_MAX_DAYS = 366
+AUTHOR_STATS_TOP_RECIPES = 10
+
+# Публикации для SSE: 'foodgram.pubsub.LocalBackend' в пределах процесса,
+# 'foodgram.pubsub.CacheBackend' между процессами через общий кэш.
+PUBSUB_BACKEND = os.getenv(
+    'PUBSUB_BACKEND', default='foodgram.pubsub.LocalBackend'
+)
+PUBSUB_POLL_INTERVAL = float(os.getenv('PUBSUB_POLL_INTERVAL', default=1))
+PUBSUB_RETENTION = 60
+PUBSUB_QUEUE_SIZE = 100
+SSE_HEARTBEAT = int(os.getenv('SSE_HEARTBEAT', default=15))
+SSE_REPLAY_LIMIT = 50
+# Срок жизни подписанного токена для EventSource (?token=), с.
+SSE_TOKEN_MAX_AGE = int(os.getenv('SSE_TOKEN_MAX_AGE', default=300))
+# Как часто открытый поток перечитывает подписки пользователя, с.
+SSE_FOLLOWS_REFRESH = int(os.getenv('SSE_FOLLOWS_REFRESH', default=60))
+
+TASKS_VISIBILITY_TIMEOUT = int(
+    os.getenv('TASKS_VISIBILITY_TIMEOUT', default=300)
+)
+TASKS_MAX_ATTEMPTS = int(os.getenv('TASKS_MAX_ATTEMPTS', default=5))
+TASKS_RETRY_DELAY = int(os.getenv('TASKS_RETRY_DELAY', default=10))
+TASKS_POLL_INTERVAL = float(os.getenv('TASKS_POLL_INTERVAL', default=1))
+# Как часто воркер продлевает таймаут видимости выполняемой задачи.
+TASKS_HEARTBEAT_INTERVAL = float(
+    os.getenv('TASKS_HEARTBEAT_INTERVAL', default=60)
+)
+
+# Выполнять задачи сразу после коммита, без воркера: для разработки.
+TASKS_EAGER = os.getenv(
+    'TASKS_EAGER', default='False'
+).lower() in ('true', '1', 'yes')
+
+METRICS_ENABLED = os.getenv(
+    'METRICS_ENABLED', default='True'
+).lower() in ('true', '1', 'yes')
+
+# Каталог для файлов метрик воркеров gunicorn; без него /metrics отдаёт
+# метрики только своего процесса.
+METRICS_DIR = os.getenv('METRICS_DIR')
+
+METRICS_FLUSH_INTERVAL = int(os.getenv('METRICS_FLUSH_INTERVAL', default=5))
+
+PROFILING_ENABLED = os.getenv(
+    'PROFILING_ENABLED', default='False'
+).lower() in ('true', '1', 'yes')
+
+PROFILING_DIR = os.getenv(
+    'PROFILING_DIR', default=os.path.join(BASE_DIR, 'profiles')
+)
+
+# Профилировать случайный запрос из N; 0 — только по запросу сотрудника.
+PROFILING_SAMPLE_RATE = int(os.getenv('PROFILING_SAMPLE_RATE', default=0))
+
+# Писать ли в профиль значения параметров SQL: в них бывают токены и хэши
+# паролей.
+PROFILING_SQL_PARAMS = os.getenv(
+    'PROFILING_SQL_PARAMS', default='False'
+).lower() in ('true', '1', 'yes')
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -113,7 +269,7 @@ AUTH_USER_MODEL = 'users.CustomUser'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -121,8 +277,45 @@ REST_FRAMEWORK = {
     'DEFAULT_FILTER_BACKENDS': (
         'django_filters.rest_framework.DjangoFilterBackend',
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_THROTTLE_CLASSES': (
+        'api.throttling.TokenBucketThrottle',
+    ),
+    'DEFAULT_THROTTLE_RATES': {
+        'read': os.getenv('THROTTLE_READ_RATE', default='600/min'),
+        'write': os.getenv('THROTTLE_WRITE_RATE', default='120/min'),
+        'expensive': os.getenv('THROTTLE_EXPENSIVE_RATE', default='20/min'),
+    },
+    # Число прокси перед приложением (nginx): IP анонима берётся из
+    # X-Forwarded-For на столько адресов справа, подделанное клиентом
+    # начало заголовка не учитывается.
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', default=1)),
 }
 
+# Ведра троттлинга: 'local' — в памяти процесса, 'cache' — в общем кэше.
+THROTTLE_ENABLED = os.getenv(
+    'THROTTLE_ENABLED', default='True'
+).lower() in ('true', '1', 'yes')
+THROTTLE_STORE = os.getenv('THROTTLE_STORE', default='local')
+THROTTLE_LOCAL_SIZE = 100000
+THROTTLE_DEEP_PAGE = int(os.getenv('THROTTLE_DEEP_PAGE', default=50))
+EXPENSIVE_CONCURRENCY = int(os.getenv('EXPENSIVE_CONCURRENCY', default=4))
+# Слоты дорогих запросов: в общем кэше при CACHE_SHARED, иначе файлы с
+# блокировкой в каталоге, общем для воркеров хоста.
+EXPENSIVE_SLOT_TIMEOUT = int(os.getenv('EXPENSIVE_SLOT_TIMEOUT', default=300))
+EXPENSIVE_SLOTS_DIR = os.getenv(
+    'EXPENSIVE_SLOTS_DIR',
+    default=os.path.join(tempfile.gettempdir(), 'foodgram-expensive-slots')
+)
+EXPENSIVE_RETRY_AFTER = 5
+
+API_FAST_SERIALIZERS = os.getenv(
+    'API_FAST_SERIALIZERS', default='False'
+).lower() in ('true', '1', 'yes')
+
 DJOSER = {
     "LOGIN_FIELD": 'email',
     'USER_ID_FIELD': 'id',
@@ -0,0 +1,79 @@
+import gc
+import logging
+import time
+
+from django.apps import apps
+from django.core.cache import caches
+from django.db import connections
+from django.urls import get_resolver, reverse
+from rest_framework.serializers import Serializer
+
+from api import serializers
+from recipes.catalog import catalog
+
+logger = logging.getLogger(__name__)
+
+# Прогрев процесса до того, как gunicorn с preload_app сделает fork
+# воркеров (gunicorn.conf.py): всё, что заполнено здесь, воркеры получают
+# готовым и делят с мастером copy-on-write. Шаги регистрируются
+# декоратором warmup_step и выполняются по порядку регистрации.
+WARMUP_STEPS = {}
+WARM_URLS = (
+    'api:recipe-list',
+    'api:tag-list',
+    'api:ingredient-list',
+    'customuser-list',
+)
+
+
+def warmup_step(name):
+    def decorator(func):
+        WARMUP_STEPS[name] = func
+        return func
+    return decorator
+
+
+@warmup_step('url_resolver')
+def warm_url_resolver():
+    get_resolver().reverse_dict
+    for name in WARM_URLS:
+        reverse(name)
+
+
+@warmup_step('model_meta')
+def warm_model_meta():
+    for model in apps.get_models():
+        model._meta.get_fields()
+
+
+@warmup_step('serializer_fields')
+def warm_serializer_fields():
+    for value in vars(serializers).values():
+        if (isinstance(value, type) and issubclass(value, Serializer)
+                and value.__module__ == serializers.__name__):
+            value().fields
+
+
+@warmup_step('catalog')
+def warm_catalog():
+    catalog.tags()
+    catalog.ingredients()
+
+
+def warm_up():
+    timings = {}
+    for name, step in WARMUP_STEPS.items():
+        started = time.perf_counter()
+        try:
+            step()
+        except Exception:
+            logger.exception('Шаг прогрева %s завершился ошибкой', name)
+        timings[name] = time.perf_counter() - started
+    # Соединения мастера не должны достаться воркерам после fork.
+    connections.close_all()
+    for cache in caches.all():
+        cache.close()
+    # Прогретые объекты не трогает сборщик мусора, и страницы памяти
+    # остаются общими с воркерами.
+    gc.freeze()
+    return timings
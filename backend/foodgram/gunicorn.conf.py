@@ -0,0 +1,46 @@
+import os
+
+# Запуск: gunicorn -c gunicorn.conf.py
+# По умолчанию воркеры uvicorn обслуживают foodgram.asgi:application —
+# только там работает поток /api/recipes/events/. GUNICORN_ASGI=False
+# возвращает синхронные воркеры и foodgram.wsgi:application.
+# С preload_app приложение импортируется и прогревается один раз в мастере
+# (foodgram.warmup), а воркеры после fork стартуют уже тёплыми.
+# Хуки мастера читают настройки Django и без preload_app.
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
+bind = os.getenv('GUNICORN_BIND', '0:8000')
+workers = int(os.getenv('GUNICORN_WORKERS', 3))
+preload_app = os.getenv(
+    'GUNICORN_PRELOAD', 'True'
+).lower() in ('true', '1', 'yes')
+asgi = os.getenv('GUNICORN_ASGI', 'True').lower() in ('true', '1', 'yes')
+if asgi:
+    wsgi_app = 'foodgram.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'foodgram.wsgi:application'
+    worker_class = 'sync'
+
+
+def when_ready(server):
+    if not server.cfg.preload_app:
+        return
+    from foodgram.warmup import warm_up
+
+    timings = warm_up()
+    server.log.info('Прогрев: ' + ', '.join(
+        f'{name} {seconds * 1000:.1f} мс'
+        for name, seconds in timings.items()
+    ))
+
+
+def on_starting(server):
+    from foodgram.metrics import clear_worker_metrics
+
+    clear_worker_metrics()
+
+
+def child_exit(server, worker):
+    from foodgram.metrics import remove_worker_metrics
+
+    remove_worker_metrics(worker.pid)
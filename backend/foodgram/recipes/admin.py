@@ -1,12 +1,26 @@
 from django.contrib import admin
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
 
+from foodgram.paginators import EstimatedCountPaginator
 from .models import (FavoriteRecipe, Ingredient, IngredientWithAmount, Recipe,
-                     ShoppingCart, Tag)
+                     RecipeDailyStats, ShoppingCart, Tag)
+
+
+def sum_daily_stats(field):
+    # Итог по дневной статистике рецепта (recipes/stats.py): строк у рецепта
+    # столько, сколько дней с событиями, а не сколько добавлений. Сортировки
+    # по итогам нет: она посчитала бы их для всей таблицы рецептов.
+    totals = RecipeDailyStats.objects.filter(
+        recipe=OuterRef('pk')
+    ).order_by().values('recipe').annotate(total=Sum(field))
+    return Coalesce(Subquery(totals.values('total')), 0)
 
 
 class IngredientsInRecipeInline(admin.TabularInline):
     model = Recipe.ingredients.through
     extra = 1
+    autocomplete_fields = ('ingredient',)
 
 
 class IngredientsInRecipeAdmin(admin.ModelAdmin):
@@ -17,6 +31,11 @@ class IngredientsInRecipeAdmin(admin.ModelAdmin):
         'amount'
     )
     search_fields = ('recipe__name', 'ingredient__name')
+    list_select_related = ('ingredient', 'recipe')
+    autocomplete_fields = ('ingredient',)
+    raw_id_fields = ('recipe',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 class FavoriteAdmin(admin.ModelAdmin):
@@ -30,6 +49,10 @@ class FavoriteAdmin(admin.ModelAdmin):
         'user__email',
         'recipe__name'
     )
+    list_select_related = ('user', 'recipe')
+    raw_id_fields = ('user', 'recipe')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 class IngredientsAdmin(admin.ModelAdmin):
@@ -39,7 +62,6 @@ class IngredientsAdmin(admin.ModelAdmin):
         'measurement_unit'
     )
     search_fields = ('name',)
-    list_filter = ('name',)
     empty_value_display = '-пусто-'
 
 
@@ -49,19 +71,39 @@ class RecipeAdmin(admin.ModelAdmin):
         'id',
         'author',
         'name',
-        'image',
-        'text',
+        'pub_date',
+        'favorites_count',
+        'shopping_cart_count',
     )
     search_fields = (
         'name',
         'author__username',
         'author__email'
     )
-    list_filter = ('name', 'author', 'tags')
+    list_filter = ('tags',)
+    list_select_related = ('author',)
+    autocomplete_fields = ('author', 'tags')
     readonly_fields = ('is_favorited',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            favorites_count=sum_daily_stats('favorites'),
+            shopping_cart_count=sum_daily_stats('shopping_carts'),
+        )
+
+    def favorites_count(self, instance):
+        return instance.favorites_count
+    favorites_count.short_description = 'В избранном'
+
+    def shopping_cart_count(self, instance):
+        return instance.shopping_cart_count
+    shopping_cart_count.short_description = 'Добавлений в корзину'
 
     def is_favorited(self, instance):
-        return instance.favorite_recipes.count()
+        return instance.users_favorites.count()
+    is_favorited.short_description = 'В избранном'
 
 
 class ShoppingCartAdmin(admin.ModelAdmin):
@@ -75,6 +117,10 @@ class ShoppingCartAdmin(admin.ModelAdmin):
         'user__email',
         'recipe__name'
     )
+    list_select_related = ('user', 'recipe')
+    raw_id_fields = ('user', 'recipe')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 class TagAdmin(admin.ModelAdmin):
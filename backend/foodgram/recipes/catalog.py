@@ -0,0 +1,79 @@
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Ingredient, Tag
+
+# Справочники тэгов и ингредиентов целиком в памяти процесса: они маленькие
+# и меняются редко. Актуальность сверяется с версией в общем кэше, правка
+# тэга или ингредиента выставляет новую версию. При запуске gunicorn с
+# preload справочники загружаются в мастере (foodgram.warmup), и воркеры
+# получают их после fork без запросов к базе. Без общего кэша
+# (CACHE_SHARED) новую версию видит только процесс, сделавший правку,
+# поэтому копия в остальных живёт не дольше CATALOG_LOCAL_TIMEOUT секунд.
+VERSION_KEY = 'catalog:version'
+SECTIONS = {
+    'tags': lambda: list(Tag.objects.order_by('pk').values(
+        'id', 'name', 'color', 'slug'
+    )),
+    'ingredients': lambda: list(Ingredient.objects.values(
+        'id', 'name', 'measurement_unit'
+    )),
+}
+
+
+def catalog_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    transaction.on_commit(
+        lambda: cache.set(VERSION_KEY, uuid.uuid4().hex, None)
+    )
+
+
+class Catalog:
+
+    def __init__(self):
+        self._version = None
+        self._sections = {}
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        version = catalog_version()
+        with self._lock:
+            if version != self._version:
+                self._version = version
+                self._sections = {}
+            expires, rows = self._sections.get(name, (None, None))
+        now = time.monotonic()
+        if rows is None or (expires is not None and expires <= now):
+            rows = SECTIONS[name]()
+            expires = None
+            if not settings.CACHE_SHARED:
+                expires = now + settings.CATALOG_LOCAL_TIMEOUT
+            with self._lock:
+                if version == self._version:
+                    self._sections[name] = (expires, rows)
+        return rows
+
+    def tags(self):
+        return self.get('tags')
+
+    def ingredients(self, name=None):
+        rows = self.get('ingredients')
+        if not name:
+            return rows
+        name = name.casefold()
+        return [row for row in rows if name in row['name'].casefold()]
+
+
+catalog = Catalog()
@@ -0,0 +1,25 @@
+from django.db import transaction
+
+from foodgram.pubsub import hub
+
+
+def author_channel(author_id):
+    return f'author:{author_id}'
+
+
+def recipe_event(recipe):
+    return {
+        'id': recipe.id,
+        'name': recipe.name,
+        'author': recipe.author_id,
+        'pub_date': recipe.pub_date.isoformat(),
+    }
+
+
+def publish_new_recipe(recipe):
+    # Подписчики узнают о рецепте только после коммита, когда его уже
+    # можно прочитать.
+    event = recipe_event(recipe)
+    transaction.on_commit(
+        lambda: hub.publish(author_channel(event['author']), event)
+    )
@@ -0,0 +1,252 @@
+import io
+import itertools
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+from PIL import Image
+
+from foodgram.db import require_disposable_database
+from recipes.models import (FavoriteRecipe, Ingredient, IngredientWithAmount,
+                            Recipe, ShoppingCart, Tag)
+from users.models import CustomUser, Follow
+
+PLACEHOLDER_IMAGE = 'backend_media/placeholder.png'
+PASSWORD = 'dataset-password'
+MAX_SAMPLE_ATTEMPTS = 5
+
+
+@contextmanager
+def manual_dates():
+    # bulk_create проставляет auto_now_add и auto_now текущим временем, а
+    # рецептам нужны даты, размазанные по прошлому.
+    published = Recipe._meta.get_field('pub_date')
+    updated = Recipe._meta.get_field('updated_at')
+    published.auto_now_add = updated.auto_now = False
+    try:
+        yield
+    finally:
+        published.auto_now_add = updated.auto_now = True
+
+
+class PowerLaw:
+    # Выбор элемента с весом rank ** -alpha: немногие популярные авторы и
+    # рецепты собирают большую часть подписок и избранного.
+
+    def __init__(self, rng, items, alpha):
+        self.rng = rng
+        self.items = list(items)
+        rng.shuffle(self.items)
+        self.cum_weights = list(itertools.accumulate(
+            rank ** -alpha for rank in range(1, len(self.items) + 1)
+        ))
+
+    def sample(self, count, exclude=None):
+        count = min(count, len(self.items) - (exclude is not None))
+        result = set()
+        for _ in range(MAX_SAMPLE_ATTEMPTS):
+            for item in self.rng.choices(
+                self.items, cum_weights=self.cum_weights,
+                k=count - len(result)
+            ):
+                if item != exclude:
+                    result.add(item)
+            if len(result) >= count:
+                break
+        return result
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу воспроизводимым синтетическим набором данных: '
+        'пользователи, рецепты, подписки, избранное и списки покупок'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000,
+                            help='Число пользователей')
+        parser.add_argument('--recipes', type=int, default=10000,
+                            help='Число рецептов')
+        parser.add_argument('--follows', type=int, default=20,
+                            help='Среднее число подписок пользователя')
+        parser.add_argument('--favorites', type=int, default=30,
+                            help='Среднее число избранных рецептов')
+        parser.add_argument('--carts', type=int, default=5,
+                            help='Среднее число рецептов в списке покупок')
+        parser.add_argument('--alpha', type=float, default=1.1,
+                            help='Показатель степенного распределения')
+        parser.add_argument('--seed', type=int, default=1,
+                            help='Зерно генератора случайных чисел')
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Размер пачки для bulk_create')
+        parser.add_argument('--days', type=int, default=365,
+                            help='Период публикации рецептов, дней')
+        parser.add_argument('--skip-snapshots', action='store_true',
+                            help='Не собирать снимки рецептов')
+
+    def handle(self, *args, **options):
+        try:
+            require_disposable_database()
+        except ImproperlyConfigured as error:
+            raise CommandError(error)
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.tag_ids = list(Tag.objects.values_list('pk', flat=True))
+        self.ingredient_ids = list(
+            Ingredient.objects.values_list('pk', flat=True)
+        )
+        if not self.tag_ids or not self.ingredient_ids:
+            raise CommandError(
+                'Сначала примените миграции: нужны теги и ингредиенты'
+            )
+        user_ids = self.create_users(options['users'])
+        authors = PowerLaw(self.rng, user_ids, options['alpha'])
+        recipe_ids = self.create_recipes(
+            options['recipes'], authors, options['days']
+        )
+        recipes = PowerLaw(self.rng, recipe_ids, options['alpha'])
+        self.create_relations(user_ids, authors, options['follows'], Follow,
+                              'author_id')
+        self.create_relations(user_ids, recipes, options['favorites'],
+                              FavoriteRecipe, 'recipe_id')
+        self.create_relations(user_ids, recipes, options['carts'],
+                              ShoppingCart, 'recipe_id')
+        self.reset_sequences()
+        if not options['skip_snapshots']:
+            call_command('rebuild_recipe_snapshots', missing_only=True,
+                         stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано пользователей: {len(user_ids)}, '
+            f'рецептов: {len(recipe_ids)}'
+        ))
+
+    def next_id(self, model):
+        last = model.objects.order_by('-pk').values_list('pk', flat=True)
+        return (last.first() or 0) + 1
+
+    def bulk_create(self, model, objects):
+        # Пачки задают размер транзакции; размер одного INSERT Django
+        # подбирает под ограничения СУБД сама.
+        for start in range(0, len(objects), self.batch_size):
+            model.objects.bulk_create(objects[start:start + self.batch_size])
+
+    def create_users(self, count):
+        first_id = self.next_id(CustomUser)
+        password = make_password(PASSWORD)
+        user_ids = list(range(first_id, first_id + count))
+        with transaction.atomic():
+            self.bulk_create(CustomUser, [
+                CustomUser(
+                    id=user_id,
+                    email=f'user{user_id}@example.com',
+                    username=f'user{user_id}',
+                    first_name=f'Имя{user_id}',
+                    last_name=f'Фамилия{user_id}',
+                    password=password,
+                )
+                for user_id in user_ids
+            ])
+        self.stdout.write(f'Пользователи: {count}')
+        return user_ids
+
+    def placeholder_image(self):
+        if not default_storage.exists(PLACEHOLDER_IMAGE):
+            content = io.BytesIO()
+            Image.new('RGB', (1, 1), (255, 165, 0)).save(content, 'PNG')
+            default_storage.save(
+                PLACEHOLDER_IMAGE, ContentFile(content.getvalue())
+            )
+        return PLACEHOLDER_IMAGE
+
+    def create_recipes(self, count, authors, days):
+        first_id = self.next_id(Recipe)
+        recipe_ids = list(range(first_id, first_id + count))
+        image = self.placeholder_image()
+        now = timezone.now()
+        for start in range(0, count, self.batch_size):
+            batch = recipe_ids[start:start + self.batch_size]
+            recipes, tags, ingredients = [], [], []
+            for recipe_id in batch:
+                published = now - timedelta(
+                    seconds=self.rng.randint(0, days * 86400)
+                )
+                recipes.append(Recipe(
+                    id=recipe_id,
+                    author_id=authors.sample(1).pop(),
+                    name=f'Рецепт {recipe_id}',
+                    image=image,
+                    text=f'Описание рецепта {recipe_id}',
+                    cooking_time=self.rng.randint(5, 180),
+                    pub_date=published,
+                    updated_at=published,
+                ))
+                tags.extend(self.recipe_tags(recipe_id))
+                ingredients.extend(self.recipe_ingredients(recipe_id))
+            with transaction.atomic(), manual_dates():
+                Recipe.objects.bulk_create(recipes)
+                Recipe.tags.through.objects.bulk_create(tags)
+                IngredientWithAmount.objects.bulk_create(ingredients)
+            self.stdout.write(f'Рецепты: {start + len(batch)}/{count}')
+        return recipe_ids
+
+    def recipe_tags(self, recipe_id):
+        count = self.rng.randint(1, min(3, len(self.tag_ids)))
+        return [
+            Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+            for tag_id in self.rng.sample(self.tag_ids, count)
+        ]
+
+    def recipe_ingredients(self, recipe_id):
+        count = min(
+            max(round(self.rng.gauss(8, 3)), 2), 20, len(self.ingredient_ids)
+        )
+        return [
+            IngredientWithAmount(
+                recipe_id=recipe_id,
+                ingredient_id=ingredient_id,
+                amount=self.rng.choice((1, 2, 3, 5, 10, 50, 100, 200, 500)),
+            )
+            for ingredient_id in self.rng.sample(self.ingredient_ids, count)
+        ]
+
+    def create_relations(self, user_ids, targets, average, model, field):
+        # Число связей у пользователя тоже с длинным хвостом: большинство
+        # подписано на немногих, единицы — на сотни.
+        objects = []
+        total = 0
+        for user_id in user_ids:
+            count = int(self.rng.expovariate(1 / average)) if average else 0
+            exclude = user_id if field == 'author_id' else None
+            for target in targets.sample(count, exclude=exclude):
+                objects.append(model(user_id=user_id, **{field: target}))
+            if len(objects) >= self.batch_size:
+                total += self.flush(model, objects)
+        total += self.flush(model, objects)
+        self.stdout.write(f'{model._meta.verbose_name_plural}: {total}')
+
+    def flush(self, model, objects):
+        count = len(objects)
+        with transaction.atomic():
+            model.objects.bulk_create(objects)
+        objects.clear()
+        return count
+
+    def reset_sequences(self):
+        # Первичные ключи заданы явно, поэтому последовательности Postgres
+        # нужно подвинуть вручную.
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), [CustomUser, Recipe]
+        )
+        if statements:
+            with connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
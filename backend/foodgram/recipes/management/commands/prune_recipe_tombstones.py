@@ -0,0 +1,23 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from recipes.models import RecipeTombstone
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет следы удалённых рецептов старше RECIPE_TOMBSTONE_DAYS дней'
+    )
+
+    def handle(self, *args, **options):
+        deleted, _ = RecipeTombstone.objects.filter(
+            deleted_at__lt=timezone.now() - timedelta(
+                days=settings.RECIPE_TOMBSTONE_DAYS
+            )
+        ).delete()
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено записей: {deleted}'
+        ))
@@ -0,0 +1,139 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from recipes.models import (AuthorDailyStats, FavoriteRecipe, RecipeDailyStats,
+                            ShoppingCart)
+from recipes.stats import METRICS, RECIPE_METRICS, increment
+from users.models import Follow
+
+
+def recipe_counts(model):
+    return model.objects.order_by().values(
+        'recipe', 'recipe__author'
+    ).annotate(count=Count('pk')).iterator()
+
+
+def recorded(model, key, metrics):
+    return {
+        row[key]: row for row in model.objects.order_by().values(key).annotate(
+            **{name: Sum(name) for name in metrics}
+        ).iterator()
+    }
+
+
+def difference(current, recorded, metrics):
+    # Избранное и подписчики — итоги за вычетом удалений, поэтому
+    # записанное доводится до текущего значения. Корзины считают
+    # добавления без удалений: записанное только увеличивается до числа
+    # рецептов в корзинах сейчас.
+    fix = {}
+    for name in metrics:
+        delta = current[name] - (recorded.get(name) or 0)
+        if name == 'shopping_carts':
+            delta = max(0, delta)
+        if delta:
+            fix[name] = delta
+    return fix
+
+
+class Command(BaseCommand):
+    help = (
+        'Сверяет дневную статистику авторов с текущими избранным, корзинами '
+        'и подписками и дописывает расхождение в один день, не трогая '
+        'историю. С --reset удаляет всю историю и записывает текущие '
+        'значения одним днём'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--day',
+            help='День для поправок, ГГГГ-ММ-ДД (по умолчанию сегодня)'
+        )
+        parser.add_argument(
+            '--reset', action='store_true',
+            help='Удалить накопленную по дням историю'
+        )
+
+    def handle(self, *args, **options):
+        day = timezone.localdate()
+        if options['day']:
+            day = parse_date(options['day'])
+            if day is None:
+                raise CommandError('Ожидается дата в формате ГГГГ-ММ-ДД')
+        recipes, authors = self.current()
+        if options['reset']:
+            self.reset(day, recipes, authors)
+            self.stdout.write(self.style.SUCCESS(
+                f'Авторов: {len(authors)}, рецептов: {len(recipes)}'
+            ))
+            return
+        recipes, authors = self.corrections(recipes, authors)
+        with transaction.atomic():
+            for (recipe_id, author_id), metrics in recipes.items():
+                increment(RecipeDailyStats,
+                          {'recipe_id': recipe_id, 'day': day},
+                          metrics, {'author_id': author_id})
+            for author_id, metrics in authors.items():
+                increment(AuthorDailyStats,
+                          {'author_id': author_id, 'day': day}, metrics)
+        self.stdout.write(self.style.SUCCESS(
+            f'Поправлено авторов: {len(authors)}, рецептов: {len(recipes)}'
+        ))
+
+    def current(self):
+        recipes = defaultdict(lambda: defaultdict(int))
+        authors = defaultdict(lambda: defaultdict(int))
+        for model, metric in ((FavoriteRecipe, 'favorites'),
+                              (ShoppingCart, 'shopping_carts')):
+            for row in recipe_counts(model):
+                recipes[row['recipe'], row['recipe__author']][metric] = (
+                    row['count']
+                )
+                authors[row['recipe__author']][metric] += row['count']
+        for row in Follow.objects.order_by().values('author').annotate(
+            count=Count('pk')
+        ).iterator():
+            authors[row['author']]['followers'] = row['count']
+        return recipes, authors
+
+    def corrections(self, recipes, authors):
+        recipe_rows = recorded(RecipeDailyStats, 'recipe', RECIPE_METRICS)
+        author_rows = recorded(AuthorDailyStats, 'author', METRICS)
+        # Рецепты и авторы, у которых всё удалили, тоже сверяются.
+        for row in RecipeDailyStats.objects.order_by().values(
+            'recipe', 'author'
+        ).distinct().iterator():
+            recipes.setdefault((row['recipe'], row['author']),
+                               defaultdict(int))
+        for author_id in author_rows:
+            authors.setdefault(author_id, defaultdict(int))
+        recipe_fixes, author_fixes = {}, {}
+        for key, metrics in recipes.items():
+            fix = difference(metrics, recipe_rows.get(key[0], {}),
+                             RECIPE_METRICS)
+            if fix:
+                recipe_fixes[key] = fix
+        for author_id, metrics in authors.items():
+            fix = difference(metrics, author_rows.get(author_id, {}), METRICS)
+            if fix:
+                author_fixes[author_id] = fix
+        return recipe_fixes, author_fixes
+
+    def reset(self, day, recipes, authors):
+        with transaction.atomic():
+            AuthorDailyStats.objects.all().delete()
+            RecipeDailyStats.objects.all().delete()
+            RecipeDailyStats.objects.bulk_create(
+                RecipeDailyStats(recipe_id=recipe_id, author_id=author_id,
+                                 day=day, **metrics)
+                for (recipe_id, author_id), metrics in recipes.items()
+            )
+            AuthorDailyStats.objects.bulk_create(
+                AuthorDailyStats(author_id=author_id, day=day, **metrics)
+                for author_id, metrics in authors.items()
+            )
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from recipes.models import Recipe
+from recipes.snapshots import rebuild_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает снимки рецептов для чтения одним запросом'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--missing-only', action='store_true',
+            help='Собрать снимки только для рецептов, у которых их нет'
+        )
+
+    def handle(self, *args, **options):
+        queryset = Recipe.objects.order_by('pk')
+        if options['missing_only']:
+            queryset = queryset.filter(snapshot__isnull=True)
+        total = 0
+        for recipe_id in queryset.values_list('pk', flat=True).iterator():
+            rebuild_snapshot(recipe_id)
+            total += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересобрано снимков: {total}'
+        ))
@@ -0,0 +1,27 @@
+# Generated by Django 2.2.16 on 2026-10-19 10:46
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_add_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeSnapshot',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='snapshot', serialize=False, to='recipes.Recipe', verbose_name='Рецепт')),
+                ('document', models.TextField(verbose_name='Документ рецепта')),
+                ('version', models.PositiveIntegerField(default=1, verbose_name='Версия')),
+                ('updated', models.DateTimeField(auto_now=True, verbose_name='Дата сборки')),
+            ],
+            options={
+                'verbose_name': 'Снимок рецепта',
+                'verbose_name_plural': 'Снимки рецептов',
+            },
+        ),
+    ]
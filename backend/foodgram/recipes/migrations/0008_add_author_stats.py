@@ -0,0 +1,58 @@
+# Generated by Django 2.2.16 on 2026-10-19 11:24
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0007_add_recipe_changes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeDailyStats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='День')),
+                ('favorites', models.IntegerField(default=0, verbose_name='Избранное')),
+                ('shopping_carts', models.IntegerField(default=0, verbose_name='Добавления в корзину')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recipe_daily_stats', to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='recipes.Recipe', verbose_name='Рецепт')),
+            ],
+            options={
+                'verbose_name': 'Статистика рецепта за день',
+                'verbose_name_plural': 'Статистика рецептов по дням',
+            },
+        ),
+        migrations.CreateModel(
+            name='AuthorDailyStats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='День')),
+                ('favorites', models.IntegerField(default=0, verbose_name='Избранное')),
+                ('shopping_carts', models.IntegerField(default=0, verbose_name='Добавления в корзину')),
+                ('followers', models.IntegerField(default=0, verbose_name='Подписчики')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+            ],
+            options={
+                'verbose_name': 'Статистика автора за день',
+                'verbose_name_plural': 'Статистика авторов по дням',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='recipedailystats',
+            index=models.Index(fields=['author', 'day'], name='recipe_stats_author_day_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='recipedailystats',
+            constraint=models.UniqueConstraint(fields=('recipe', 'day'), name='unique_recipe_day'),
+        ),
+        migrations.AddConstraint(
+            model_name='authordailystats',
+            constraint=models.UniqueConstraint(fields=('author', 'day'), name='unique_author_day'),
+        ),
+    ]
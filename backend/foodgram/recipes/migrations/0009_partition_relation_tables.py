@@ -0,0 +1,45 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+from foodgram.partitioning import partition_tables, unpartition_tables
+
+
+def delete_carts_without_user(apps, schema_editor):
+    # Ключ секционирования корзины становится NOT NULL; такие строки
+    # никому не видны.
+    apps.get_model('recipes', 'ShoppingCart').objects.filter(
+        user__isnull=True
+    ).delete()
+
+
+def forwards(apps, schema_editor):
+    partition_tables(apps, schema_editor, 'recipes')
+
+
+def backwards(apps, schema_editor):
+    unpartition_tables(apps, schema_editor, 'recipes')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0008_add_author_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            delete_carts_without_user, migrations.RunPython.noop
+        ),
+        migrations.AlterField(
+            model_name='shoppingcart',
+            name='user',
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name='shopping_cart',
+                to=settings.AUTH_USER_MODEL
+            ),
+        ),
+        migrations.RunPython(forwards, backwards),
+    ]
@@ -71,16 +71,83 @@ class Recipe(models.Model):
     pub_date = models.DateTimeField(
         'Дата публикации',
         auto_now_add=True)
+    updated_at = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True)
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(
+                fields=['updated_at', 'id'],
+                name='recipe_updated_at_id_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date'],
+                name='recipe_author_pub_date_idx'
+            ),
+            models.Index(
+                fields=['-pub_date', 'id'],
+                name='recipe_pub_date_id_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
 
+class RecipeTombstone(models.Model):
+    # След удалённого рецепта для дельта-синхронизации клиентов.
+    recipe_id = models.PositiveIntegerField(
+        verbose_name='ID рецепта'
+    )
+    deleted_at = models.DateTimeField(
+        'Дата удаления',
+        auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Удалённый рецепт'
+        verbose_name_plural = 'Удалённые рецепты'
+        indexes = [
+            models.Index(
+                fields=['deleted_at', 'recipe_id'],
+                name='tombstone_deleted_at_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe_id} ({self.deleted_at})'
+
+
+class RecipeSnapshot(models.Model):
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='snapshot',
+        verbose_name='Рецепт'
+    )
+    document = models.TextField(
+        verbose_name='Документ рецепта',
+    )
+    version = models.PositiveIntegerField(
+        default=1,
+        verbose_name='Версия'
+    )
+    updated = models.DateTimeField(
+        'Дата сборки',
+        auto_now=True)
+
+    class Meta:
+        verbose_name = 'Снимок рецепта'
+        verbose_name_plural = 'Снимки рецептов'
+
+    def __str__(self):
+        return f'{self.recipe} v{self.version}'
+
+
 class Ingredient(models.Model):
     name = models.CharField(
         max_length=200,
@@ -171,7 +238,6 @@ class ShoppingCart(models.Model):
         User,
         on_delete=models.CASCADE,
         related_name='shopping_cart',
-        null=True,
     )
     recipe = models.ForeignKey(
         Recipe,
@@ -192,3 +258,83 @@ class ShoppingCart(models.Model):
 
     def __str__(self):
         return f' {self.user} добавил {self.recipe} в корзину'
+
+
+class AuthorDailyStats(models.Model):
+    # Итоги автора за день: сколько добавилось (за вычетом удалённого)
+    # избранного и подписчиков и сколько раз рецепты попали в корзину.
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='daily_stats',
+        verbose_name='Автор'
+    )
+    day = models.DateField('День')
+    favorites = models.IntegerField(
+        default=0,
+        verbose_name='Избранное'
+    )
+    shopping_carts = models.IntegerField(
+        default=0,
+        verbose_name='Добавления в корзину'
+    )
+    followers = models.IntegerField(
+        default=0,
+        verbose_name='Подписчики'
+    )
+
+    class Meta:
+        verbose_name = 'Статистика автора за день'
+        verbose_name_plural = 'Статистика авторов по дням'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['author', 'day'],
+                name='unique_author_day'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.author} {self.day}'
+
+
+class RecipeDailyStats(models.Model):
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='daily_stats',
+        verbose_name='Рецепт'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='recipe_daily_stats',
+        verbose_name='Автор'
+    )
+    day = models.DateField('День')
+    favorites = models.IntegerField(
+        default=0,
+        verbose_name='Избранное'
+    )
+    shopping_carts = models.IntegerField(
+        default=0,
+        verbose_name='Добавления в корзину'
+    )
+
+    class Meta:
+        verbose_name = 'Статистика рецепта за день'
+        verbose_name_plural = 'Статистика рецептов по дням'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'day'],
+                name='unique_recipe_day'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['author', 'day'],
+                name='recipe_stats_author_day_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe} {self.day}'
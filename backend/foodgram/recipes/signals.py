@@ -0,0 +1,96 @@
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+
+from users.models import CustomUser
+from .catalog import bump_catalog_version
+from .events import publish_new_recipe
+from .models import Ingredient, IngredientWithAmount, Recipe, Tag
+from .snapshots import record_deletion, schedule_rebuild
+from .stats import record_recipe_removal, record_user_removal
+from .tasks import schedule_fan_out
+
+AUTHOR_SNAPSHOT_FIELDS = {'email', 'username', 'first_name', 'last_name'}
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, created, **kwargs):
+    schedule_rebuild([instance.pk])
+    if created:
+        publish_new_recipe(instance)
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_deleting(sender, instance, **kwargs):
+    record_recipe_removal(instance)
+
+
+@receiver(pre_delete, sender=CustomUser)
+def user_deleting(sender, instance, **kwargs):
+    record_user_removal(instance)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    record_deletion(instance.pk)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=IngredientWithAmount)
+def recipe_relations_changed(sender, instance, action, reverse, model,
+                             pk_set, **kwargs):
+    if not reverse:
+        if action.startswith('post_'):
+            schedule_rebuild([instance.pk])
+    elif action == 'pre_clear':
+        schedule_rebuild(sender.objects.filter(
+            **{instance._meta.model_name: instance}
+        ).values_list('recipe_id', flat=True))
+    elif action in ('post_add', 'post_remove'):
+        schedule_rebuild(pk_set)
+
+
+@receiver(post_save, sender=IngredientWithAmount)
+@receiver(post_delete, sender=IngredientWithAmount)
+def ingredient_amount_changed(sender, instance, **kwargs):
+    schedule_rebuild([instance.recipe_id])
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def catalog_changed(sender, **kwargs):
+    bump_catalog_version()
+
+
+@receiver(post_save, sender=Tag)
+def tag_saved(sender, instance, created, **kwargs):
+    if not created:
+        schedule_fan_out(instance.recipes.values_list('pk', flat=True))
+
+
+@receiver(pre_delete, sender=Tag)
+def tag_deleting(sender, instance, **kwargs):
+    # Связи рецептов с тэгом удаляются каскадом без m2m_changed, поэтому
+    # рецепты собираются до удаления.
+    schedule_fan_out(instance.recipes.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_saved(sender, instance, created, **kwargs):
+    if not created:
+        schedule_fan_out(
+            instance.ingredient_in_recipe.values_list('recipe_id', flat=True)
+        )
+
+
+@receiver(post_save, sender=CustomUser)
+def author_saved(sender, instance, created, update_fields, **kwargs):
+    if created:
+        return
+    if update_fields is not None and not (
+        AUTHOR_SNAPSHOT_FIELDS & set(update_fields)
+    ):
+        return
+    schedule_fan_out(instance.recipes.values_list('pk', flat=True))
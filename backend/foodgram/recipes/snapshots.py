@@ -0,0 +1,224 @@
+import json
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from foodgram.counters import get_counters
+from .models import Recipe, RecipeSnapshot, RecipeTombstone
+
+detail_cache_counters = get_counters('recipe_detail_cache')
+
+# Версия всех списков рецептов для кэша анонимных ответов
+# (api.mixins.AnonymousListCacheMixin): меняется после каждой пересборки
+# снимков и удаления рецепта.
+LIST_VERSION_KEY = 'recipe-list:version'
+
+# Версия в кэше для удалённого рецепта: такого документа нет.
+DELETED_VERSION = 'deleted'
+
+
+def build_document(recipe):
+    author = recipe.author
+    return {
+        'id': recipe.id,
+        'tags': [
+            {
+                'id': tag.id,
+                'name': tag.name,
+                'color': tag.color,
+                'slug': tag.slug,
+            }
+            for tag in sorted(recipe.tags.all(), key=lambda tag: tag.id)
+        ],
+        'author': {
+            'email': author.email,
+            'id': author.id,
+            'username': author.username,
+            'first_name': author.first_name,
+            'last_name': author.last_name,
+        },
+        'name': recipe.name,
+        'image': recipe.image.url if recipe.image else None,
+        'text': recipe.text,
+        'ingredients': [
+            {
+                'id': item.ingredient.id,
+                'name': item.ingredient.name,
+                'measurement_unit': item.ingredient.measurement_unit,
+                'amount': item.amount,
+            }
+            for item in recipe.ingredient_in_recipe.all()
+        ],
+        'cooking_time': recipe.cooking_time,
+    }
+
+
+def rebuild_snapshot(recipe_id):
+    recipe = Recipe.objects.select_related('author').prefetch_related(
+        'tags', 'ingredient_in_recipe__ingredient'
+    ).filter(pk=recipe_id).first()
+    if recipe is None:
+        return None
+    document = build_document(recipe)
+    serialized = json.dumps(document, ensure_ascii=False)
+    updated = RecipeSnapshot.objects.filter(recipe_id=recipe_id).update(
+        document=serialized, version=F('version') + 1
+    )
+    if not updated:
+        try:
+            with transaction.atomic():
+                RecipeSnapshot.objects.create(
+                    recipe_id=recipe_id, document=serialized
+                )
+        except IntegrityError:
+            RecipeSnapshot.objects.filter(recipe_id=recipe_id).update(
+                document=serialized, version=F('version') + 1
+            )
+    invalidate_cached_document(recipe_id, snapshot_version(recipe_id))
+    return document
+
+
+def get_document(recipe):
+    try:
+        return json.loads(recipe.snapshot.document)
+    except RecipeSnapshot.DoesNotExist:
+        return rebuild_snapshot(recipe.pk)
+
+
+def _version_key(recipe_id):
+    return f'recipe:{recipe_id}:version'
+
+
+def _document_key(recipe_id, version):
+    return f'recipe:{recipe_id}:v{version}'
+
+
+def snapshot_version(recipe_id):
+    return RecipeSnapshot.objects.filter(
+        recipe_id=recipe_id
+    ).values_list('version', flat=True).first()
+
+
+def load_document(recipe_id):
+    snapshot = RecipeSnapshot.objects.filter(recipe_id=recipe_id).values_list(
+        'document', 'version'
+    ).first()
+    if snapshot is not None:
+        return json.loads(snapshot[0]), snapshot[1]
+    document = rebuild_snapshot(recipe_id)
+    if document is None:
+        return None, None
+    return document, snapshot_version(recipe_id)
+
+
+def get_cached_document(recipe_id):
+    # Снимки пересобирает и воркер задач (run_worker), а сбросить кэш в
+    # памяти веб-процессов он не может: без общего кэша (CACHE_SHARED)
+    # документ читается из базы.
+    if not settings.CACHE_SHARED:
+        return load_document(recipe_id)[0]
+    version = cache.get(_version_key(recipe_id))
+    if version is not None:
+        document = cache.get(_document_key(recipe_id, version))
+        if document is not None:
+            detail_cache_counters.hit()
+            return document
+    detail_cache_counters.miss()
+    document, version = load_document(recipe_id)
+    if document is None:
+        return None
+    # Пересборка могла закончиться после чтения из базы: её версия уже в
+    # кэше, и add её не перезапишет, а прочитанный документ ляжет под
+    # ключом своей версии, куда больше не смотрят.
+    cache.add(_version_key(recipe_id), version,
+              settings.RECIPE_CACHE_TIMEOUT)
+    cache.set(_document_key(recipe_id, version), document,
+              settings.RECIPE_CACHE_TIMEOUT)
+    return document
+
+
+def invalidate_cached_document(recipe_id, version=None):
+    # Ключ версии не удаляется, а получает новую версию (для удалённого
+    # рецепта — DELETED_VERSION), иначе опоздавший читатель вернул бы в
+    # кэш прежнюю.
+    cache.set(_version_key(recipe_id), version or DELETED_VERSION,
+              settings.RECIPE_CACHE_TIMEOUT)
+
+
+def recipe_list_version():
+    version = cache.get(LIST_VERSION_KEY)
+    if version is None:
+        cache.add(LIST_VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(LIST_VERSION_KEY)
+    return version
+
+
+def bump_recipe_list_version():
+    cache.set(LIST_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def touch_recipes(recipe_ids):
+    # updated_at ставится уже после коммита: изменение тэгов и ингредиентов
+    # не сохраняет сам рецепт, а клиент дельта-синхронизации не должен
+    # пропустить правку, закоммиченную позже её метки времени.
+    Recipe.objects.filter(pk__in=recipe_ids).update(updated_at=timezone.now())
+
+
+class _PendingRebuild:
+
+    def __init__(self, ids):
+        self.ids = set(ids)
+
+    def __call__(self):
+        touch_recipes(self.ids)
+        for recipe_id in sorted(self.ids):
+            rebuild_snapshot(recipe_id)
+        bump_recipe_list_version()
+
+
+class _PendingTombstones:
+    # Метка удаления ставится после коммита, как и updated_at в
+    # touch_recipes: долгое каскадное удаление может закоммититься позже
+    # RECIPE_CHANGES_SETTLE, и след с ранней меткой клиент бы пропустил.
+
+    def __init__(self, ids):
+        self.ids = set(ids)
+
+    def __call__(self):
+        RecipeTombstone.objects.filter(pk__in=self.ids).update(
+            deleted_at=timezone.now()
+        )
+        bump_recipe_list_version()
+
+
+def schedule_after_commit(pending_class, ids):
+    ids = set(ids)
+    if not ids:
+        return
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        pending_class(ids)()
+        return
+    # Один отложенный вызов на транзакцию: создание рецепта шлёт сигналы
+    # на сам рецепт, тэги и ингредиенты, удаление автора — на каждый его
+    # рецепт, а обработать их достаточно один раз, уже после коммита.
+    for hook in connection.run_on_commit:
+        callback = hook[1]
+        if isinstance(callback, pending_class):
+            callback.ids.update(ids)
+            return
+    transaction.on_commit(pending_class(ids))
+
+
+def schedule_rebuild(recipe_ids):
+    schedule_after_commit(_PendingRebuild, recipe_ids)
+
+
+def record_deletion(recipe_id):
+    tombstone = RecipeTombstone.objects.create(recipe_id=recipe_id)
+    invalidate_cached_document(recipe_id)
+    schedule_after_commit(_PendingTombstones, [tombstone.pk])
@@ -0,0 +1,164 @@
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from users.models import Follow
+from .models import AuthorDailyStats, FavoriteRecipe, RecipeDailyStats
+
+logger = logging.getLogger(__name__)
+
+# Статистика авторов по дневным итогам: каждое добавление в избранное,
+# в корзину и подписка увеличивают счётчик за текущий день, а отчёт
+# складывает строки по дням, не читая FavoriteRecipe, ShoppingCart и
+# Follow. Строк у автора столько, сколько дней с событиями, сколько бы
+# ни было избранного. Счётчики обновляются из API (api/views.py), а не
+# сигналами post_delete: обработчик удаления отключил бы быстрое
+# каскадное удаление у рецептов и пользователей с миллионами связей.
+# Каскадную убыль учитывают pre_delete рецепта и пользователя
+# (recipes/signals.py).
+METRICS = ('favorites', 'shopping_carts', 'followers')
+RECIPE_METRICS = ('favorites', 'shopping_carts')
+
+
+def increment(model, lookup, deltas, defaults=None):
+    updates = {name: F(name) + delta for name, delta in deltas.items()}
+    if model.objects.filter(**lookup).update(**updates):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **(defaults or {}), **deltas)
+    except IntegrityError:
+        # Строку за этот день успел создать параллельный запрос.
+        model.objects.filter(**lookup).update(**updates)
+
+
+def record_many(author_deltas, recipe_deltas=None):
+    # author_deltas: {автор: {метрика: дельта}}, recipe_deltas:
+    # {(рецепт, автор): {метрика: дельта}}; всё пишется одним обработчиком
+    # после коммита.
+    day = timezone.localdate()
+
+    def apply():
+        for author_id, deltas in author_deltas.items():
+            try:
+                increment(AuthorDailyStats,
+                          {'author_id': author_id, 'day': day}, deltas)
+            except Exception:
+                logger.exception('Не удалось обновить статистику автора %s',
+                                 author_id)
+        for (recipe_id, author_id), deltas in (recipe_deltas or {}).items():
+            try:
+                increment(RecipeDailyStats,
+                          {'recipe_id': recipe_id, 'day': day},
+                          deltas, {'author_id': author_id})
+            except Exception:
+                logger.exception('Не удалось обновить статистику рецепта %s',
+                                 recipe_id)
+
+    # После коммита: откатившееся действие не попадёт в статистику.
+    transaction.on_commit(apply)
+
+
+def record(author_id, recipe_id=None, **deltas):
+    recipe_deltas = {
+        name: delta for name, delta in deltas.items()
+        if name in RECIPE_METRICS
+    }
+    record_many(
+        {author_id: deltas},
+        {(recipe_id, author_id): recipe_deltas}
+        if recipe_id is not None and recipe_deltas else None
+    )
+
+
+def record_favorite(recipe, delta):
+    record(recipe.author_id, recipe.pk, favorites=delta)
+
+
+def record_cart_add(recipe):
+    # Удаление из корзины не учитывается: это обычное завершение покупки.
+    record(recipe.author_id, recipe.pk, shopping_carts=1)
+
+
+def record_follow(author_id, delta):
+    record(author_id, followers=delta)
+
+
+def record_recipe_removal(recipe):
+    # Вызывается до удаления рецепта: его дневные итоги удалятся каскадом,
+    # а избранное рецепта нужно вычесть из итогов автора.
+    favorites = RecipeDailyStats.objects.filter(recipe=recipe).aggregate(
+        total=Coalesce(Sum('favorites'), 0)
+    )['total']
+    if favorites:
+        record(recipe.author_id, favorites=-favorites)
+
+
+def record_user_removal(user):
+    # Вызывается до удаления пользователя: его избранное и подписки удаляются
+    # каскадом без сигналов, поэтому убыль у авторов записывается заранее.
+    # Рецепты самого пользователя удаляются вместе с ним.
+    authors = defaultdict(lambda: defaultdict(int))
+    recipes = {}
+    for recipe_id, author_id in FavoriteRecipe.objects.filter(
+        user=user
+    ).exclude(recipe__author=user).values_list(
+        'recipe_id', 'recipe__author_id'
+    ).iterator():
+        authors[author_id]['favorites'] -= 1
+        recipes[recipe_id, author_id] = {'favorites': -1}
+    for author_id in Follow.objects.filter(user=user).values_list(
+        'author_id', flat=True
+    ).iterator():
+        authors[author_id]['followers'] -= 1
+    if authors:
+        record_many(authors, recipes)
+
+
+def author_stats(author, start, end, top):
+    daily = {
+        row['day']: row for row in AuthorDailyStats.objects.filter(
+            author=author, day__range=(start, end)
+        ).values('day', *METRICS)
+    }
+    days = []
+    day = start
+    while day <= end:
+        row = daily.get(day, {})
+        days.append({
+            'date': day.isoformat(),
+            **{name: row.get(name, 0) for name in METRICS},
+        })
+        day += timedelta(days=1)
+    totals = AuthorDailyStats.objects.filter(author=author).aggregate(
+        **{name: Coalesce(Sum(name), 0) for name in METRICS}
+    )
+    top_recipes = RecipeDailyStats.objects.filter(
+        author=author, day__range=(start, end)
+    ).values('recipe', 'recipe__name').annotate(
+        period_favorites=Sum('favorites'),
+        period_shopping_carts=Sum('shopping_carts'),
+    ).order_by('-period_favorites', '-period_shopping_carts', 'recipe')
+    return {
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'totals': totals,
+        'period': {
+            name: sum(row[name] for row in days) for name in METRICS
+        },
+        'days': days,
+        'top_recipes': [
+            {
+                'id': row['recipe'],
+                'name': row['recipe__name'],
+                'favorites': row['period_favorites'],
+                'shopping_carts': row['period_shopping_carts'],
+            }
+            for row in top_recipes[:top]
+        ],
+    }
@@ -0,0 +1,21 @@
+from tasks.queue import task
+from .snapshots import (bump_recipe_list_version, rebuild_snapshot,
+                        touch_recipes)
+
+FAN_OUT_CHUNK = 500
+
+
+@task('recipes.rebuild_snapshots')
+def rebuild_snapshots(recipe_ids):
+    touch_recipes(recipe_ids)
+    for recipe_id in recipe_ids:
+        rebuild_snapshot(recipe_id)
+    bump_recipe_list_version()
+
+
+def schedule_fan_out(recipe_ids):
+    # Правка тэга, ингредиента или автора задевает снимки многих рецептов;
+    # они пересобираются воркером пачками, а не в запросе.
+    recipe_ids = sorted(set(recipe_ids))
+    for start in range(0, len(recipe_ids), FAN_OUT_CHUNK):
+        rebuild_snapshots.enqueue(recipe_ids[start:start + FAN_OUT_CHUNK])
@@ -0,0 +1,23 @@
+from django.contrib import admin
+
+from foodgram.paginators import EstimatedCountPaginator
+from .models import Task
+
+
+class TaskAdmin(admin.ModelAdmin):
+    list_display = (
+        'id',
+        'name',
+        'status',
+        'attempts',
+        'run_at',
+        'created'
+    )
+    search_fields = ('name',)
+    list_filter = ('status',)
+    readonly_fields = ('locked_by', 'last_error')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+admin.site.register(Task, TaskAdmin)
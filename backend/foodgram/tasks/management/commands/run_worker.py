@@ -0,0 +1,89 @@
+import logging
+import os
+import signal
+import socket
+import time
+from concurrent.futures import (FIRST_COMPLETED, BrokenExecutor,
+                                ProcessPoolExecutor, ThreadPoolExecutor, wait)
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+from tasks.queue import claim_tasks, execute_task
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Запускает воркер фоновых задач из очереди в базе данных'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int, default=4,
+            help='Число задач, выполняемых одновременно'
+        )
+        parser.add_argument(
+            '--processes', action='store_true',
+            help='Выполнять задачи в пуле процессов, а не потоков'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить готовые задачи и завершиться'
+        )
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        worker = f'{socket.gethostname()}:{os.getpid()}'
+        concurrency = options['concurrency']
+        if options['processes']:
+            # Дочерние процессы не должны унаследовать открытые соединения.
+            connections.close_all()
+            pool = ProcessPoolExecutor(max_workers=concurrency)
+        else:
+            pool = ThreadPoolExecutor(max_workers=concurrency)
+        self.stdout.write(f'Воркер {worker} запущен')
+        with pool:
+            self.loop(pool, worker, concurrency, options['once'])
+        self.stdout.write(f'Воркер {worker} остановлен')
+
+    def stop(self, signum, frame):
+        # Новые задачи не берутся, начатые доделываются.
+        self.stopping = True
+
+    def loop(self, pool, worker, concurrency, once):
+        running = set()
+        task_ids = {}
+        while not self.stopping:
+            close_old_connections()
+            claimed = []
+            if len(running) < concurrency:
+                claimed = claim_tasks(worker, concurrency - len(running))
+            for pk in claimed:
+                future = pool.submit(execute_task, pk, worker)
+                task_ids[future] = pk
+                running.add(future)
+            if not running:
+                if once:
+                    return
+                time.sleep(settings.TASKS_POLL_INTERVAL)
+                continue
+            done, running = wait(
+                running, timeout=settings.TASKS_POLL_INTERVAL,
+                return_when=FIRST_COMPLETED
+            )
+            for future in done:
+                pk = task_ids.pop(future)
+                try:
+                    future.result()
+                except BrokenExecutor:
+                    # Пул с умершим процессом задач больше не примет.
+                    raise
+                except Exception:
+                    # Ошибки самой задачи записывает run_task; сюда доходят
+                    # сбои вокруг неё, например обрыв соединения с базой.
+                    # Задача вернётся в очередь по таймауту видимости.
+                    logger.exception('Сбой при выполнении задачи %s', pk)
+        wait(running)
@@ -0,0 +1,195 @@
+import json
+import logging
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+# Очередь в базе данных без внешнего брокера. Воркер (run_worker) забирает
+# задачу условным UPDATE: кто первым сменил run_at, тот и владелец. Пока
+# задача выполняется, её run_at сдвинут на таймаут видимости и
+# периодически продлевается (Lease); если воркер умер, задачу после
+# таймаута заберёт другой. Успешные задачи удаляются, упавшие повторяются
+# с экспоненциальной задержкой до max_attempts. Задача, на последней
+# попытке которой умер воркер, при следующем захвате помечается упавшей.
+TASKS = {}
+
+
+class TaskFunction:
+
+    def __init__(self, func, name, max_attempts, retry_delay, timeout):
+        self.func = func
+        self.name = name
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.timeout = timeout
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def enqueue(self, *args, **kwargs):
+        return enqueue(self.name, *args, **kwargs)
+
+
+def task(name, max_attempts=None, retry_delay=None, timeout=None):
+    def decorator(func):
+        TASKS[name] = TaskFunction(
+            func, name,
+            max_attempts or settings.TASKS_MAX_ATTEMPTS,
+            retry_delay or settings.TASKS_RETRY_DELAY,
+            timeout or settings.TASKS_VISIBILITY_TIMEOUT,
+        )
+        return TASKS[name]
+    return decorator
+
+
+def enqueue(name, *args, **kwargs):
+    # Задача ставится после коммита текущей транзакции, чтобы воркер не
+    # увидел данные, которые ещё могут откатиться.
+    function = TASKS[name]
+    payload = json.dumps({'args': args, 'kwargs': kwargs})
+    if settings.TASKS_EAGER:
+        transaction.on_commit(lambda: function(*args, **kwargs))
+        return
+    transaction.on_commit(lambda: Task.objects.create(
+        name=name, payload=payload, max_attempts=function.max_attempts
+    ))
+
+
+def task_option(name, option, default):
+    function = TASKS.get(name)
+    return getattr(function, option) if function else default
+
+
+def fail_exhausted_tasks(now):
+    # Иначе задача, роняющая воркер, забиралась бы снова и снова.
+    return Task.objects.filter(
+        status=Task.RUNNING, run_at__lte=now,
+        attempts__gte=F('max_attempts'),
+    ).update(
+        status=Task.FAILED,
+        locked_by='',
+        last_error='Воркер не завершил последнюю попытку за таймаут '
+                   'видимости',
+    )
+
+
+def claim_tasks(worker, limit):
+    now = timezone.now()
+    fail_exhausted_tasks(now)
+    candidates = Task.objects.filter(
+        Q(status=Task.PENDING) | Q(status=Task.RUNNING),
+        run_at__lte=now,
+    ).values_list('pk', 'name', 'run_at')[:limit * 2]
+    claimed = []
+    for pk, name, run_at in candidates:
+        timeout = task_option(
+            name, 'timeout', settings.TASKS_VISIBILITY_TIMEOUT
+        )
+        if Task.objects.filter(
+            pk=pk, run_at=run_at, attempts__lt=F('max_attempts')
+        ).update(
+            status=Task.RUNNING,
+            run_at=now + timedelta(seconds=timeout),
+            locked_by=worker,
+            attempts=F('attempts') + 1,
+        ):
+            claimed.append(pk)
+            if len(claimed) >= limit:
+                break
+    return claimed
+
+
+class Lease(threading.Thread):
+    # Продлевает таймаут видимости выполняемой задачи каждые
+    # TASKS_HEARTBEAT_INTERVAL секунд (но не реже трети таймаута), чтобы
+    # долгую задачу не забрал второй воркер. Продление прекращается, если
+    # задачу уже забрали.
+
+    def __init__(self, instance, worker):
+        super().__init__(daemon=True)
+        self.instance = instance
+        self.owned = Task.objects.filter(
+            pk=instance.pk, locked_by=worker, attempts=instance.attempts,
+            status=Task.RUNNING,
+        )
+        self.timeout = task_option(
+            instance.name, 'timeout', settings.TASKS_VISIBILITY_TIMEOUT
+        )
+        self.stopped = threading.Event()
+
+    def extend(self):
+        return bool(self.owned.update(
+            run_at=timezone.now() + timedelta(seconds=self.timeout)
+        ))
+
+    def run(self):
+        try:
+            interval = min(settings.TASKS_HEARTBEAT_INTERVAL,
+                           self.timeout / 3)
+            while not self.stopped.wait(interval):
+                if not self.extend():
+                    logger.warning('Задачу %s забрал другой воркер',
+                                   self.instance)
+                    return
+        finally:
+            connection.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def execute_task(pk, worker):
+    close_old_connections()
+    try:
+        instance = Task.objects.filter(
+            pk=pk, locked_by=worker, status=Task.RUNNING
+        ).first()
+        if instance is not None:
+            lease = Lease(instance, worker)
+            lease.start()
+            try:
+                run_task(instance, worker)
+            finally:
+                lease.stop()
+    finally:
+        close_old_connections()
+
+
+def run_task(instance, worker):
+    # Результат записывается, только если задачу за это время не забрал
+    # другой воркер по истечении таймаута видимости.
+    owned = Task.objects.filter(
+        pk=instance.pk, locked_by=worker, attempts=instance.attempts
+    )
+    try:
+        if instance.name not in TASKS:
+            raise LookupError(f'Неизвестная задача {instance.name}')
+        payload = json.loads(instance.payload)
+        TASKS[instance.name](*payload['args'], **payload['kwargs'])
+    except Exception:
+        logger.exception('Задача %s завершилась ошибкой', instance)
+        error = traceback.format_exc()
+        if instance.attempts >= instance.max_attempts:
+            owned.update(status=Task.FAILED, last_error=error)
+            return
+        delay = task_option(instance.name, 'retry_delay',
+                            settings.TASKS_RETRY_DELAY)
+        owned.update(
+            status=Task.PENDING,
+            run_at=timezone.now() + timedelta(
+                seconds=delay * 2 ** (instance.attempts - 1)
+            ),
+            last_error=error,
+        )
+        return
+    owned.delete()
@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.models import Group
 
+from foodgram.paginators import EstimatedCountPaginator
 from .models import Follow, User
 
 
@@ -14,7 +15,8 @@ class UserAdmin(admin.ModelAdmin):
     )
     ordering = ('email',)
     search_fields = ('username', 'email', 'last_name')
-    list_filter = ('username', 'email', 'first_name', 'last_name')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 class SubscriptionAdmin(admin.ModelAdmin):
@@ -23,8 +25,11 @@ class SubscriptionAdmin(admin.ModelAdmin):
         'user',
         'author'
     )
-    list_filter = ('user', 'author')
     search_fields = ('user__username', 'user__email')
+    list_select_related = ('user', 'author')
+    autocomplete_fields = ('user', 'author')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 admin.site.unregister(Group)
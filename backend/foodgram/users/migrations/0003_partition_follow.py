@@ -0,0 +1,22 @@
+from django.db import migrations
+
+from foodgram.partitioning import partition_tables, unpartition_tables
+
+
+def forwards(apps, schema_editor):
+    partition_tables(apps, schema_editor, 'users')
+
+
+def backwards(apps, schema_editor):
+    unpartition_tables(apps, schema_editor, 'users')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_add_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
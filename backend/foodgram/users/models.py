@@ -46,6 +46,9 @@ class Follow(models.Model):
                 name='unique_follow'
             )
         ]
+        indexes = [
+            models.Index(fields=['user', '-id'], name='follow_user_id_idx'),
+        ]
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
         ordering = ['-id']
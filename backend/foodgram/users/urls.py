@@ -1,10 +1,17 @@
 from django.urls import include, path
+from rest_framework.routers import DefaultRouter
 
-from api.views import SubscribeView, SubscriptionViewSet
+from api.views import (AuthorStatsView, CustomUserViewSet, SubscribeView,
+                       SubscriptionViewSet)
+
+router = DefaultRouter()
+
+router.register('users', CustomUserViewSet)
 
 urlpatterns = [
     path('users/subscriptions/', SubscriptionViewSet.as_view()),
-    path('', include('djoser.urls')),
+    path('users/me/stats/', AuthorStatsView.as_view()),
+    path('', include(router.urls)),
     path('auth/', include('djoser.urls.authtoken')),
     path('users/<int:pk>/subscribe/', SubscribeView.as_view()),
 ]